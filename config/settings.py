@@ -63,6 +63,16 @@ DATABASES = {
     },
 }
 
+# The dashboard, counts and rollups are shared between processes through the
+# cache, so it must not be the per-process local memory cache. The database
+# cache needs `python manage.py createcachetable`; Redis or Memcached work too.
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": config("CACHE_LOCATION", default="django_cache"),
+    },
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -129,3 +139,15 @@ else:
     SECURE_HSTS_PRELOAD = True
     SECURE_CONTENT_TYPE_NOSNIFF = True
     SECURE_REDIRECT_EXEMPT = []
+
+LUGGAGE_IMPORT_BATCH_SIZE = config("LUGGAGE_IMPORT_BATCH_SIZE", default=2000, cast=int)
+LUGGAGE_MAX_TRIP_DURATION = config("LUGGAGE_MAX_TRIP_DURATION", default=48, cast=int)
+LUGGAGE_COUNT_CACHE_TIMEOUT = config("LUGGAGE_COUNT_CACHE_TIMEOUT", default=300, cast=int)
+LUGGAGE_COUNT_ESTIMATE_THRESHOLD = config("LUGGAGE_COUNT_ESTIMATE_THRESHOLD", default=100000, cast=int)
+LUGGAGE_DAILY_COUNT_CACHE_TIMEOUT = config("LUGGAGE_DAILY_COUNT_CACHE_TIMEOUT", default=60, cast=int)
+LUGGAGE_INLINE_TRIP_LIMIT = config("LUGGAGE_INLINE_TRIP_LIMIT", default=10, cast=int)
+LUGGAGE_RECEIPT_BLOCK_SIZE = config("LUGGAGE_RECEIPT_BLOCK_SIZE", default=20, cast=int)
+LUGGAGE_ARCHIVE_AFTER_DAYS = config("LUGGAGE_ARCHIVE_AFTER_DAYS", default=90, cast=int)
+LUGGAGE_ARCHIVE_BATCH_SIZE = config("LUGGAGE_ARCHIVE_BATCH_SIZE", default=100, cast=int)
+LUGGAGE_SNAPSHOT_DIR = config("LUGGAGE_SNAPSHOT_DIR", default=str(BASE_DIR / "snapshots"))
+LUGGAGE_DASHBOARD_CACHE_TIMEOUT = config("LUGGAGE_DASHBOARD_CACHE_TIMEOUT", default=60, cast=int)
@@ -4,23 +4,95 @@ from django.contrib import admin
 from django.urls import include, path
 
 from luggages.views import (
+    admin_bagtag_bulk_scan,
+    admin_bagtag_scan,
     admin_customer_detail,
+    admin_customer_duplicates,
+    admin_luggage_analytics,
     admin_luggagebill_detail,
+    admin_revenue_report,
+    admin_route_dashboard,
+    admin_settlement_close,
+    admin_settlement_report,
+    admin_staff_productivity,
+    admin_trip_conflicts,
     admin_trip_luggages,
+    admin_trip_manifest,
+    admin_trip_receipts,
     homepage,
 )
 
 urlpatterns = [
+    path(
+        "admin/luggages/settlement/report/",
+        admin_settlement_report,
+        name="admin_settlement_report",
+    ),
+    path(
+        "admin/luggages/settlement/close/",
+        admin_settlement_close,
+        name="admin_settlement_close",
+    ),
+    path(
+        "admin/luggages/luggagebill/staff/",
+        admin_staff_productivity,
+        name="admin_staff_productivity",
+    ),
+    path(
+        "admin/luggages/trip/routes/",
+        admin_route_dashboard,
+        name="admin_route_dashboard",
+    ),
+    path(
+        "admin/luggages/trip/revenue/",
+        admin_revenue_report,
+        name="admin_revenue_report",
+    ),
+    path(
+        "admin/luggages/luggage/analytics/",
+        admin_luggage_analytics,
+        name="admin_luggage_analytics",
+    ),
+    path(
+        "admin/luggages/bagtag/scan/",
+        admin_bagtag_bulk_scan,
+        name="admin_bagtag_bulk_scan",
+    ),
+    path(
+        "admin/luggages/bagtag/scan/<str:code>/",
+        admin_bagtag_scan,
+        name="admin_bagtag_scan",
+    ),
     path(
         "admin/luggages/luggagebill/<int:luggagebill_id>/",
         admin_luggagebill_detail,
         name="admin_luggagebill_detail",
     ),
+    path(
+        "admin/luggages/customer/duplicates/",
+        admin_customer_duplicates,
+        name="admin_customer_duplicates",
+    ),
     path(
         "admin/luggages/customer/<int:customer_id>/",
         admin_customer_detail,
         name="admin_customer_detail",
     ),
+    path(
+        "admin/luggages/trip/conflicts/",
+        admin_trip_conflicts,
+        name="admin_trip_conflicts",
+    ),
+    path(
+        "admin/luggages/trip/<int:trip_id>/manifest/",
+        admin_trip_manifest,
+        name="admin_trip_manifest",
+    ),
+    path(
+        "admin/luggages/trip/<int:trip_id>/receipts/",
+        admin_trip_receipts,
+        name="admin_trip_receipts",
+    ),
     path(
         "admin/luggages/trip/<int:trip_id>/",
         admin_trip_luggages,
@@ -37,3 +109,4 @@ if settings.DEBUG:
 admin.site.site_header = "Luggager Admin"
 admin.site.index_title = "Luggager Admin Portal"
 admin.site.site_title = "Welcome to Luggager Admin Dashboard"
+admin.site.index_template = "admin/luggages/index.html"
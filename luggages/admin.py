@@ -1,23 +1,49 @@
 import csv
 import datetime
 
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.models import Group
-from django.http import HttpResponse
+from django.db.models import Case, When
+from django.http import HttpResponse, StreamingHttpResponse
 from django.urls import reverse
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
+from django.utils.text import capfirst
 
+from .archive import restore_trips
+from .filters import DailyCountDateFieldListFilter
+from .fuzzy import customer_index
 from .models import (
+    ArchivedBagTag,
+    ArchivedLuggage,
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    BagTag,
     BagType,
     Bus,
     Customer,
     Luggage,
     LuggageBill,
     ParkLocation,
+    PricingRule,
+    Settlement,
+    SettlementLine,
+    StaffProfile,
     State,
     Trip,
+    TripSchedule,
     Weight,
 )
+from .pagination import (
+    BoundedInlineFormSet,
+    KeysetPaginationMixin,
+    LookaheadAutocompleteMixin,
+    is_autocomplete_request,
+)
+from .purge import estimate_cascade
+from .receipts import stream_receipts
+from .search import search_bills
 
 
 def export_to_csv(modeladmin, request, queryset):
@@ -44,6 +70,13 @@ def export_to_csv(modeladmin, request, queryset):
 export_to_csv.short_description = "Export selected bills to CSV"
 
 
+def print_receipts(modeladmin, request, queryset):
+    return StreamingHttpResponse(stream_receipts(queryset), content_type="text/html; charset=utf-8")
+
+
+print_receipts.short_description = "Print receipts for selected bills"
+
+
 def luggage_receipt(obj):
     url = reverse("admin_luggagebill_detail", args=[obj.id])
     return mark_safe(f'<a href="{url}">View</a>')
@@ -59,21 +92,111 @@ def trip_luggages(obj):
     return mark_safe(f'<a href="{url}">View</a>')
 
 
+def restore_deleted(modeladmin, request, queryset):
+    restored = queryset.restore()
+    modeladmin.message_user(request, f"Restored {restored} {modeladmin.model._meta.verbose_name_plural}.")
+
+
+restore_deleted.short_description = "Restore selected %(verbose_name_plural)s"
+restore_deleted.allowed_permissions = ["change"]
+
+
+class DeletedListFilter(admin.SimpleListFilter):
+    """Changelist filter listing the rows marked deleted and not purged yet."""
+
+    title = "status"
+    parameter_name = "deleted"
+
+    def lookups(self, request, model_admin):
+        return [("yes", "Deleted")]
+
+    def queryset(self, request, queryset):
+        if self.value() == "yes":
+            return queryset.filter(deleted__isnull=False)
+        return queryset
+
+
+class SoftDeleteAdminMixin:
+    """ModelAdmin mixin marking rows deleted instead of deleting their history in the request.
+
+    The delete confirmation shows estimated counts of the dependent rows
+    instead of listing every one of them; ``purgedeleted`` removes them later.
+    Until then the rows are listed under the "Deleted" status filter, from
+    which they can be restored.
+    """
+
+    actions = [restore_deleted]
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # Deleted rows are only listed when the changelist filter asks for them; autocomplete only sees live ones
+        if request.GET.get(DeletedListFilter.parameter_name) == "yes":
+            return queryset
+        return queryset.alive()
+
+    def get_list_filter(self, request):
+        return [*super().get_list_filter(request), DeletedListFilter]
+
+    def delete_model(self, request, obj):
+        self.model.objects.filter(pk=obj.pk).soft_delete()
+
+    def delete_queryset(self, request, queryset):
+        queryset.soft_delete()
+
+    def get_deleted_objects(self, objs, request):
+        opts = self.model._meta
+        deleted_objects = [
+            format_html(
+                '{}: <a href="{}">{}</a>',
+                capfirst(opts.verbose_name),
+                reverse(f"admin:{opts.app_label}_{opts.model_name}_change", args=[obj.pk]),
+                obj,
+            )
+            for obj in objs
+        ]
+        model_count = {opts.verbose_name_plural: len(deleted_objects)}
+        for model, count in estimate_cascade(self.model, objs).items():
+            if count:
+                model_count[model._meta.verbose_name_plural] = f"about {count}"
+        # Nothing is deleted right away, so no permission on the dependent models is needed
+        return deleted_objects, model_count, set(), []
+
+
 @admin.register(BagType)
 class BagTypeAdmin(admin.ModelAdmin):
     list_display = ["name", "size"]
     search_fields = ["name"]
 
 
-class TripInlineBus(admin.TabularInline):
+class RecentTripInline(admin.TabularInline):
+    """Read-only list of the latest trips of a bus or park.
+
+    Only ``max_shown`` trips are loaded; the rest are reached through a link
+    to the filtered trip changelist.
+    """
+
     model = Trip
-    extra = 1
-    readonly_fields = [
-        "name",
-        "departure",
-        "destination",
-        "date_of_journey",
-    ]
+    formset = BoundedInlineFormSet
+    template = "admin/luggages/trip/recent_trips_inline.html"
+    max_shown = settings.LUGGAGE_INLINE_TRIP_LIMIT
+    fields = ["name", "bus", "departure", "destination", "date_of_journey", "duration"]
+    readonly_fields = fields
+
+    def get_fields(self, request, obj=None):
+        return [field for field in self.fields if field != self.fk_name]
+
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .select_related("bus", "departure", "destination")
+            .order_by("-date_of_journey", "-id")
+        )
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.max_shown = self.max_shown
+        return formset
 
     def has_delete_permission(self, request, obj=None):
         """Determine whether the user has permission to delete Trip instances.
@@ -99,52 +222,36 @@ class TripInlineBus(admin.TabularInline):
         """
         return False
 
-
-@admin.register(Bus)
-class BusAdmin(admin.ModelAdmin):
-    list_display = ["plate_number", "driver_name"]
-    search_fields = ["plate_number", "driver_name"]
-    inlines = [TripInlineBus]
-
-
-class TripInlineLocation(admin.TabularInline):
-    model = Trip
-    extra = 1
-    readonly_fields = [
-        "name",
-        "departure",
-        "destination",
-        "date_of_journey",
-    ]
-    fk_name = "departure"
-
-    def has_delete_permission(self, request, obj=None):
-        """Determine whether the user has permission to delete Trip instances.
+    def has_change_permission(self, request, obj=None):
+        """Determine whether the user has permission to change Trip instances.
 
         Args:
             request: The current request.
             obj (optional): The object being edited.
 
         Returns:
-            bool: True if the user has permission to delete, False otherwise.
+            bool: Always False, trips are edited from their own page.
         """
         return False
 
-    def has_add_permission(self, request, obj=None):
-        """Determine whether the user has permission to add new Trip instances.
 
-        Args:
-            request: The current request.
-            obj (optional): The object being edited.
+class TripInlineBus(RecentTripInline):
+    fk_name = "bus"
 
-        Returns:
-            bool: True if the user has permission to add, False otherwise.
-        """
-        return False
+
+@admin.register(Bus)
+class BusAdmin(SoftDeleteAdminMixin, LookaheadAutocompleteMixin, admin.ModelAdmin):
+    list_display = ["plate_number", "driver_name"]
+    search_fields = ["plate_number", "driver_name"]
+    inlines = [TripInlineBus]
+
+
+class TripInlineLocation(RecentTripInline):
+    fk_name = "departure"
 
 
 @admin.register(ParkLocation)
-class ParkLocationAdmin(admin.ModelAdmin):
+class ParkLocationAdmin(SoftDeleteAdminMixin, LookaheadAutocompleteMixin, admin.ModelAdmin):
     list_display = ["location", "state", "full_address"]
     list_filter = ["state"]
     search_fields = ["full_address", "location"]
@@ -152,17 +259,69 @@ class ParkLocationAdmin(admin.ModelAdmin):
 
 
 @admin.register(Customer)
-class CustomerAdmin(admin.ModelAdmin):
+class CustomerAdmin(SoftDeleteAdminMixin, LookaheadAutocompleteMixin, admin.ModelAdmin):
     list_display = [
         "fullname",
         "email",
         "address",
         "next_of_kin",
         "next_of_kin_phonenumber",
+        "trips",
+        "spend",
+        "kilograms",
+        "last_trip",
+        "favourite_route",
         customer_detail,
     ]
+    list_select_related = ["summary__favourite_departure", "summary__favourite_destination"]
     search_fields = ["fullname", "next_of_kin"]
 
+    def summary_value(self, obj, name):
+        summary = getattr(obj, "summary", None)
+        return getattr(summary, name) if summary else None
+
+    def trips(self, obj):
+        return self.summary_value(obj, "trips")
+
+    trips.short_description = "Trips"
+    trips.admin_order_field = "summary__trips"
+
+    def spend(self, obj):
+        return self.summary_value(obj, "spend")
+
+    spend.short_description = "Total Spend"
+    spend.admin_order_field = "summary__spend"
+
+    def kilograms(self, obj):
+        return self.summary_value(obj, "kilograms")
+
+    kilograms.short_description = "Kilograms"
+    kilograms.admin_order_field = "summary__kilograms"
+
+    def last_trip(self, obj):
+        return self.summary_value(obj, "last_trip")
+
+    last_trip.short_description = "Last Trip"
+    last_trip.admin_order_field = "summary__last_trip"
+
+    def favourite_route(self, obj):
+        return self.summary_value(obj, "favourite_route")
+
+    favourite_route.short_description = "Favourite Route"
+
+    def get_search_results(self, request, queryset, search_term):
+        # Tolerate misspelt names using the in-memory fuzzy index
+        matches = customer_index.search(search_term, limit=20) if search_term else []
+        if not matches:
+            return super().get_search_results(request, queryset, search_term)
+        ranked = [pk for pk, _ in matches]
+        if is_autocomplete_request(request):
+            # Offer the closest names first when picking the customer of a bill
+            order = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ranked)])
+            return queryset.filter(pk__in=ranked).order_by(order), False
+        results, use_distinct = super().get_search_results(request, queryset, search_term)
+        return results | queryset.filter(pk__in=ranked), use_distinct
+
 
 class ParkLocationInline(admin.StackedInline):
     model = ParkLocation
@@ -182,7 +341,7 @@ class StateAdmin(admin.ModelAdmin):
 
 
 @admin.register(Trip)
-class TripAdmin(admin.ModelAdmin):
+class TripAdmin(LookaheadAutocompleteMixin, KeysetPaginationMixin, admin.ModelAdmin):
     list_display = [
         "name",
         "bus",
@@ -191,7 +350,7 @@ class TripAdmin(admin.ModelAdmin):
         "date_of_journey",
         trip_luggages,
     ]
-    list_filter = ["date_of_journey"]
+    list_filter = [("date_of_journey", DailyCountDateFieldListFilter)]
     search_fields = [
         "departure__location",
         "destination__location",
@@ -199,6 +358,36 @@ class TripAdmin(admin.ModelAdmin):
         "name",
     ]
     date_hierarchy = "date_of_journey"
+    autocomplete_fields = ["bus", "departure", "destination"]
+    keyset_ordering = ("-date_of_journey", "-id")
+
+    def get_search_results(self, request, queryset, search_term):
+        # Suggest the upcoming departures from the clerk's park when picking the trip of a bill
+        if not search_term and is_autocomplete_request(request) and request.GET.get("model_name") == "luggagebill":
+            try:
+                park = request.user.staff_profile.park
+            except StaffProfile.DoesNotExist:
+                park = None
+            return queryset.upcoming(departure=park), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(TripSchedule)
+class TripScheduleAdmin(admin.ModelAdmin):
+    list_display = ["__str__", "bus", "weekday", "departure_time", "active"]
+    list_filter = ["weekday", "active"]
+    list_select_related = ["bus", "departure", "destination"]
+    search_fields = ["bus__plate_number", "departure__location", "destination__location"]
+    autocomplete_fields = ["bus", "departure", "destination"]
+
+
+@admin.register(StaffProfile)
+class StaffProfileAdmin(admin.ModelAdmin):
+    list_display = ["user", "park"]
+    list_filter = ["park__state"]
+    list_select_related = ["user", "park"]
+    search_fields = ["user__username", "park__location"]
+    autocomplete_fields = ["user", "park"]
 
 
 @admin.register(Weight)
@@ -206,19 +395,69 @@ class WeightAdmin(admin.ModelAdmin):
     list_display = ["name", "min_weight", "price"]
 
 
+@admin.register(PricingRule)
+class PricingRuleAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "departure",
+        "destination",
+        "weight",
+        "size",
+        "multiplier",
+        "surcharge",
+        "starts",
+        "ends",
+        "active",
+    ]
+    list_filter = ["active", "size", "weight"]
+    list_select_related = ["departure", "destination", "weight"]
+    search_fields = ["name"]
+    autocomplete_fields = ["departure", "destination"]
+
+
 class LuggageInline(admin.TabularInline):
     model = Luggage
     extra = 1
 
 
+@admin.register(Luggage)
+class LuggageAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ["id", "luggagebill", "bag_type", "weight", "quantity", "created"]
+    list_filter = ["bag_type__size", "weight"]
+    list_select_related = ["luggagebill__customer", "bag_type", "weight"]
+    search_fields = ["luggagebill__customer__fullname", "luggagebill__trip__name"]
+    raw_id_fields = ["luggagebill"]
+
+
+@admin.register(BagTag)
+class BagTagAdmin(admin.ModelAdmin):
+    list_display = ["code", "luggage", "sequence", "status", "scanned_at"]
+    list_filter = ["status"]
+    list_select_related = ["luggage"]
+    search_fields = ["=code"]
+    raw_id_fields = ["luggage"]
+    readonly_fields = ["code", "scanned_at"]
+
+
 @admin.register(LuggageBill)
-class LuggageBillAdmin(admin.ModelAdmin):
-    list_display = ["customer", "trip", "created", luggage_receipt]
-    list_filter = ["created"]
+class LuggageBillAdmin(KeysetPaginationMixin, admin.ModelAdmin):
+    list_display = ["receipt_number", "customer", "trip", "created", luggage_receipt]
+    list_filter = [("created", DailyCountDateFieldListFilter)]
     search_fields = ["customer__fullname", "trip__name", "trip__bus__plate_number"]
+    autocomplete_fields = ["customer", "trip"]
     date_hierarchy = "created"
     inlines = [LuggageInline]
-    actions = [export_to_csv]
+    actions = [export_to_csv, print_receipts]
+
+    def get_search_results(self, request, queryset, search_term):
+        # Match the maintained search document instead of joining customer, trip and bus
+        if not search_term:
+            return queryset, False
+        # A receipt number is unique, so an exact match needs no text search
+        by_number = queryset.filter(receipt_number=search_term.strip())
+        if by_number.exists():
+            return by_number, False
+        return search_bills(queryset, search_term), False
 
     def queryset(self, request):
         # override queryset returned by list page to only
@@ -241,5 +480,122 @@ class LuggageBillAdmin(admin.ModelAdmin):
             obj.added_by = request.user
         super().save_model(request, obj, form, change)
 
+    def has_change_permission(self, request, obj=None):
+        """Settled bills are frozen."""
+        if obj is not None and obj.settlement_id is not None:
+            return False
+        return super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        """Settled bills are frozen."""
+        if obj is not None and obj.settlement_id is not None:
+            return False
+        return super().has_delete_permission(request, obj)
+
 
 admin.site.unregister(Group)
+
+
+def restore_archived_trips(modeladmin, request, queryset):
+    restored = restore_trips(queryset.values_list("pk", flat=True))
+    modeladmin.message_user(request, f"Restored {restored} trip(s) with their bills and luggage.")
+
+
+restore_archived_trips.short_description = "Restore selected trips"
+restore_archived_trips.allowed_permissions = ["restore"]
+
+
+class ArchiveAdmin(admin.ModelAdmin):
+    """Read-only admin for rows moved to the archive tables."""
+
+    def has_add_permission(self, request, obj=None):
+        """Archived rows are only created by ``archive_trips``."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Archived rows cannot be edited; restore the trip to change it."""
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        """Archived rows are only removed by restoring their trip."""
+        return False
+
+
+class ArchivedLuggageInline(admin.TabularInline):
+    model = ArchivedLuggage
+    fields = ["bag_type", "weight", "quantity", "created"]
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedTrip)
+class ArchivedTripAdmin(KeysetPaginationMixin, ArchiveAdmin):
+    list_display = ["name", "bus", "departure", "destination", "date_of_journey", "archived"]
+    list_select_related = ["bus", "departure", "destination"]
+    search_fields = ["=name"]
+    keyset_ordering = ("-date_of_journey", "-id")
+    actions = [restore_archived_trips]
+
+    def has_restore_permission(self, request):
+        """Restoring recreates live trips, bills and luggage."""
+        opts = Trip._meta
+        return request.user.has_perm(f"{opts.app_label}.add_{opts.model_name}")
+
+
+@admin.register(ArchivedLuggageBill)
+class ArchivedLuggageBillAdmin(KeysetPaginationMixin, ArchiveAdmin):
+    list_display = ["receipt_number", "customer", "trip", "created"]
+    list_select_related = ["customer", "trip"]
+    search_fields = ["=receipt_number", "search_document"]
+    inlines = [ArchivedLuggageInline]
+
+
+@admin.register(ArchivedBagTag)
+class ArchivedBagTagAdmin(ArchiveAdmin):
+    list_display = ["code", "luggage", "sequence", "status", "scanned_at"]
+    list_select_related = ["luggage"]
+    search_fields = ["=code"]
+
+
+class SettlementLineInline(admin.TabularInline):
+    model = SettlementLine
+    fields = ["bill", "item", "bag_type", "weight", "quantity", "unit_price", "unit_weight", "amount"]
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Settlement)
+class SettlementAdmin(admin.ModelAdmin):
+    list_display = ["park", "day", "bills", "bags", "kilograms", "revenue", "closed_by", "created"]
+    list_filter = ["park"]
+    list_select_related = ["park", "closed_by"]
+    date_hierarchy = "day"
+    inlines = [SettlementLineInline]
+
+    def has_add_permission(self, request, obj=None):
+        """Settlements are only created by closing a day."""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        """Settlements are immutable."""
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        """Settlements are immutable."""
+        return False
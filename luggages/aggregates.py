@@ -0,0 +1,287 @@
+"""Rebuilding the figures derived from the bills, in parallel over ranges of journey days.
+
+The figures feed the revenue report (``revenue_report``): revenue per park
+and day, the load of every bus against its capacity, and the trips and
+bills that took the most.
+
+``BillTotal``, ``TripRevenue``, ``DailyRevenue`` and ``BusUtilisation`` only
+change when bills or items do, but a bulk import or restoring archived
+trips can change many of them at once. ``rebuild_aggregates`` splits the
+days of journey of the live and archived trips into ranges and recomputes
+every range independently: the totals of the bills are summed by the
+database from the prices captured on the items, with one grouped query per
+bill table, the other figures are rolled up from them, and the results are
+written with bulk upserts. A
+range only touches rows keyed by its own days, so ranges can be handed to a
+pool of worker processes, each with its own database connection, and the
+rebuild scales with the number of cores the database can keep busy.
+
+The amounts are the ``unit_price`` captured on each item when it was
+priced, never the current price of its ``Weight``. Correcting the price of
+a weight therefore changes nothing in a rebuild: the items it should apply
+to have to be repriced first (``pricing.reprice_items``, which leaves
+settled bills alone), and a rebuild then picks up their new prices.
+
+Every row written by a rebuild is stamped with the time the range started;
+rows of the range left with an older stamp belong to bills or trips that
+no longer exist and are deleted.
+"""
+
+import datetime
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from decimal import Decimal
+
+from django.db import connections, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Max, Min, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    BillTotal,
+    BusUtilisation,
+    DailyRevenue,
+    LuggageBill,
+    Trip,
+    TripRevenue,
+)
+
+# Trips and bills listed by the revenue report, the ones that took the most first.
+REPORT_TOP = 20
+
+# Bill and trip tables summed, and whether they hold archived rows.
+AGGREGATE_SOURCES = [
+    (LuggageBill, Trip, False),
+    (ArchivedLuggageBill, ArchivedTrip, True),
+]
+
+
+def journey_range(start, end):
+    """Return the aware datetimes bounding the local days ``start`` to ``end``, both inclusive."""
+    tz = timezone.get_current_timezone()
+    return (
+        datetime.datetime.combine(start, datetime.time.min, tz),
+        datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tz),
+    )
+
+
+def journey_days():
+    """Return the first and last local day having trips or trip aggregates.
+
+    Days left with aggregates only are included so that their stale rows are removed.
+    """
+    days = [TripRevenue.objects.aggregate(first=Min("day"), last=Max("day"))]
+    for _, trip_model, _ in AGGREGATE_SOURCES:
+        bounds = trip_model._base_manager.aggregate(first=Min("date_of_journey"), last=Max("date_of_journey"))
+        if bounds["first"] is not None:
+            days.append({"first": timezone.localdate(bounds["first"]), "last": timezone.localdate(bounds["last"])})
+    first = [bounds["first"] for bounds in days if bounds["first"] is not None]
+    last = [bounds["last"] for bounds in days if bounds["last"] is not None]
+    return min(first, default=None), max(last, default=None)
+
+
+def partition_days(start, end, days):
+    """Split the local days ``start`` to ``end`` into ranges of ``days`` days."""
+    partitions = []
+    while start <= end:
+        last = min(start + datetime.timedelta(days=days - 1), end)
+        partitions.append((start, last))
+        start = last + datetime.timedelta(days=1)
+    return partitions
+
+
+def bill_totals(bill_model, since, until):
+    """Return the items, bags, kilograms and amount of the bills of trips leaving in ``[since, until)``."""
+    return (
+        bill_model._base_manager.filter(trip__date_of_journey__gte=since, trip__date_of_journey__lt=until)
+        .order_by()
+        .values("pk", "trip_id")
+        .annotate(
+            lines=Count("items"),
+            bags=Coalesce(Sum("items__quantity"), 0),
+            kilograms=Coalesce(Sum(F("items__quantity") * F("items__unit_weight"), output_field=IntegerField()), 0),
+            amount=Coalesce(
+                Sum(F("items__quantity") * F("items__unit_price"), output_field=DecimalField()),
+                Value(Decimal("0")),
+                output_field=DecimalField(),
+            ),
+        )
+    )
+
+
+def upsert(model, rows, unique_fields):
+    update_fields = [
+        field.name
+        for field in model._meta.concrete_fields
+        if field.name not in unique_fields and not field.primary_key
+    ]
+    model.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields
+    )
+
+
+def rebuild_partition(start, end):
+    """Recompute the aggregates of the trips leaving on the local days ``start`` to ``end``.
+
+    Returns the number of bills and trips summed.
+    """
+    refreshed = timezone.now()
+    since, until = journey_range(start, end)
+    bills, trips = [], []
+    for bill_model, trip_model, archived in AGGREGATE_SOURCES:
+        trip_rows = {
+            row["pk"]: row
+            for row in trip_model._base_manager.filter(date_of_journey__gte=since, date_of_journey__lt=until)
+            .order_by()
+            .values("pk", "bus_id", "departure_id", "destination_id", "date_of_journey", "bus__max_luggage_weight")
+        }
+        totals = defaultdict(lambda: {"bills": 0, "bags": 0, "kilograms": 0, "revenue": Decimal("0")})
+        for row in bill_totals(bill_model, since, until):
+            trip = trip_rows[row["trip_id"]]
+            bills.append(
+                BillTotal(
+                    bill=row["pk"],
+                    trip=row["trip_id"],
+                    day=timezone.localdate(trip["date_of_journey"]),
+                    items=row["lines"],
+                    bags=row["bags"],
+                    kilograms=row["kilograms"],
+                    amount=row["amount"],
+                    archived=archived,
+                    refreshed=refreshed,
+                )
+            )
+            total = totals[row["trip_id"]]
+            total["bills"] += 1
+            total["bags"] += row["bags"]
+            total["kilograms"] += row["kilograms"]
+            total["revenue"] += row["amount"]
+        for pk, trip in trip_rows.items():
+            trips.append(
+                (
+                    TripRevenue(
+                        trip=pk,
+                        bus_id=trip["bus_id"],
+                        departure_id=trip["departure_id"],
+                        destination_id=trip["destination_id"],
+                        day=timezone.localdate(trip["date_of_journey"]),
+                        archived=archived,
+                        refreshed=refreshed,
+                        **totals[pk],
+                    ),
+                    trip["bus__max_luggage_weight"],
+                )
+            )
+
+    daily = {}
+    buses = {}
+    for trip, max_luggage_weight in trips:
+        revenue = daily.setdefault(
+            (trip.day, trip.departure_id),
+            DailyRevenue(
+                day=trip.day,
+                park_id=trip.departure_id,
+                trips=0,
+                bills=0,
+                bags=0,
+                kilograms=0,
+                revenue=Decimal("0"),
+                refreshed=refreshed,
+            ),
+        )
+        revenue.trips += 1
+        revenue.bills += trip.bills
+        revenue.bags += trip.bags
+        revenue.kilograms += trip.kilograms
+        revenue.revenue += trip.revenue
+        utilisation = buses.setdefault(
+            (trip.day, trip.bus_id),
+            BusUtilisation(day=trip.day, bus_id=trip.bus_id, trips=0, kilograms=0, capacity=0, refreshed=refreshed),
+        )
+        utilisation.trips += 1
+        utilisation.kilograms += trip.kilograms
+        if max_luggage_weight is None or utilisation.capacity is None:
+            utilisation.capacity = None
+        else:
+            utilisation.capacity += max_luggage_weight
+
+    with transaction.atomic():
+        upsert(BillTotal, bills, ["bill"])
+        upsert(TripRevenue, [trip for trip, _ in trips], ["trip"])
+        upsert(DailyRevenue, list(daily.values()), ["day", "park"])
+        upsert(BusUtilisation, list(buses.values()), ["day", "bus"])
+        for model in (BillTotal, TripRevenue, DailyRevenue, BusUtilisation):
+            model.objects.filter(day__gte=start, day__lte=end, refreshed__lt=refreshed).delete()
+    return len(bills), len(trips)
+
+
+def rebuild_aggregates(start=None, end=None, days=7, workers=1, progress=None):
+    """Recompute the aggregates of the trips leaving on the local days ``start`` to ``end``.
+
+    The days are rebuilt ``days`` at a time by ``workers`` processes; with a
+    single worker everything runs in this process. ``progress`` is called
+    with ``(start, end, bills, trips)`` as each range finishes. Returns the
+    number of bills and trips summed.
+    """
+    first, last = journey_days()
+    start, end = start or first, end or last
+    if start is None or end is None:
+        return 0, 0
+    partitions = partition_days(start, end, days)
+    bills = trips = 0
+    if workers <= 1:
+        for partition in partitions:
+            counts = rebuild_partition(*partition)
+            bills, trips = bills + counts[0], trips + counts[1]
+            if progress:
+                progress(*partition, *counts)
+        return bills, trips
+
+    # Forked workers must open their own connections rather than share ours
+    connections.close_all()
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("fork")) as executor:
+        futures = {executor.submit(rebuild_partition, *partition): partition for partition in partitions}
+        for future in as_completed(futures):
+            counts = future.result()
+            bills, trips = bills + counts[0], trips + counts[1]
+            if progress:
+                progress(*futures[future], *counts)
+    return bills, trips
+
+
+def revenue_report(start, end, park=None):
+    """Report the revenue and bus utilisation of the local days ``start`` to ``end``.
+
+    Returns a dict with the ``days`` (``DailyRevenue`` per park and day),
+    the ``buses`` (``BusUtilisation`` per bus and day), and the ``trips`` and
+    ``bills`` that took the most, at most ``REPORT_TOP`` of each. With a
+    ``park``, only trips departing it are reported. Reads the aggregate
+    tables only, so it reflects the last rebuild.
+    """
+    days = DailyRevenue.objects.filter(day__gte=start, day__lte=end)
+    trips = TripRevenue.objects.filter(day__gte=start, day__lte=end)
+    buses = BusUtilisation.objects.filter(day__gte=start, day__lte=end)
+    bills = BillTotal.objects.filter(day__gte=start, day__lte=end)
+    if park is not None:
+        days = days.filter(park=park)
+        trips = trips.filter(departure=park)
+        buses = buses.filter(bus__in=trips.values("bus"))
+        bills = bills.filter(trip__in=trips.values("trip"))
+    return {
+        "days": list(days.select_related("park").order_by("-day", "park__location")),
+        "totals": days.aggregate(
+            trips=Coalesce(Sum("trips"), 0),
+            bills=Coalesce(Sum("bills"), 0),
+            bags=Coalesce(Sum("bags"), 0),
+            kilograms=Coalesce(Sum("kilograms"), 0),
+            revenue=Coalesce(Sum("revenue"), Value(Decimal("0")), output_field=DecimalField()),
+        ),
+        "buses": list(buses.select_related("bus").order_by("-day", "bus__plate_number")),
+        "trips": list(
+            trips.select_related("bus", "departure", "destination").order_by("-revenue", "-day")[:REPORT_TOP]
+        ),
+        "bills": list(bills.order_by("-amount", "-day")[:REPORT_TOP]),
+    }
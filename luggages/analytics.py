@@ -0,0 +1,334 @@
+"""Columnar analytics over luggage items.
+
+Questions like "revenue by bag size per route per week" used to loop over
+model instances and call ``Luggage.amount()``. ``load_items`` instead reads
+the integer keys of every item, joined through ``LuggageBill`` to its
+``Trip``, with one ``values_list(...).iterator()`` query into NumPy arrays.
+Prices and weights are the ones captured on the item, read in kobo and
+kilograms. Sizes and journey dates are not read per item. They come from
+the small ``BagType`` and ``Trip`` tables and are mapped onto the items with
+vectorised lookups, so no Python object is built per item beyond the row
+tuple the database driver returns. Only the columns a question needs are
+loaded, as 32-bit integers (64-bit once prices are), which bounds the
+memory to a few bytes per item and column.
+
+``ItemFrame`` then groups, sums, buckets by day, week or month and takes
+percentiles without Python loops over the items.
+"""
+
+import datetime
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+from .models import BagType, Bus, Luggage, ParkLocation, Trip, Weight
+
+# Item columns read from the database, by name.
+ITEM_FIELDS = {
+    "trip": "luggagebill__trip_id",
+    "departure": "luggagebill__trip__departure_id",
+    "destination": "luggagebill__trip__destination_id",
+    "bus": "luggagebill__trip__bus_id",
+    "bag_type": "bag_type_id",
+    "weight": "weight_id",
+    "quantity": "quantity",
+    "price": Cast(Round(F("unit_price") * 100), BigIntegerField()),
+    "min_weight": "unit_weight",
+}
+
+# Columns derived from other columns, with the item columns they need.
+DERIVED_FIELDS = {
+    "size": ["bag_type"],
+    "amount": ["price", "quantity"],
+    "kilograms": ["min_weight", "quantity"],
+    "journey": ["trip"],
+}
+
+# Columns looked up in a dimension table: the key column and the attribute.
+DIMENSION_COLUMNS = {
+    "size": ("bag_type", "size"),
+    "journey": ("trip", "journey"),
+}
+
+PERIODS = ("day", "week", "month")
+
+# Key columns spanning fewer values than this are grouped without sorting.
+DENSE_LIMIT = 1 << 20
+
+SIZE_CODES = {size: code for code, size in enumerate(BagType.SizeOption.values)}
+
+
+def local_day(value):
+    """Return the number of days from 1970-01-01 to the local day of ``value``."""
+    return (timezone.localdate(value) - datetime.date(1970, 1, 1)).days
+
+
+def lookup(keys, values, wanted):
+    """Map every id in ``wanted`` to the value of the matching id in ``keys``.
+
+    Ids missing from ``keys`` map to an arbitrary value, so callers must load
+    every id they can meet.
+    """
+    low, high = int(keys.min()), int(keys.max())
+    if high - low < DENSE_LIMIT * 16:
+        # Ids are dense enough for a direct table
+        table = np.zeros(high - low + 1, dtype=values.dtype)
+        table[keys - low] = values
+        return table[np.clip(wanted, low, high) - low]
+    order = np.argsort(keys)
+    positions = np.searchsorted(keys, wanted, sorter=order)
+    return values[order[np.minimum(positions, len(keys) - 1)]]
+
+
+def required_fields(columns):
+    fields = set()
+    for column in columns:
+        fields.update(DERIVED_FIELDS.get(column, [column]))
+    return sorted(fields)
+
+
+def load_items(columns, start=None, end=None, chunk_size=20000):
+    """Load the ``columns`` of every luggage item into an ``ItemFrame``.
+
+    ``start`` and ``end`` are optional local dates bounding the day of
+    journey, both inclusive.
+    """
+    items = Luggage.objects.order_by()
+    trips = Trip.objects.order_by()
+    tz = timezone.get_current_timezone()
+    if start is not None:
+        since = datetime.datetime.combine(start, datetime.time.min, tz)
+        items = items.filter(luggagebill__trip__date_of_journey__gte=since)
+        trips = trips.filter(date_of_journey__gte=since)
+    if end is not None:
+        until = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tz)
+        items = items.filter(luggagebill__trip__date_of_journey__lt=until)
+        trips = trips.filter(date_of_journey__lt=until)
+
+    fields = required_fields(columns)
+    rows = items.values_list(*[ITEM_FIELDS[field] for field in fields]).iterator(chunk_size)
+    # Prices in kobo can outgrow 32 bits
+    dtype = np.int64 if "price" in fields else np.int32
+    chunks = []
+    while chunk := list(islice(rows, chunk_size)):
+        chunks.append(np.array(chunk, dtype=dtype).reshape(len(chunk), len(fields)))
+    table = np.concatenate(chunks) if chunks else np.empty((0, len(fields)), dtype=dtype)
+    frame = ItemFrame({field: np.ascontiguousarray(table[:, index]) for index, field in enumerate(fields)})
+    del table, chunks
+
+    if "bag_type" in frame.columns:
+        bag_types = list(BagType.objects.values_list("pk", "size"))
+        frame.dimensions["bag_type"] = (
+            np.array([pk for pk, _ in bag_types], dtype=np.int32),
+            {"size": np.array([SIZE_CODES.get(size, -1) for _, size in bag_types], dtype=np.int32)},
+        )
+    if "trip" in frame.columns:
+        journeys = list(trips.values_list("pk", "date_of_journey").iterator(chunk_size))
+        frame.dimensions["trip"] = (
+            np.array([pk for pk, _ in journeys], dtype=np.int32),
+            {"journey": np.array([local_day(value) for _, value in journeys], dtype=np.int32)},
+        )
+    return frame
+
+
+class ItemFrame:
+    """Columns of luggage items, one NumPy array per column."""
+
+    def __init__(self, columns, dimensions=None):
+        self.columns = columns
+        self.dimensions = dimensions if dimensions is not None else {}
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def dimension(self, key, attribute):
+        keys, values = self.dimensions[key]
+        if not len(keys):
+            return np.zeros(len(self), dtype=np.int64)
+        return lookup(keys, values[attribute], self.columns[key])
+
+    def __getitem__(self, name):
+        """Return a loaded or derived column.
+
+        ``price`` and ``amount`` are in kobo, ``journey`` in days since
+        1970-01-01 and ``size`` is an index into ``BagType.SizeOption``.
+        """
+        if name in self.columns:
+            return self.columns[name]
+        if name in DIMENSION_COLUMNS:
+            return self.dimension(*DIMENSION_COLUMNS[name])
+        if name == "amount":
+            return self["price"] * self.columns["quantity"]
+        if name == "kilograms":
+            return self["min_weight"] * self.columns["quantity"]
+        raise KeyError(name)
+
+    def where(self, mask):
+        """Return a frame of the items selected by the boolean array ``mask``."""
+        return ItemFrame({name: column[mask] for name, column in self.columns.items()}, self.dimensions)
+
+    def bucket(self, name, period):
+        """Return the first day of the day, week or month of the day column ``name``."""
+        days = self[name].astype(np.int64)
+        if period == "week":
+            # 1970-01-01 was a Thursday; weeks start on Monday.
+            days = days - (days + 3) % 7
+        dates = days.astype("datetime64[D]")
+        if period == "month":
+            dates = dates.astype("datetime64[M]").astype("datetime64[D]")
+        return dates
+
+    def group_by(self, *keys):
+        """Group the items by the given columns or arrays."""
+        return Grouping([self[key] if isinstance(key, str) else key for key in keys])
+
+
+def integer_codes(key):
+    """Return codes counted from 0 for the values of ``key`` and how many codes there are.
+
+    Integer and date keys over a small range are numbered without sorting.
+    """
+    if key.dtype.kind == "M":
+        key = key.view(np.int64)
+    if key.dtype.kind in "iu" and len(key):
+        low, high = int(key.min()), int(key.max())
+        if high - low < DENSE_LIMIT:
+            offsets = key.astype(np.int64) - low
+            present = np.bincount(offsets) > 0
+            return (np.cumsum(present) - 1)[offsets], int(present.sum())
+    values, codes = np.unique(key, return_inverse=True)
+    return codes.reshape(-1), len(values)
+
+
+class Grouping:
+    """Items grouped by the distinct combinations of some key columns."""
+
+    def __init__(self, keys):
+        size = len(keys[0]) if keys else 0
+        combined = np.zeros(size, dtype=np.int64)
+        radix = 1
+        for key in keys:
+            codes, count = integer_codes(key)
+            if radix * count >= 1 << 62:
+                # Renumber the combinations seen so far before the combined key overflows
+                present, combined = np.unique(combined, return_inverse=True)
+                combined, radix = combined.reshape(-1), len(present)
+            combined = combined * count + codes
+            radix *= count
+        if radix <= DENSE_LIMIT * 16:
+            present = np.bincount(combined, minlength=radix) > 0
+            self.inverse = (np.cumsum(present) - 1)[combined]
+            # Any row of a group carries its key values
+            rows = np.empty(radix, dtype=np.int64)
+            rows[combined] = np.arange(size)
+            first = rows[present]
+        else:
+            _, first, self.inverse = np.unique(combined, return_index=True, return_inverse=True)
+            self.inverse = self.inverse.reshape(-1)
+        # One row per group, in the order of the combined key
+        self.keys = [key[first] for key in keys]
+
+    def __len__(self):
+        return len(self.keys[0]) if self.keys else 0
+
+    def count(self):
+        return np.bincount(self.inverse, minlength=len(self))
+
+    def sum(self, values):
+        return np.bincount(self.inverse, weights=values, minlength=len(self)).round().astype(np.int64)
+
+    def percentile(self, values, q):
+        """Return the ``q`` percentile (0 to 100) of ``values`` in every group.
+
+        Interpolates linearly like ``numpy.percentile``.
+        """
+        low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+        span = high - low + 1
+        if values.dtype.kind in "iu" and span * (len(self) + 1) < 1 << 62:
+            order = np.argsort(self.inverse * span + (values - low))
+        else:
+            order = np.lexsort((values, self.inverse))
+        ordered = values[order].astype(np.float64)
+        counts = self.count()
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        position = (counts - 1) * (q / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.minimum(lower + 1, counts - 1)
+        fraction = position - lower
+        return ordered[starts + lower] * (1 - fraction) + ordered[starts + upper] * fraction
+
+
+# Report groupings: the columns grouped on and how to label their values.
+REPORT_GROUPS = {
+    "size": ["size"],
+    "bag_type": ["bag_type"],
+    "weight": ["weight"],
+    "route": ["departure", "destination"],
+    "departure": ["departure"],
+    "destination": ["destination"],
+    "bus": ["bus"],
+}
+
+
+def label_maps(columns):
+    """Return, for each key column, a mapping from its values to display labels."""
+    labels = {}
+    if "size" in columns:
+        sizes = dict(BagType.SizeOption.choices)
+        labels["size"] = {code: str(sizes[size]) for size, code in SIZE_CODES.items()}
+    if "bag_type" in columns:
+        labels["bag_type"] = {
+            pk: f"{name} ({size})" for pk, name, size in BagType.objects.values_list("pk", "name", "size")
+        }
+    if "weight" in columns:
+        labels["weight"] = dict(Weight.objects.values_list("pk", "name"))
+    if {"departure", "destination"} & set(columns):
+        labels["departure"] = labels["destination"] = dict(ParkLocation.objects.values_list("pk", "location"))
+    if "bus" in columns:
+        labels["bus"] = dict(Bus.objects.values_list("pk", "plate_number"))
+    return labels
+
+
+def naira(kobo):
+    return Decimal(int(round(kobo))).scaleb(-2)
+
+
+def luggage_report(group_by=("size",), period="week", start=None, end=None, percentiles=(50, 90), loader=None):
+    """Summarise the luggage items by period of journey and ``group_by`` groupings.
+
+    Returns one dict per group, ordered by period then group, with the number
+    of items, bags and kilograms, the revenue and the given percentiles of
+    the item amounts. Amounts are in naira. Items are read from the database
+    unless another ``loader``, such as ``snapshots.load_snapshot``, is given.
+    """
+    keys = [column for name in group_by for column in REPORT_GROUPS[name]]
+    frame = (loader or load_items)(keys + ["amount", "kilograms"] + (["journey"] if period else []), start, end)
+    if not len(frame):
+        return []
+    group_keys = ([frame.bucket("journey", period)] if period else []) + keys
+    grouping = frame.group_by(*(group_keys or [np.zeros(len(frame), dtype=np.int8)]))
+    amount = frame["amount"]
+    totals = {
+        "items": grouping.count(),
+        "bags": grouping.sum(frame["quantity"]),
+        "kilograms": grouping.sum(frame["kilograms"]),
+        "revenue": grouping.sum(amount),
+    }
+    quantiles = {q: grouping.percentile(amount, q) for q in percentiles}
+    labels = label_maps(keys)
+
+    report = []
+    for index in range(len(grouping)):
+        values = [key[index].item() for key in grouping.keys]
+        row = {"period": values.pop(0)} if period else {}
+        for name in group_by:
+            row[name] = " to ".join(labels[column].get(values.pop(0), "") for column in REPORT_GROUPS[name])
+        row.update({name: int(total[index]) for name, total in totals.items()})
+        row["revenue"] = naira(row["revenue"])
+        row.update({f"p{q:g}": naira(value[index]) for q, value in quantiles.items()})
+        report.append(row)
+    return report
@@ -0,0 +1,139 @@
+"""Moving completed trips, with their bills, items and bag tags, to archive tables.
+
+Staff only work with the last few weeks of trips, yet every changelist,
+index and backup pays for the whole history. ``archive_trips`` moves trips
+whose journey is older than ``LUGGAGE_ARCHIVE_AFTER_DAYS`` into the
+``Archived*`` tables, which keep the original ids and timestamps. Each batch
+of trips is copied and removed in one transaction, so a trip is always
+either live or archived. ``restore_trips`` moves trips back.
+
+The live rows are removed with plain ``DELETE`` statements, built through
+``connection.ops``, rather than through the delete collector, so no per-row
+signals fire; the per-day counts are adjusted once per batch instead.
+"""
+
+import datetime
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import (
+    ArchivedBagTag,
+    ArchivedLuggage,
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    BagTag,
+    BillSearchTrigram,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    Trip,
+)
+from .rollups import bump_daily_counts
+from .search import index_bills
+
+# Live model, archive model and the path from each to its trip, parents first.
+ARCHIVED_MODELS = [
+    (Trip, ArchivedTrip, "pk"),
+    (LuggageBill, ArchivedLuggageBill, "trip"),
+    (Luggage, ArchivedLuggage, "luggagebill__trip"),
+    (BagTag, ArchivedBagTag, "luggage__luggagebill__trip"),
+]
+
+
+def archive_cutoff(days=None):
+    """Return the journey date before which trips are archived."""
+    if days is None:
+        days = settings.LUGGAGE_ARCHIVE_AFTER_DAYS
+    return timezone.now() - datetime.timedelta(days=days)
+
+
+def copied_fields(source, target):
+    """Return the attnames of the concrete fields both models have."""
+    names = {field.attname for field in target._meta.concrete_fields}
+    return [field.attname for field in source._meta.concrete_fields if field.attname in names]
+
+
+def copy_rows(source, target, trip_path, trip_ids, using):
+    fields = copied_fields(source, target)
+    rows = list(source._base_manager.using(using).filter(**{f"{trip_path}__in": trip_ids}).values(*fields))
+    instances = target._base_manager.using(using).bulk_create([target(**row) for row in rows], batch_size=1000)
+    if not target._meta.get_field("created").auto_now_add:
+        return instances
+    # auto_now_add and auto_now stamped the restored rows; put the original timestamps back
+    for instance, row in zip(instances, rows):
+        instance.created, instance.updated = row["created"], row["updated"]
+    target._base_manager.using(using).bulk_update(instances, ["created", "updated"], batch_size=1000)
+    return instances
+
+
+def delete_rows(model, column, values, using):
+    """Delete the rows of ``model`` whose ``column`` is one of ``values``.
+
+    The rows are removed with plain ``DELETE`` statements. ``QuerySet.delete()``
+    with the signal receivers disconnected would do the same, but disconnecting
+    is process wide and would silence the receivers of every other thread
+    meanwhile, and the delete collector would still fetch each row to cascade.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    field = model._meta.get_field(column)
+    sql = f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(field.column)} IN (%s)"
+    batch_size = max(connection.ops.bulk_batch_size([field], values), 1)
+    with connection.cursor() as cursor:
+        for start in range(0, len(values), batch_size):
+            batch = values[start : start + batch_size]
+            cursor.execute(sql % ", ".join(["%s"] * len(batch)), batch)
+
+
+def archive_trips(before=None, batch_size=None, using="default"):
+    """Archive the trips whose journey started before ``before``.
+
+    Returns the number of trips archived.
+    """
+    before = before or archive_cutoff()
+    batch_size = batch_size or settings.LUGGAGE_ARCHIVE_BATCH_SIZE
+    archived = 0
+    while True:
+        trip_ids = list(
+            Trip.objects.using(using)
+            .filter(date_of_journey__lt=before)
+            .order_by("date_of_journey", "pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not trip_ids:
+            return archived
+        with transaction.atomic(using=using):
+            copied = {}
+            for source, target, trip_path in ARCHIVED_MODELS:
+                copied[source] = [row.pk for row in copy_rows(source, target, trip_path, trip_ids, using)]
+            bills = LuggageBill._base_manager.using(using).filter(trip__in=trip_ids)
+            journeys = list(
+                Trip.objects.using(using).filter(pk__in=trip_ids).values_list("date_of_journey", flat=True)
+            )
+            bump_daily_counts(DailyCount.Kind.BILL_CREATED, bills.values_list("created", flat=True), -1)
+            bump_daily_counts(DailyCount.Kind.TRIP_JOURNEY, journeys, -1)
+            delete_rows(BillSearchTrigram, "bill", copied[LuggageBill], using)
+            for source, _, _ in reversed(ARCHIVED_MODELS):
+                delete_rows(source, source._meta.pk.name, copied[source], using)
+        archived += len(trip_ids)
+
+
+def restore_trips(trip_ids, using="default"):
+    """Move the archived trips ``trip_ids`` back to the live tables.
+
+    Returns the number of trips restored.
+    """
+    trip_ids = list(ArchivedTrip.objects.using(using).filter(pk__in=trip_ids).values_list("pk", flat=True))
+    if not trip_ids:
+        return 0
+    with transaction.atomic(using=using):
+        restored = {}
+        for source, target, trip_path in ARCHIVED_MODELS:
+            restored[source] = copy_rows(target, source, trip_path, trip_ids, using)
+        bump_daily_counts(DailyCount.Kind.BILL_CREATED, [bill.created for bill in restored[LuggageBill]], 1)
+        bump_daily_counts(DailyCount.Kind.TRIP_JOURNEY, [trip.date_of_journey for trip in restored[Trip]], 1)
+        index_bills(restored[LuggageBill], using)
+        ArchivedTrip.objects.using(using).filter(pk__in=trip_ids).delete()
+    return len(trip_ids)
@@ -0,0 +1,137 @@
+"""Operational figures shown on the admin index, computed once and shared through the cache.
+
+Staff land on the admin index at shift start all at once, so the
+dashboard must not run its aggregates per request. ``dashboard`` returns
+the figures from the cache and recomputes them when they are older than
+``LUGGAGE_DASHBOARD_CACHE_TIMEOUT`` seconds, or a few seconds after a bill,
+item or trip was written (``signals.py`` calls ``mark_dashboard_stale``
+once per transaction, when it commits). Only the request that wins the refresh lock recomputes;
+everybody else is served the previous figures meanwhile. The stale flag
+and the lock only work across processes with a shared cache backend,
+which ``CACHES`` in the settings configures.
+"""
+
+import datetime
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, DecimalField, F, IntegerField, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import DailyCount, Luggage, Trip
+
+CACHE_KEY = "luggages:dashboard"
+STALE_KEY = "luggages:dashboard:stale"
+LOCK_KEY = "luggages:dashboard:lock"
+
+# Figures are recomputed at most this often after writes, in seconds.
+MIN_REFRESH_INTERVAL = 5
+# How long a refresh may take before another request takes it over, in seconds.
+LOCK_TIMEOUT = 60
+
+UPCOMING_HOURS = 6
+TOP_PARKS = 5
+
+
+def compute_dashboard():
+    """Aggregate today's bills, bags and revenue, the departures of the next hours and the top parks."""
+    now = timezone.now()
+    today = timezone.localdate(now)
+    since = datetime.datetime.combine(today, datetime.time.min, timezone.get_current_timezone())
+    items = Luggage.objects.filter(luggagebill__created__gte=since).order_by()
+    totals = items.aggregate(
+        bags=Coalesce(Sum("quantity"), 0),
+        revenue=Coalesce(
+            Sum(F("quantity") * F("unit_price"), output_field=DecimalField()),
+            Decimal("0"),
+            output_field=DecimalField(),
+        ),
+    )
+    bills = (
+        DailyCount.objects.filter(kind=DailyCount.Kind.BILL_CREATED, day=today).values_list("count", flat=True).first()
+        or 0
+    )
+
+    departures = list(
+        Trip.objects.filter(
+            date_of_journey__gte=now, date_of_journey__lt=now + datetime.timedelta(hours=UPCOMING_HOURS)
+        )
+        .select_related("bus", "departure", "destination")
+        .annotate(
+            bills=Count("luggagebills", distinct=True),
+            kilograms=Coalesce(
+                Sum(
+                    F("luggagebills__items__quantity") * F("luggagebills__items__unit_weight"),
+                    output_field=IntegerField(),
+                ),
+                0,
+            ),
+        )
+        .order_by("date_of_journey", "pk")
+    )
+    parks = (
+        items.values("luggagebill__trip__departure__location")
+        .annotate(
+            bills=Count("luggagebill", distinct=True),
+            revenue=Sum(F("quantity") * F("unit_price"), output_field=DecimalField()),
+        )
+        .order_by("-revenue")[:TOP_PARKS]
+    )
+    return {
+        "computed": now,
+        "bills": bills,
+        "bags": totals["bags"],
+        "revenue": totals["revenue"],
+        "departures": [
+            {
+                "id": trip.pk,
+                "name": trip.name,
+                "date_of_journey": trip.date_of_journey,
+                "bus": trip.bus.plate_number,
+                "route": f"{trip.departure.location} to {trip.destination.location}",
+                "bills": trip.bills,
+                "kilograms": trip.kilograms,
+                "load": trip.kilograms / trip.bus.max_luggage_weight if trip.bus.max_luggage_weight else None,
+            }
+            for trip in departures
+        ],
+        "parks": [
+            {
+                "park": park["luggagebill__trip__departure__location"],
+                "bills": park["bills"],
+                "revenue": park["revenue"],
+            }
+            for park in parks
+        ],
+    }
+
+
+def mark_dashboard_stale():
+    """Have the dashboard recomputed soon after a write."""
+    # Reading first spares the database cache a write, and its cull count, while the flag is already set
+    if cache.get(STALE_KEY) is None:
+        cache.add(STALE_KEY, True, None)
+
+
+def dashboard():
+    """Return the dashboard figures, recomputing them if they are out of date and nobody else is."""
+    entry = cache.get(CACHE_KEY)
+    if entry is not None:
+        age = time.time() - entry["refreshed"]
+        if age < settings.LUGGAGE_DASHBOARD_CACHE_TIMEOUT and (age < MIN_REFRESH_INTERVAL or not cache.get(STALE_KEY)):
+            return entry["figures"]
+    locked = cache.add(LOCK_KEY, True, LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        # Another request is refreshing the figures
+        return entry["figures"]
+    try:
+        cache.delete(STALE_KEY)
+        figures = compute_dashboard()
+        cache.set(CACHE_KEY, {"refreshed": time.time(), "figures": figures}, None)
+    finally:
+        if locked:
+            cache.delete(LOCK_KEY)
+    return figures
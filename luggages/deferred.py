@@ -0,0 +1,91 @@
+"""Derived data refreshed once per transaction, when it commits.
+
+Signals fire per row, so a bill saved with its items, or a trip deleted
+with all its bills, would refresh the same summary, bump the same per-day
+count or mark the dashboard stale once per row, inside the writer's
+transaction and holding the locks of those rows until it ends. Instead the
+signals hand their keys to ``refresh_on_commit``, their deltas to
+``count_on_commit`` and their calls to ``call_on_commit``, and everything a
+transaction collects is applied by a single ``on_commit`` callback once it
+committed. Outside a transaction the work is done right away.
+
+Django has no rollback hook, but a rolled back transaction or savepoint
+discards its ``on_commit`` callbacks, and the collected work with them."""
+
+import threading
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+# The work collected for the open transaction of each thread.
+_local = threading.local()
+
+
+class PendingWork:
+    """The keys, deltas and calls collected for one transaction."""
+
+    def __init__(self):
+        self.keys = defaultdict(set)
+        self.counts = defaultdict(Counter)
+        self.calls = {}
+        self.registered = False
+        self.done = False
+
+    def __call__(self):
+        if self.done:
+            return
+        self.done = True
+        for refresh, keys in self.keys.items():
+            if keys:
+                refresh(keys)
+        for apply, counts in self.counts.items():
+            counts = {key: delta for key, delta in counts.items() if delta}
+            if counts:
+                apply(counts)
+        for call in self.calls:
+            call()
+
+
+def pending_work():
+    """Return the work collected for the open transaction, starting it if there is none."""
+    connection = transaction.get_connection()
+    work = getattr(_local, "work", None)
+    if work is not None and not work.done and work.registered and connection.in_atomic_block:
+        if connection.run_on_commit is _local.hooks:
+            return work
+        # A savepoint rollback rebuilds the list of callbacks; look whether ours survived it
+        if any(callback is work for _, callback, _ in connection.run_on_commit):
+            _local.hooks = connection.run_on_commit
+            return work
+    work = _local.work = PendingWork()
+    return work
+
+
+def schedule(work):
+    if work.registered:
+        return
+    work.registered = True
+    connection = transaction.get_connection()
+    transaction.on_commit(work)
+    _local.hooks = connection.run_on_commit
+
+
+def refresh_on_commit(refresh, keys):
+    """Have ``refresh`` recompute the set of ``keys`` once the current transaction commits."""
+    work = pending_work()
+    work.keys[refresh].update(keys)
+    schedule(work)
+
+
+def count_on_commit(apply, counts):
+    """Have ``apply`` add the summed ``{key: delta}`` ``counts`` once the current transaction commits."""
+    work = pending_work()
+    work.counts[apply].update(counts)
+    schedule(work)
+
+
+def call_on_commit(call):
+    """Have ``call`` run once when the current transaction commits."""
+    work = pending_work()
+    work.calls[call] = None
+    schedule(work)
@@ -0,0 +1,29 @@
+from django.contrib import admin
+
+from .rollups import daily_count_kind, daily_count_totals, day_filters_for
+
+
+class DailyCountDateFieldListFilter(admin.DateFieldListFilter):
+    """Date filter whose facet counts are read from the per-day ``DailyCount`` rows.
+
+    Falls back to the regular aggregate over the table when the changelist is
+    narrowed by a search or another filter.
+    """
+
+    def get_facet_queryset(self, changelist):
+        kind = daily_count_kind(changelist.model, self.field_path)
+        day_filters = day_filters_for(changelist, self.field_path) if kind else None
+        if day_filters is None:
+            return super().get_facet_queryset(changelist)
+        # The facets count each link regardless of the link currently selected.
+        for lookup in ("day__gte", "day__lt"):
+            day_filters.pop(lookup, None)
+        ranges = {}
+        for i, (_, param_dict) in enumerate(self.links):
+            since = param_dict.get(self.lookup_kwarg_since)
+            until = param_dict.get(self.lookup_kwarg_until)
+            ranges[f"{i}__c"] = (
+                since.date() if hasattr(since, "date") else since,
+                until.date() if hasattr(until, "date") else until,
+            )
+        return daily_count_totals(kind, ranges, **day_filters)
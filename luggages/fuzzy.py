@@ -0,0 +1,189 @@
+"""In-memory typo-tolerant index over customer names.
+
+Clerks look up returning customers by name and misspell them often enough to
+create duplicates. ``CustomerIndex`` keeps every normalised full name in
+memory together with two inverted indexes, one from padded trigrams and one
+from the Soundex key of each word, and ranks candidates by trigram (Dice)
+similarity with a bonus for words that sound alike. The index is loaded once
+per process and refreshed incrementally from ``Customer.updated`` before each
+lookup, so a query costs one indexed ``updated >= ?`` probe plus dictionary
+work. ``updated`` is stamped when a row is saved, not when its transaction
+commits, so each refresh reads ``WATERMARK_OVERLAP`` before the newest stamp
+seen again rather than miss a slow writer's rows.
+
+Finding duplicates ranks every customer against the others, which is far
+too slow for a request on a large table. ``find_duplicates`` stores the
+pairs as ``CustomerDuplicate`` rows instead, from the
+``findduplicatecustomers`` command, and the admin report reads those.
+"""
+
+import datetime
+import threading
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Customer, CustomerDuplicate, normalize_search_text
+from .search import document_trigrams
+
+SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"),
+    **dict.fromkeys("cgjkqsxz", "2"),
+    **dict.fromkeys("dt", "3"),
+    "l": "4",
+    **dict.fromkeys("mn", "5"),
+    "r": "6",
+}
+
+# Postings scanned per lookup; the rarest trigrams of the query are used first.
+MAX_POSTINGS = 10000
+PHONETIC_WEIGHT = 0.25
+# Lowest score kept by ``find_duplicates``, and so offered by the duplicates report.
+DUPLICATE_MIN_SCORE = 0.5
+# Customers changed this long before the newest change seen are read again, in
+# case their transaction had not committed when the index was last refreshed.
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+
+
+def soundex(word):
+    """Return the four character Soundex key of ``word``."""
+    letters = [char for char in word if char.isalpha()]
+    if not letters:
+        return word
+    key = letters[0].upper()
+    previous = SOUNDEX_CODES.get(letters[0], "")
+    for char in letters[1:]:
+        code = SOUNDEX_CODES.get(char, "")
+        if code and code != previous:
+            key += code
+        if char not in "hw":
+            previous = code
+    return (key + "000")[:4]
+
+
+def phonetic_keys(name):
+    """Return the Soundex keys of the words of a normalised name."""
+    return {soundex(word) for word in name.split()}
+
+
+def name_features(name):
+    """Return the trigrams and phonetic keys of a normalised name."""
+    return frozenset(document_trigrams(name)), frozenset(phonetic_keys(name))
+
+
+def similarity(query_features, name_features):
+    """Score how alike two names are, from 0 to 1.25, given their features."""
+    query_trigrams, query_keys = query_features
+    name_trigrams, name_keys = name_features
+    if not query_trigrams or not name_trigrams:
+        return 0.0
+    dice = 2 * len(query_trigrams & name_trigrams) / (len(query_trigrams) + len(name_trigrams))
+    return dice + PHONETIC_WEIGHT * len(query_keys & name_keys) / len(query_keys)
+
+
+class CustomerIndex:
+    """Trigram and phonetic inverted indexes over ``Customer.fullname``."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.names = {}
+        self.features = {}
+        self.trigrams = defaultdict(set)
+        self.phonetic = defaultdict(set)
+        self.last_updated = None
+
+    def add(self, pk, fullname):
+        self.discard(pk)
+        name = normalize_search_text(fullname)
+        self.names[pk] = name
+        self.features[pk] = trigrams, keys = name_features(name)
+        for trigram in trigrams:
+            self.trigrams[trigram].add(pk)
+        for key in keys:
+            self.phonetic[key].add(pk)
+
+    def discard(self, pk):
+        self.names.pop(pk, None)
+        trigrams, keys = self.features.pop(pk, ((), ()))
+        for trigram in trigrams:
+            self.trigrams[trigram].discard(pk)
+        for key in keys:
+            self.phonetic[key].discard(pk)
+
+    def refresh(self):
+        """Load the customers created, renamed or deleted since the last refresh."""
+        customers = Customer.objects.order_by()
+        if self.last_updated is not None:
+            customers = customers.filter(updated__gte=self.last_updated - WATERMARK_OVERLAP)
+        with self.lock:
+            for pk, fullname, updated, deleted in customers.values_list(
+                "pk", "fullname", "updated", "deleted"
+            ).iterator():
+                if deleted is None:
+                    self.add(pk, fullname)
+                else:
+                    self.discard(pk)
+                if self.last_updated is None or updated > self.last_updated:
+                    self.last_updated = updated
+
+    def search(self, query, limit=10, min_score=0.3):
+        """Return up to ``limit`` ``(pk, score)`` pairs, best match first."""
+        self.refresh()
+        return self.rank(query, limit, min_score)
+
+    def rank(self, query, limit=10, min_score=0.3):
+        """Rank the indexed names against ``query`` without refreshing first."""
+        query = normalize_search_text(query)
+        if not query:
+            return []
+        query_features = name_features(query)
+        candidates = Counter()
+        scanned = 0
+        with self.lock:
+            postings = [self.trigrams.get(trigram, ()) for trigram in query_features[0]]
+            postings += [self.phonetic.get(key, ()) for key in query_features[1]]
+            for posting in sorted(postings, key=len):
+                if scanned and scanned + len(posting) > MAX_POSTINGS:
+                    break
+                candidates.update(posting)
+                scanned += len(posting)
+            scored = [
+                (pk, similarity(query_features, self.features[pk]))
+                for pk, _ in candidates.most_common(limit * 20)
+                if pk in self.features
+            ]
+        scored = [(pk, score) for pk, score in scored if score >= min_score]
+        scored.sort(key=lambda match: (-match[1], self.names.get(match[0], "")))
+        return scored[:limit]
+
+    def duplicate_candidates(self, min_score=0.8, limit=10):
+        """Yield ``(pk, other_pk, score)`` for pairs of customers that look alike."""
+        self.refresh()
+        for pk, name in sorted(self.names.copy().items()):
+            for other_pk, score in self.rank(name, limit=limit + 1, min_score=min_score):
+                if other_pk > pk:
+                    yield pk, other_pk, score
+
+
+customer_index = CustomerIndex()
+
+
+def find_duplicates(min_score=DUPLICATE_MIN_SCORE, batch_size=1000):
+    """Replace the stored ``CustomerDuplicate`` pairs with the current ones and return how many there are."""
+    refreshed = timezone.now()
+    pairs = (
+        CustomerDuplicate(customer_id=pk, other_id=other_pk, score=score, refreshed=refreshed)
+        for pk, other_pk, score in customer_index.duplicate_candidates(min_score=min_score)
+    )
+    count = 0
+    with transaction.atomic():
+        CustomerDuplicate.objects.all().delete()
+        while batch := list(islice(pairs, batch_size)):
+            CustomerDuplicate.objects.bulk_create(batch)
+            count += len(batch)
+    return count
@@ -0,0 +1,600 @@
+"""Streaming bulk importers used by the ``importdata`` management command.
+
+Rows are read lazily from CSV or JSONL files and processed in fixed-size
+batches, so memory use stays constant regardless of the file size. Each batch
+is validated in Python (field validators only, no per-row queries), related
+objects are resolved with one query per batch and valid rows are written with
+a single upsert. Rejected rows are reported to a JSONL side file together with
+their line number and validation errors.
+"""
+
+import csv
+import datetime
+import io
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .dashboard import mark_dashboard_stale
+from .models import (
+    BagType,
+    Bus,
+    Customer,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    Trip,
+    Weight,
+    max_trip_duration,
+)
+from .pricing import pricing_engine
+from .rollups import rebuild_daily_count_days, rebuild_daily_counts
+from .search import reindex_bills
+from .sequences import assign_receipt_numbers
+from .summaries import (
+    refresh_customer_summaries,
+    refresh_route_week_keys,
+    refresh_staff_days,
+    route_week_key,
+)
+from .tags import sync_bag_tags
+
+FORMATS = ("csv", "jsonl")
+
+
+def detect_format(path):
+    """Guess the file format from the file extension."""
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson"):
+        return "jsonl"
+    return "csv"
+
+
+@dataclass
+class UnreadableLine:
+    """A JSONL line that does not hold a JSON object, rejected with ``error``."""
+
+    text: str
+    error: str
+
+
+def read_rows(path, fmt):
+    """Yield ``(line_number, row)`` pairs from a CSV or JSONL file.
+
+    JSONL lines that are not a JSON object are yielded as ``UnreadableLine``
+    so the importer can reject them without stopping the import.
+    """
+    with open(path, newline="", encoding="utf-8") as handle:
+        if fmt == "jsonl":
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_number, UnreadableLine(line.rstrip("\n"), f"Invalid JSON: {error}")
+                    continue
+                if not isinstance(row, dict):
+                    yield line_number, UnreadableLine(line.rstrip("\n"), "Expected a JSON object.")
+                    continue
+                yield line_number, row
+        else:
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+
+
+def batched(iterable, size):
+    """Split an iterable into lists of at most ``size`` items."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class RejectWriter:
+    """Write rejected rows to a JSONL side file, opened on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._handle = None
+
+    def write(self, line_number, row, errors):
+        if self._handle is None:
+            self._handle = open(self.path, "w", encoding="utf-8")
+        record = {"line": line_number, "row": row, "errors": errors}
+        self._handle.write(json.dumps(record, default=str) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+
+
+@dataclass
+class ImportResult:
+    """Counters reported back to the management command."""
+
+    imported: int = 0
+    rejected: int = 0
+
+
+def clean_fields(model, row, field_names):
+    """Run the model field validators over ``row`` without touching the database.
+
+    Returns:
+        dict: The cleaned values keyed by field name.
+
+    Raises:
+        ValidationError: With an error dict for every invalid field.
+    """
+    values, errors = {}, {}
+    for name in field_names:
+        field = model._meta.get_field(name)
+        raw = row.get(name)
+        if isinstance(raw, str):
+            raw = raw.strip()
+        try:
+            values[name] = field.clean(raw if raw != "" else None, None)
+        except ValidationError as error:
+            errors[name] = error.messages
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+def error_messages(error):
+    """Flatten a ValidationError into a JSON friendly structure."""
+    if hasattr(error, "error_dict"):
+        return error.message_dict
+    return {"__all__": error.messages}
+
+
+class BaseImporter:
+    """Validate and upsert rows of a single model in batches.
+
+    Subclasses implement :meth:`build` to turn a raw row into an unsaved model
+    instance and may implement :meth:`prepare` to resolve related objects for a
+    whole batch at once.
+    """
+
+    model = None
+    unique_fields = []
+    update_fields = []
+
+    def __init__(self, rejects, batch_size=2000, use_copy=True, using="default"):
+        self.rejects = rejects
+        self.batch_size = batch_size
+        self.using = using
+        self.use_copy = use_copy and connections[using].vendor == "postgresql"
+
+    def prepare(self, rows):
+        """Load whatever related objects the rows of a batch refer to."""
+
+    def build(self, row):
+        """Return an unsaved instance for ``row`` or raise ValidationError."""
+        raise NotImplementedError
+
+    def finish(self, result):
+        """Refresh whatever derived data the imported rows invalidated."""
+
+    def run(self, rows):
+        result = ImportResult()
+        for batch in batched(rows, self.batch_size):
+            valid = self.validate(batch, result)
+            if not valid:
+                continue
+            try:
+                with transaction.atomic(using=self.using):
+                    self.write([instance for _, _, instance in valid])
+            except DatabaseError as error:
+                for line_number, row, _ in valid:
+                    self.reject(line_number, row, {"__all__": [str(error)]}, result)
+                continue
+            result.imported += len(valid)
+        if result.imported:
+            self.finish(result)
+        return result
+
+    def validate(self, batch, result):
+        for line_number, row in batch:
+            if isinstance(row, UnreadableLine):
+                self.reject(line_number, row.text, {"__all__": [row.error]}, result)
+        batch = [(line_number, row) for line_number, row in batch if not isinstance(row, UnreadableLine)]
+        self.prepare([row for _, row in batch])
+        valid = {}
+        for line_number, row in batch:
+            try:
+                instance = self.build(row)
+            except ValidationError as error:
+                self.reject(line_number, row, error_messages(error), result)
+                continue
+            # Later rows win when a batch repeats a key; an upsert cannot touch the same row twice.
+            key = tuple(getattr(instance, name) for name in self.unique_fields) or line_number
+            previous = valid.pop(key, None)
+            if previous is not None:
+                fields = ", ".join(self.unique_fields)
+                self.reject(
+                    previous[0],
+                    previous[1],
+                    {"__all__": [f"Replaced by line {line_number}, which repeats its {fields}."]},
+                    result,
+                )
+            valid[key] = (line_number, row, instance)
+        return list(valid.values())
+
+    def reject(self, line_number, row, errors, result):
+        self.rejects.write(line_number, row, errors)
+        result.rejected += 1
+
+    def write(self, instances):
+        if self.use_copy:
+            self.copy_upsert(instances)
+        else:
+            self.model.objects.using(self.using).bulk_create(
+                instances,
+                update_conflicts=True,
+                unique_fields=self.unique_fields,
+                update_fields=self.update_fields,
+            )
+
+    def copy_upsert(self, instances):
+        """Upsert through ``COPY`` into a staging table on PostgreSQL."""
+        connection = connections[self.using]
+        opts = self.model._meta
+        fields = [field for field in opts.concrete_fields if not field.primary_key]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        table = connection.ops.quote_name(opts.db_table)
+        staging = connection.ops.quote_name(f"{opts.db_table}_import")
+        conflict = ", ".join(connection.ops.quote_name(opts.get_field(name).column) for name in self.unique_fields)
+        updates = ", ".join(
+            "{0} = EXCLUDED.{0}".format(connection.ops.quote_name(opts.get_field(name).column))
+            for name in self.update_fields
+        )
+        rows = [
+            [field.get_db_prep_save(field.pre_save(instance, True), connection) for field in fields]
+            for instance in instances
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA")
+            raw = cursor.cursor
+            if hasattr(raw, "copy"):
+                # psycopg 3
+                with raw.copy(f"COPY {staging} ({columns}) FROM STDIN") as copy:
+                    for values in rows:
+                        copy.write_row(values)
+            else:
+                # psycopg2
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(rows)
+                buffer.seek(0)
+                raw.copy_expert(f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+                f"ON CONFLICT ({conflict}) DO UPDATE SET {updates}"
+            )
+
+
+class CustomerImporter(BaseImporter):
+    """Import customers, upserting on the unique full name.
+
+    A customer marked deleted and imported again is restored.
+    """
+
+    model = Customer
+    fields = ["fullname", "email", "address", "next_of_kin", "next_of_kin_phonenumber"]
+    unique_fields = ["fullname"]
+    update_fields = ["email", "address", "next_of_kin", "next_of_kin_phonenumber", "deleted", "updated"]
+
+    def build(self, row):
+        return Customer(**clean_fields(Customer, row, self.fields))
+
+
+class TripImporter(BaseImporter):
+    """Import trips, upserting on the generated trip name.
+
+    Expected columns: ``bus`` (plate number), ``departure`` and ``destination``
+    (park locations) and ``date_of_journey`` (ISO 8601), and optionally
+    ``duration`` (``HH:MM:SS`` or ISO 8601). Unknown buses are created, and
+    buses marked deleted restored, when the row also carries a
+    ``driver_name``. Trips without a duration get the default one. Like
+    ``Trip.clean``, rows that would double-book their bus are rejected.
+    """
+
+    model = Trip
+    unique_fields = ["name"]
+    update_fields = ["bus", "departure", "destination", "date_of_journey", "duration", "updated"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.parks = {
+            park.location: (park.pk, park.state.short_code)
+            for park in ParkLocation.objects.using(self.using).alive().select_related("state")
+        }
+        self.buses = {}
+        self.deleted_buses = {}
+        self.journey_days = set()
+        self.route_weeks = set()
+
+    def prepare(self, rows):
+        # Files without a duration column leave the duration of existing trips alone
+        self.update_fields = [
+            name
+            for name in type(self).update_fields
+            if name != "duration" or any(str(row.get("duration") or "").strip() for row in rows)
+        ]
+        plates = {str(row.get("bus") or "").strip() for row in rows}
+        self.buses, self.deleted_buses = {}, {}
+        for plate, pk, deleted in (
+            Bus.objects.using(self.using).filter(plate_number__in=plates).values_list("plate_number", "pk", "deleted")
+        ):
+            (self.buses if deleted is None else self.deleted_buses)[plate] = pk
+        # A row giving the driver would create the bus, so it brings back a deleted one instead
+        restored = {str(row.get("bus") or "").strip() for row in rows if row.get("driver_name")}
+        restored &= self.deleted_buses.keys()
+        if restored:
+            Bus.objects.using(self.using).filter(plate_number__in=restored).restore()
+            for plate in restored:
+                self.buses[plate] = self.deleted_buses.pop(plate)
+        new_buses = {}
+        for row in rows:
+            plate = str(row.get("bus") or "").strip()
+            if plate in plates and plate not in self.buses and row.get("driver_name"):
+                try:
+                    new_buses[plate] = Bus(
+                        **clean_fields(Bus, {"plate_number": plate, **row}, ["plate_number", "driver_name"])
+                    )
+                except ValidationError:
+                    continue
+        if new_buses:
+            Bus.objects.using(self.using).bulk_create(new_buses.values(), ignore_conflicts=True)
+            self.buses.update(
+                Bus.objects.using(self.using)
+                .alive()
+                .filter(plate_number__in=new_buses)
+                .values_list("plate_number", "pk")
+            )
+
+    def build(self, row):
+        errors = {}
+        plate = str(row.get("bus") or "").strip()
+        try:
+            Bus.plate_number_validator(plate)
+        except ValidationError as error:
+            errors["bus"] = error.messages
+        else:
+            if plate in self.deleted_buses:
+                errors["bus"] = [f"Bus {plate!r} was deleted; give a driver_name to restore it."]
+            elif plate not in self.buses:
+                errors["bus"] = [f"Unknown bus {plate!r}."]
+        route = {}
+        for name in ("departure", "destination"):
+            location = str(row.get(name) or "").strip()
+            if location not in self.parks:
+                errors[name] = [f"Unknown park location {location!r}."]
+            else:
+                route[name] = self.parks[location]
+        date_of_journey = parse_datetime(str(row.get("date_of_journey") or "").strip())
+        if date_of_journey is None:
+            errors["date_of_journey"] = ["Enter a valid date/time."]
+        elif timezone.is_naive(date_of_journey):
+            date_of_journey = timezone.make_aware(date_of_journey)
+        duration = Trip._meta.get_field("duration").get_default()
+        if str(row.get("duration") or "").strip():
+            try:
+                duration = clean_fields(Trip, row, ["duration"])["duration"]
+            except ValidationError as error:
+                errors.update(error.message_dict)
+            else:
+                if not datetime.timedelta(0) < duration <= max_trip_duration():
+                    errors["duration"] = [f"Duration must be positive and at most {max_trip_duration()}."]
+        if not errors and route["departure"][0] == route["destination"][0]:
+            errors["__all__"] = ["Departure and destination locations must be different."]
+        if errors:
+            raise ValidationError(errors)
+        return Trip(
+            name=Trip.build_name(route["departure"][1], route["destination"][1], date_of_journey),
+            bus_id=self.buses[plate],
+            departure_id=route["departure"][0],
+            destination_id=route["destination"][0],
+            date_of_journey=date_of_journey,
+            duration=duration,
+        )
+
+    def validate(self, batch, result):
+        valid = super().validate(batch, result)
+        clashes = self.bus_clashes([instance for _, _, instance in valid])
+        for line_number, row, instance in valid:
+            if instance.name in clashes:
+                message = f"This bus is already booked for trip {clashes[instance.name]} at that time."
+                self.reject(line_number, row, {"bus": [message]}, result)
+        return [entry for entry in valid if entry[2].name not in clashes]
+
+    def bus_clashes(self, trips):
+        """Return the names of the ``trips`` double-booking their bus, mapped to the trip they clash with.
+
+        Checks the trips against the stored ones with one query, and against
+        the earlier trips of the batch.
+        """
+        if not trips:
+            return {}
+        # Stored trips the batch upserts are replaced, so they cannot clash
+        stored = (
+            Trip.objects.using(self.using)
+            .filter(
+                bus__in={trip.bus_id for trip in trips},
+                date_of_journey__gt=min(trip.date_of_journey for trip in trips) - max_trip_duration(),
+                date_of_journey__lt=max(trip.date_of_journey + trip.duration for trip in trips),
+            )
+            .exclude(name__in=[trip.name for trip in trips])
+            .values_list("name", "bus", "date_of_journey", "duration")
+        )
+        booked = defaultdict(list)
+        for name, bus_id, date_of_journey, duration in stored:
+            booked[bus_id].append((name, date_of_journey, date_of_journey + duration))
+        clashes = {}
+        for trip in trips:
+            start, end = trip.date_of_journey, trip.date_of_journey + trip.duration
+            clash = next(
+                (
+                    name
+                    for name, other_start, other_end in booked[trip.bus_id]
+                    if other_start < end and start < other_end
+                ),
+                None,
+            )
+            if clash is None:
+                booked[trip.bus_id].append((trip.name, start, end))
+            else:
+                clashes[trip.name] = clash
+        return clashes
+
+    def write(self, instances):
+        super().write(instances)
+        # Upserts may have moved existing trips to another bus or route.
+        reindex_bills(LuggageBill.objects.using(self.using).filter(trip__name__in=[trip.name for trip in instances]))
+        # The name holds the route and day, so an upsert keeps a trip on its day and route week
+        self.journey_days.update(timezone.localdate(trip.date_of_journey) for trip in instances)
+        self.route_weeks.update(
+            route_week_key(trip.departure_id, trip.destination_id, trip.date_of_journey) for trip in instances
+        )
+
+    def finish(self, result):
+        rebuild_daily_count_days(DailyCount.Kind.TRIP_JOURNEY, self.journey_days)
+        refresh_route_week_keys(self.route_weeks)
+        mark_dashboard_stale()
+
+
+class LuggageBillImporter(BaseImporter):
+    """Import luggage bills together with their items.
+
+    Expected columns: ``customer`` (full name), ``trip`` (trip name),
+    ``added_by`` (username) and ``items``, a list of objects with ``weight``
+    (name), ``bag_type`` (name), ``size`` and ``quantity``. CSV files carry
+    ``items`` as a JSON encoded string. Bills have no natural key, so they are
+    always appended rather than upserted.
+    """
+
+    model = LuggageBill
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_copy = False
+        self.started = timezone.localdate()
+        self.weights = {}
+        for pk, name in Weight.objects.using(self.using).order_by("created").values_list("pk", "name"):
+            self.weights.setdefault(name, pk)
+        self.bag_types = {}
+        for pk, name, size in BagType.objects.using(self.using).order_by("created").values_list("pk", "name", "size"):
+            self.bag_types.setdefault((name, size), pk)
+        self.users = {}
+        self.customers = {}
+        self.trips = {}
+        self.routes = {}
+
+    def prepare(self, rows):
+        User = get_user_model()
+        self.customers = dict(
+            Customer.objects.using(self.using)
+            .alive()
+            .filter(fullname__in={str(row.get("customer") or "").strip() for row in rows})
+            .values_list("fullname", "pk")
+        )
+        trips = Trip.objects.using(self.using).filter(name__in={str(row.get("trip") or "").strip() for row in rows})
+        self.trips, self.routes = {}, {}
+        for name, pk, departure_id, destination_id in trips.values_list(
+            "name", "pk", "departure_id", "destination_id"
+        ):
+            self.trips[name] = pk
+            self.routes[pk] = (departure_id, destination_id)
+        usernames = {str(row.get("added_by") or "").strip() for row in rows} - self.users.keys()
+        if usernames:
+            self.users.update(
+                User._default_manager.using(self.using)
+                .filter(**{f"{User.USERNAME_FIELD}__in": usernames})
+                .values_list(User.USERNAME_FIELD, "pk")
+            )
+
+    def build(self, row):
+        errors = {}
+        lookups = {"customer": self.customers, "trip": self.trips, "added_by": self.users}
+        values = {}
+        for name, lookup in lookups.items():
+            key = str(row.get(name) or "").strip()
+            if key not in lookup:
+                errors[name] = [f"Unknown {name.replace('_', ' ')} {key!r}."]
+            else:
+                values[f"{name}_id"] = lookup[key]
+        items = row.get("items") or []
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                items = None
+        if not isinstance(items, list) or not items:
+            errors["items"] = ["Provide at least one luggage item."]
+        else:
+            try:
+                values["items"] = [self.build_item(item) for item in items]
+            except (ValidationError, TypeError, AttributeError) as error:
+                errors["items"] = getattr(error, "messages", [str(error)])
+        if errors:
+            raise ValidationError(errors)
+        items = values.pop("items")
+        bill = LuggageBill(**values)
+        bill._import_items = items
+        return bill
+
+    def build_item(self, item):
+        weight = self.weights.get(str(item.get("weight") or "").strip())
+        bag_type = self.bag_types.get((str(item.get("bag_type") or "").strip(), str(item.get("size") or "").strip()))
+        if weight is None or bag_type is None:
+            raise ValidationError(f"Unknown weight or bag type in {item!r}.")
+        quantity = clean_fields(Luggage, {"quantity": item.get("quantity", 1)}, ["quantity"])["quantity"]
+        luggage = Luggage(weight_id=weight, bag_type_id=bag_type, quantity=quantity)
+        # Priced in write() once the route of its bill is known
+        luggage._size = str(item.get("size") or "").strip()
+        return luggage
+
+    def write(self, instances):
+        assign_receipt_numbers(instances, self.using)
+        bills = LuggageBill.objects.using(self.using).bulk_create(instances)
+        items = []
+        table = pricing_engine.table()
+        today = timezone.localdate()
+        for bill in bills:
+            for item in bill._import_items:
+                item.luggagebill = bill
+                item.unit_price = table.unit_price(*self.routes[bill.trip_id], item.weight_id, item._size, today)
+                item.unit_weight = table.min_weights[item.weight_id]
+                items.append(item)
+        Luggage.objects.using(self.using).bulk_create(items)
+        sync_bag_tags(items, self.using)
+        reindex_bills(LuggageBill.objects.using(self.using).filter(pk__in=[bill.pk for bill in bills]))
+        refresh_customer_summaries({bill.customer_id for bill in bills})
+        trips = Trip.objects.using(self.using).filter(pk__in={bill.trip_id for bill in bills})
+        refresh_route_week_keys(
+            {route_week_key(*row) for row in trips.values_list("departure_id", "destination_id", "date_of_journey")}
+        )
+        refresh_staff_days({(bill.added_by_id, timezone.localdate(bill.created)) for bill in bills})
+
+    def finish(self, result):
+        today = timezone.localdate()
+        rebuild_daily_counts(DailyCount.Kind.BILL_CREATED, self.started, today)
+        mark_dashboard_stale()
+
+
+IMPORTERS = {
+    "customers": CustomerImporter,
+    "trips": TripImporter,
+    "bills": LuggageBillImporter,
+}
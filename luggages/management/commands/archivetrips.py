@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...archive import archive_cutoff, archive_trips, restore_trips
+
+
+class Command(BaseCommand):
+    help = "Move completed trips with their bills, luggage and bag tags to the archive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.LUGGAGE_ARCHIVE_AFTER_DAYS,
+            help="Archive trips whose journey started more than this many days ago.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.LUGGAGE_ARCHIVE_BATCH_SIZE,
+            help="Trips moved per transaction.",
+        )
+        parser.add_argument(
+            "--restore",
+            nargs="+",
+            type=int,
+            metavar="TRIP_ID",
+            help="Move these archived trips back to the live tables instead.",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days must not be negative and --batch-size must be positive.")
+        start_time = time.time()
+        if options["restore"]:
+            count = restore_trips(options["restore"])
+            action = "Restored"
+        else:
+            count = archive_trips(archive_cutoff(options["days"]), options["batch_size"])
+            action = "Archived"
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"{action} {count} trips in {execution_time:.2f} seconds."))
@@ -0,0 +1,110 @@
+import datetime
+import random
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...models import BagType, LuggageBill, ParkLocation, PricingRule, Weight
+from ...pricing import CENT, bill_rows, compile_pricing
+
+
+class Command(BaseCommand):
+    help = "Measure the cost of pricing bags with the compiled pricing table, against matching the rules per bag"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--bills", type=int, default=10000, help="Random bills to price.")
+        parser.add_argument("--items", type=int, default=3, help="Items per random bill.")
+        parser.add_argument(
+            "--stored", action="store_true", help="Price the stored bills instead of random ones (reads them first)."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the random bills.")
+
+    def handle(self, *args, **options):
+        if options["bills"] < 1 or options["items"] < 1:
+            raise CommandError("--bills and --items must be positive.")
+        weights = list(Weight.objects.values_list("pk", "price", "min_weight"))
+        if not weights:
+            raise CommandError("Create at least one weight first.")
+        rules = list(PricingRule.objects.filter(active=True))
+
+        start_time = time.perf_counter()
+        table = compile_pricing(weights, rules)
+        compile_time = time.perf_counter() - start_time
+        routes = sum(len(period) for period in table.periods)
+        self.stdout.write(
+            f"Compiled {len(rules)} rules into {len(table.periods)} periods and {routes} route tables "
+            f"in {compile_time * 1000:.1f} ms."
+        )
+
+        if options["stored"]:
+            bills = list(bill_rows(LuggageBill.objects.all()).values())
+        else:
+            bills = self.random_bills(weights, rules, options["bills"], options["items"], options["seed"])
+        bags = sum(quantity for *_, items in bills for _, _, quantity in items)
+        items = sum(len(bill[3]) for bill in bills)
+
+        start_time = time.perf_counter()
+        totals = table.price_bills(bills)
+        compiled_time = time.perf_counter() - start_time
+        self.stdout.write(
+            f"Compiled table: {len(bills)} bills, {items} items in {compiled_time * 1000:.1f} ms, "
+            f"{compiled_time / max(items, 1) * 1e6:.2f} µs per item, {len(bills) / max(compiled_time, 1e-9):,.0f} bills/s."
+        )
+
+        # The same prices, matching every rule for every item
+        prices = {pk: price for pk, price, _ in weights}
+        start_time = time.perf_counter()
+        for (departure_id, destination_id, day, bill_items), total in zip(bills, totals):
+            expected = Decimal("0")
+            for weight_id, size, quantity in bill_items:
+                multiplier, surcharge = Decimal("1"), Decimal("0")
+                for rule in rules:
+                    if (
+                        (rule.starts is None or rule.starts <= day)
+                        and (rule.ends is None or day <= rule.ends)
+                        and rule.matches((departure_id, destination_id), weight_id, size)
+                    ):
+                        multiplier *= rule.multiplier
+                        surcharge += rule.surcharge
+                unit_price = max(
+                    (prices[weight_id] * multiplier + surcharge).quantize(CENT, ROUND_HALF_UP), Decimal("0")
+                )
+                expected += unit_price * quantity
+            if expected != total:
+                raise CommandError(f"The compiled table priced a bill at {total} instead of {expected}.")
+        matching_time = time.perf_counter() - start_time
+        self.stdout.write(
+            f"Matching the rules per item: {matching_time * 1000:.1f} ms, "
+            f"{matching_time / max(items, 1) * 1e6:.2f} µs per item."
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Priced {bags} bags; the compiled table was {matching_time / max(compiled_time, 1e-9):.1f} times "
+                f"faster than matching the rules."
+            )
+        )
+
+    def random_bills(self, weights, rules, count, items, seed):
+        generator = random.Random(seed)
+        parks = list(ParkLocation.objects.values_list("pk", flat=True)) or [None]
+        routes = [(rule.departure_id, rule.destination_id) for rule in rules if rule.departure_id]
+        routes += [(generator.choice(parks), generator.choice(parks)) for _ in range(max(len(routes), 10))]
+        days = [rule.starts for rule in rules if rule.starts] + [rule.ends for rule in rules if rule.ends]
+        today = timezone.localdate()
+        days += [today - datetime.timedelta(days=offset) for offset in range(30)]
+        sizes = BagType.SizeOption.values
+        weight_ids = [pk for pk, _, _ in weights]
+        return [
+            (
+                *generator.choice(routes),
+                generator.choice(days),
+                [
+                    (generator.choice(weight_ids), generator.choice(sizes), generator.randint(1, 4))
+                    for _ in range(items)
+                ],
+            )
+            for _ in range(count)
+        ]
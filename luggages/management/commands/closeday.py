@@ -0,0 +1,41 @@
+import datetime
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...models import ParkLocation
+from ...settlements import close_day, open_parks
+
+
+class Command(BaseCommand):
+    help = "Settle the bills created at every departure park on a day, freezing their prices and totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--day",
+            type=datetime.date.fromisoformat,
+            help="Local day to close, as YYYY-MM-DD; defaults to yesterday",
+        )
+        parser.add_argument(
+            "--park",
+            type=int,
+            action="append",
+            help="Id of a departure park to close; defaults to every park with unsettled bills",
+        )
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        day = options["day"] or timezone.localdate() - datetime.timedelta(days=1)
+        parks = ParkLocation.objects.filter(pk__in=options["park"]) if options["park"] else open_parks(day)
+
+        for park in parks:
+            try:
+                settlement = close_day(park, day)
+            except ValidationError as error:
+                raise CommandError(error.messages[0])
+            self.stdout.write(f"Closed {settlement}: {settlement.bills} bills, {settlement.revenue} taken.")
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Closed {len(parks)} parks in {execution_time:.2f} seconds."))
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...snapshots import export_snapshot
+
+
+class Command(BaseCommand):
+    help = "Append the luggage changed since the last export to the memory-mapped snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Rebuild the snapshot from scratch.")
+        parser.add_argument("--directory", help="Snapshot directory. Defaults to LUGGAGE_SNAPSHOT_DIR.")
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        count = export_snapshot(options["directory"], full=options["full"])
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} luggage rows in {execution_time:.2f} seconds."))
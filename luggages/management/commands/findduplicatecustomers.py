@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...fuzzy import find_duplicates
+
+
+class Command(BaseCommand):
+    help = "Find the pairs of customers whose names look alike, for the possible duplicates report"
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        count = find_duplicates()
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Found {count} possible duplicate pairs in {execution_time:.2f} seconds.")
+        )
@@ -0,0 +1,46 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...scheduling import add_months, generate_trips, schedule_trips
+
+
+class Command(BaseCommand):
+    help = "Generate trips from the active trip schedules"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=datetime.date.fromisoformat,
+            help="First day to generate trips for (YYYY-MM-DD). Defaults to today.",
+        )
+        parser.add_argument("--months", type=int, default=1, help="Number of months to generate.")
+        parser.add_argument("--dry-run", action="store_true", help="Report the trips without saving them.")
+
+    def handle(self, *args, **options):
+        if options["months"] < 1:
+            raise CommandError("--months must be a positive integer.")
+        start = options["start"] or timezone.localdate()
+        end = add_months(start, options["months"]) - datetime.timedelta(days=1)
+        start_time = time.time()
+
+        if options["dry_run"]:
+            trips, skipped = schedule_trips(start, end)
+            for trip in trips:
+                self.stdout.write(f"{trip.name} ({trip.date_of_journey:%H:%M})")
+        else:
+            trips, skipped = generate_trips(start, end)
+        for occurrence in skipped:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Skipped {occurrence.schedule} on {occurrence.date_of_journey:%d-%m-%Y}: "
+                    f"bus {occurrence.schedule.bus} is already booked for {occurrence.clash}."
+                )
+            )
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(trips)} trips scheduled from {start} to {end} in {execution_time:.2f} seconds.")
+        )
@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ...importers import FORMATS, IMPORTERS, RejectWriter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = "Stream customers, trips or luggage bills from a CSV or JSONL file into the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS), help="Type of records contained in the file.")
+        parser.add_argument("path", help="CSV or JSONL file to import.")
+        parser.add_argument("--format", choices=FORMATS, help="File format. Defaults to the file extension.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.LUGGAGE_IMPORT_BATCH_SIZE,
+            help="Number of rows validated and written per transaction.",
+        )
+        parser.add_argument("--rejects", help="Side file for rejected rows. Defaults to <path>.rejects.jsonl.")
+        parser.add_argument("--no-copy", action="store_true", help="Do not use COPY on PostgreSQL.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be a positive integer.")
+        rejects = RejectWriter(options["rejects"] or f"{path}.rejects.jsonl")
+        importer = IMPORTERS[options["kind"]](
+            rejects,
+            batch_size=options["batch_size"],
+            use_copy=not options["no_copy"],
+        )
+        start_time = time.time()
+        try:
+            result = importer.run(read_rows(path, options["format"] or detect_format(path)))
+        except FileNotFoundError as error:
+            raise CommandError(error)
+        finally:
+            rejects.close()
+
+        elapsed = max(time.time() - start_time, 0.001)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {result.imported} {options['kind']} in {elapsed:.2f} seconds "
+                f"({result.imported / elapsed:.0f} rows/s)."
+            )
+        )
+        if result.rejected:
+            self.stdout.write(self.style.WARNING(f"Rejected {result.rejected} rows, see {rejects.path}"))
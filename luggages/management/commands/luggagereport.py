@@ -0,0 +1,49 @@
+import csv
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...analytics import PERIODS, REPORT_GROUPS, luggage_report
+from ...snapshots import load_snapshot
+
+
+class Command(BaseCommand):
+    help = "Summarise luggage items by period of journey and grouping as CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--group-by", nargs="*", choices=sorted(REPORT_GROUPS), default=["size"], help="Groupings to report."
+        )
+        parser.add_argument("--period", choices=PERIODS, help="Bucket the day of journey by day, week or month.")
+        parser.add_argument("--start", type=datetime.date.fromisoformat, help="First day of journey (YYYY-MM-DD).")
+        parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last day of journey (YYYY-MM-DD).")
+        parser.add_argument(
+            "--snapshot", action="store_true", help="Read the exported snapshot instead of the database."
+        )
+        parser.add_argument("--output", help="File to write the report to. Defaults to standard output.")
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end.")
+        start_time = time.time()
+        report = luggage_report(
+            options["group_by"], options["period"], start, end, loader=load_snapshot if options["snapshot"] else None
+        )
+
+        if not options["output"]:
+            self.write_csv(report, self.stdout)
+            return
+        with open(options["output"], "w", newline="") as output:
+            self.write_csv(report, output)
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(
+            self.style.SUCCESS(f"Wrote {len(report)} rows to {options['output']} in {execution_time:.2f} seconds.")
+        )
+
+    def write_csv(self, report, output):
+        if report:
+            writer = csv.DictWriter(output, fieldnames=list(report[0]))
+            writer.writeheader()
+            writer.writerows(report)
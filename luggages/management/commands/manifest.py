@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...manifest import MANIFEST_FORMATS, stream_manifest
+from ...models import Trip
+
+
+class Command(BaseCommand):
+    help = "Stream the departure manifest of a trip as HTML, CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("trip", help="Name or id of the trip.")
+        parser.add_argument("--format", choices=sorted(MANIFEST_FORMATS), default="csv", help="Output format.")
+        parser.add_argument("--output", help="File to write the manifest to. Defaults to standard output.")
+
+    def handle(self, *args, **options):
+        trips = Trip.objects.select_related("bus", "departure", "destination")
+        lookup = {"pk": options["trip"]} if options["trip"].isdigit() else {"name": options["trip"]}
+        try:
+            trip = trips.get(**lookup)
+        except Trip.DoesNotExist:
+            raise CommandError(f"Trip {options['trip']!r} does not exist.")
+
+        chunks = stream_manifest(trip, options["format"])
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+        with open(options["output"], "w", newline="") as output:
+            for chunk in chunks:
+                output.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Manifest for {trip} written to {options['output']}."))
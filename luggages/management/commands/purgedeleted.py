@@ -0,0 +1,40 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...purge import SOFT_DELETE_MODELS, purge_deleted
+
+MODELS = {model._meta.model_name: model for model in SOFT_DELETE_MODELS}
+
+
+class Command(BaseCommand):
+    help = "Delete the buses, parks and customers marked deleted, with their history, in bounded batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", choices=MODELS, help="Only purge rows of this model.")
+        parser.add_argument("--batch-size", type=int, default=500, help="Rows deleted per transaction.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        start_time = time.time()
+        models = [MODELS[options["model"]]] if options["model"] else None
+        totals = Counter()
+        kept = 0
+        for instance, model, count in purge_deleted(models, options["batch_size"]):
+            if model is None:
+                kept += 1
+                self.stdout.write(self.style.WARNING(f"Kept {count.args[0]}"))
+                continue
+            totals[model._meta.verbose_name_plural] += count
+            self.stdout.write(
+                f"{instance._meta.verbose_name} {instance}: deleted {count} {model._meta.verbose_name_plural} "
+                f"({totals[model._meta.verbose_name_plural]} so far)"
+            )
+
+        execution_time = round(time.time() - start_time, 2)
+        summary = ", ".join(f"{count} {name}" for name, count in totals.items()) or "nothing"
+        self.stdout.write(self.style.SUCCESS(f"Purged {summary} in {execution_time:.2f} seconds."))
+        if kept:
+            self.stdout.write(self.style.WARNING(f"Kept {kept} rows held by settlements or protected relations."))
@@ -0,0 +1,46 @@
+import datetime
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...aggregates import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute bill totals, trip and daily revenue and bus utilisation in parallel, from the prices captured "
+        "on the items; reprice the items first for a Weight price correction to count"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=datetime.date.fromisoformat, help="First day of journey (YYYY-MM-DD).")
+        parser.add_argument("--end", type=datetime.date.fromisoformat, help="Last day of journey (YYYY-MM-DD).")
+        parser.add_argument("--days", type=int, default=7, help="Days of journey rebuilt per task.")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Worker processes. Defaults to the number of CPUs."
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+        if start and end and start > end:
+            raise CommandError("--start must not be after --end.")
+        if options["days"] < 1 or options["workers"] < 1:
+            raise CommandError("--days and --workers must be positive.")
+        start_time = time.time()
+        done = {"bills": 0}
+
+        def progress(first, last, bills, trips):
+            done["bills"] += bills
+            rate = done["bills"] / max(time.time() - start_time, 1e-6)
+            self.stdout.write(f"{first} to {last}: {bills} bills, {trips} trips ({rate:,.0f} bills/s overall)")
+
+        bills, trips = rebuild_aggregates(start, end, options["days"], options["workers"], progress)
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt the aggregates of {bills} bills and {trips} trips with {options['workers']} workers "
+                f"in {execution_time:.2f} seconds."
+            )
+        )
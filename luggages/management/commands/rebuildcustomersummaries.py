@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...summaries import refresh_customer_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute the trips, spend and favourite route of every customer"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Customers summarised per query.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive.")
+        start_time = time.time()
+        count = refresh_customer_summaries(batch_size=options["batch_size"])
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Summarised {count} customers in {execution_time:.2f} seconds."))
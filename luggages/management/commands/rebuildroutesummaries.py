@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...summaries import rebuild_route_weeks
+
+
+class Command(BaseCommand):
+    help = "Recompute the weekly trips, load, revenue and bag mix of every route"
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        count = rebuild_route_weeks()
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Summarised {count} route weeks in {execution_time:.2f} seconds."))
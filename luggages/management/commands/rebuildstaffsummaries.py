@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...summaries import rebuild_staff_days
+
+
+class Command(BaseCommand):
+    help = "Recompute the bills, bags and revenue every staff member booked per day and park"
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        count = rebuild_staff_days()
+
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Summarised {count} staff days in {execution_time:.2f} seconds."))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ...models import LuggageBill
+from ...search import reindex_bills
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search documents and trigrams used by the luggage bill admin search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Number of bills rebuilt per transaction.")
+
+    def handle(self, *args, **options):
+        start_time = time.time()
+        updated = reindex_bills(LuggageBill.objects.all(), batch_size=options["batch_size"])
+        execution_time = round(time.time() - start_time, 2)
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {updated} luggage bills in {execution_time:.2f} seconds."))
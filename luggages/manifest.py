@@ -0,0 +1,150 @@
+"""Streaming departure manifests listing every bill and bag on a trip.
+
+The manifest is read with one ordered query joining ``LuggageBill``,
+``Customer``, ``Luggage``, ``Weight`` and ``BagType`` and consumed through
+``iterator()``, so building it takes a fixed number of queries and constant
+memory however many bags a trip carries. Rows are rendered one at a time as
+printable HTML, CSV or JSON Lines.
+"""
+
+import csv
+import json
+from decimal import Decimal
+
+from django.template.loader import render_to_string
+from django.utils.html import format_html
+from django.utils.timezone import localtime
+
+from .models import BagType, LuggageBill
+
+MANIFEST_FORMATS = {
+    "html": "text/html; charset=utf-8",
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+MANIFEST_COLUMNS = [
+    ("bill", "Bill"),
+    ("customer", "Customer"),
+    ("phone", "Next of Kin Phone"),
+    ("bag_type", "Bag Type"),
+    ("size", "Size"),
+    ("weight", "Weight"),
+    ("min_weight", "Minimum Weight (kg)"),
+    ("quantity", "Quantity"),
+    ("price", "Price"),
+    ("amount", "Amount"),
+]
+
+SIZE_LABELS = dict(BagType.SizeOption.choices)
+
+
+def manifest_rows(trip, chunk_size=2000):
+    """Yield one dict per bag of ``trip``, grouped by customer then bill.
+
+    Bills without any bag are listed once with empty bag columns.
+    """
+    rows = (
+        LuggageBill.objects.filter(trip=trip)
+        .order_by("customer__fullname", "pk", "items__pk")
+        .values_list(
+            "pk",
+            "customer__fullname",
+            "customer__next_of_kin_phonenumber",
+            "items__bag_type__name",
+            "items__bag_type__size",
+            "items__weight__name",
+            "items__unit_weight",
+            "items__quantity",
+            "items__unit_price",
+        )
+    )
+    for bill, customer, phone, bag_type, size, weight, min_weight, quantity, price in rows.iterator(chunk_size):
+        yield {
+            "bill": bill,
+            "customer": customer,
+            "phone": phone,
+            "bag_type": bag_type,
+            "size": str(SIZE_LABELS.get(size, size or "")),
+            "weight": weight,
+            "min_weight": min_weight,
+            "quantity": quantity,
+            "price": price,
+            "amount": price * quantity if price is not None else None,
+        }
+
+
+class ManifestTotals:
+    """Running totals kept while a manifest is streamed."""
+
+    def __init__(self):
+        self.bills = set()
+        self.bags = 0
+        self.weight = 0
+        self.amount = Decimal("0")
+
+    def add(self, row):
+        self.bills.add(row["bill"])
+        if row["quantity"] is not None:
+            self.bags += row["quantity"]
+            self.weight += row["min_weight"] * row["quantity"]
+            self.amount += row["amount"]
+
+
+class Echo:
+    """File-like object handing back what is written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(trip):
+    writer = csv.writer(Echo())
+    yield writer.writerow([label for _, label in MANIFEST_COLUMNS])
+    for row in manifest_rows(trip):
+        yield writer.writerow(["" if row[key] is None else row[key] for key, _ in MANIFEST_COLUMNS])
+
+
+def stream_jsonl(trip):
+    for row in manifest_rows(trip):
+        yield json.dumps(row, default=str) + "\n"
+
+
+def stream_html(trip):
+    context = {
+        "trip": trip,
+        "columns": [label for _, label in MANIFEST_COLUMNS],
+        "printed": localtime(),
+    }
+    yield render_to_string("admin/luggages/trip/manifest_start.html", context)
+    totals = ManifestTotals()
+    for row in manifest_rows(trip):
+        totals.add(row)
+        yield format_html(
+            "<tr>{}</tr>\n",
+            format_html("".join(["<td>{}</td>"] * len(MANIFEST_COLUMNS)), *manifest_cells(row)),
+        )
+    yield render_to_string("admin/luggages/trip/manifest_end.html", {**context, "totals": totals})
+
+
+def manifest_cells(row):
+    for key, _ in MANIFEST_COLUMNS:
+        value = row[key]
+        if value is None:
+            yield ""
+        elif key == "min_weight":
+            yield f"{value}kg"
+        else:
+            yield value
+
+
+STREAMS = {
+    "html": stream_html,
+    "csv": stream_csv,
+    "jsonl": stream_jsonl,
+}
+
+
+def stream_manifest(trip, output_format):
+    """Return an iterator over the manifest of ``trip`` rendered as ``output_format``."""
+    return STREAMS[output_format](trip)
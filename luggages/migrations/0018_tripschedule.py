@@ -0,0 +1,77 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0017_alter_luggage_quantity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TripSchedule",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "weekday",
+                    models.PositiveSmallIntegerField(
+                        choices=[
+                            (0, "Monday"),
+                            (1, "Tuesday"),
+                            (2, "Wednesday"),
+                            (3, "Thursday"),
+                            (4, "Friday"),
+                            (5, "Saturday"),
+                            (6, "Sunday"),
+                        ],
+                        verbose_name="Weekday",
+                    ),
+                ),
+                ("departure_time", models.TimeField(verbose_name="Departure Time")),
+                (
+                    "active",
+                    models.BooleanField(
+                        default=True,
+                        help_text="Only active schedules are used when generating trips.",
+                        verbose_name="Active",
+                    ),
+                ),
+                (
+                    "bus",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="schedules",
+                        to="luggages.bus",
+                        verbose_name="Bus",
+                    ),
+                ),
+                (
+                    "departure",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_departures",
+                        to="luggages.parklocation",
+                        verbose_name="Departure",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scheduled_arrivals",
+                        to="luggages.parklocation",
+                        verbose_name="Destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trip Schedule",
+                "verbose_name_plural": "Trip Schedules",
+                "ordering": ["weekday", "departure_time"],
+            },
+        ),
+    ]
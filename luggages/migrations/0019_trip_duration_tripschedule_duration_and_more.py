@@ -0,0 +1,35 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:26
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0018_tripschedule"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="duration",
+            field=models.DurationField(
+                default=datetime.timedelta(seconds=28800),
+                help_text="Expected time on the road, e.g. 08:30:00.",
+                verbose_name="Duration",
+            ),
+        ),
+        migrations.AddField(
+            model_name="tripschedule",
+            name="duration",
+            field=models.DurationField(
+                default=datetime.timedelta(seconds=28800),
+                help_text="Expected time on the road, e.g. 08:30:00.",
+                verbose_name="Duration",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["bus", "date_of_journey"], name="luggages_trip_bus_date_idx"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0019_trip_duration_tripschedule_duration_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="luggage",
+            index=models.Index(fields=["created", "id"], name="luggages_item_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="luggagebill",
+            index=models.Index(fields=["created", "id"], name="luggages_bill_created_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["date_of_journey", "id"], name="luggages_trip_date_id_idx"),
+        ),
+    ]
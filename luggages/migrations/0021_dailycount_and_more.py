@@ -0,0 +1,65 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:32
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+SOURCES = [
+    ("bill_created", "LuggageBill", "created"),
+    ("trip_journey", "Trip", "date_of_journey"),
+]
+
+
+def count_existing_rows(apps, schema_editor):
+    DailyCount = apps.get_model("luggages", "DailyCount")
+    tz = timezone.get_current_timezone()
+    for kind, model_name, field_name in SOURCES:
+        model = apps.get_model("luggages", model_name)
+        counts = (
+            model.objects.order_by()
+            .annotate(day=TruncDate(field_name, tzinfo=tz))
+            .values("day")
+            .annotate(count=Count("pk"))
+        )
+        DailyCount.objects.bulk_create(
+            [DailyCount(kind=kind, day=row["day"], count=row["count"]) for row in counts], batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0020_luggage_luggages_item_created_id_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyCount",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("bill_created", "Luggage bills by creation date"),
+                            ("trip_journey", "Trips by date of journey"),
+                        ],
+                        max_length=20,
+                        verbose_name="Kind",
+                    ),
+                ),
+                ("day", models.DateField(help_text="Day in the local time zone.", verbose_name="Day")),
+                ("count", models.IntegerField(default=0, verbose_name="Count")),
+            ],
+            options={
+                "verbose_name": "Daily Count",
+                "verbose_name_plural": "Daily Counts",
+                "ordering": ["kind", "day"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailycount",
+            constraint=models.UniqueConstraint(fields=("kind", "day"), name="luggages_dailycount_kind_day_uniq"),
+        ),
+        migrations.RunPython(count_existing_rows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:34
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models, transaction
+
+
+# Copies of luggages.models.normalize_search_text and luggages.search.document_trigrams
+# as they were when this migration was written, so later changes to them leave it alone.
+def normalize_search_text(*parts):
+    text = unicodedata.normalize("NFKD", " ".join(str(part) for part in parts if part))
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+def document_trigrams(document):
+    trigrams = set()
+    for word in document.split():
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def has_pg_trgm(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def has_trigram_index(connection):
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'luggages_bill_search_trgm_idx'")
+        return cursor.fetchone() is not None
+
+
+def create_trigram_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        available = cursor.fetchone() is not None
+    if available and not has_pg_trgm(connection):
+        try:
+            # A role without the privilege to create extensions falls back to the trigram side table
+            with transaction.atomic(using=connection.alias):
+                schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except DatabaseError:
+            return
+    if has_pg_trgm(connection):
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS luggages_bill_search_trgm_idx "
+            "ON luggages_luggagebill USING gin (search_document gin_trgm_ops)"
+        )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS luggages_bill_search_trgm_idx")
+
+
+def build_search_documents(apps, schema_editor):
+    LuggageBill = apps.get_model("luggages", "LuggageBill")
+    BillSearchTrigram = apps.get_model("luggages", "BillSearchTrigram")
+    # Without the pg_trgm index, searches go through the side table
+    trigram_index = has_trigram_index(schema_editor.connection)
+    bills = LuggageBill.objects.select_related(
+        "customer", "trip__bus", "trip__departure", "trip__destination"
+    ).order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(bills.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for bill in batch:
+            bill.search_document = normalize_search_text(
+                bill.customer.fullname,
+                bill.trip.name,
+                bill.trip.bus.plate_number,
+                bill.trip.departure.location,
+                bill.trip.destination.location,
+            )
+        LuggageBill.objects.bulk_update(batch, ["search_document"])
+        if not trigram_index:
+            BillSearchTrigram.objects.bulk_create(
+                [
+                    BillSearchTrigram(bill_id=bill.pk, trigram=trigram)
+                    for bill in batch
+                    for trigram in document_trigrams(bill.search_document)
+                ],
+                batch_size=5000,
+            )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0021_dailycount_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="luggagebill",
+            name="search_document",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Normalised customer name, trip name, plate number and route used by the admin search.",
+                verbose_name="Search document",
+            ),
+        ),
+        migrations.CreateModel(
+            name="BillSearchTrigram",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("trigram", models.CharField(max_length=3, verbose_name="Trigram")),
+                (
+                    "bill",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="search_trigrams",
+                        to="luggages.luggagebill",
+                        verbose_name="Luggage Bill",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bill Search Trigram",
+                "verbose_name_plural": "Bill Search Trigrams",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="billsearchtrigram",
+            constraint=models.UniqueConstraint(fields=("trigram", "bill"), name="luggages_billtrigram_uniq"),
+        ),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0022_luggagebill_search_document_billsearchtrigram_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(fields=["updated"], name="luggages_customer_updated_idx"),
+        ),
+    ]
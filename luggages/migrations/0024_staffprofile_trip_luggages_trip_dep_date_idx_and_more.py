@@ -0,0 +1,53 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0023_customer_luggages_customer_updated_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaffProfile",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Staff Profile",
+                "verbose_name_plural": "Staff Profiles",
+                "ordering": ["user"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(fields=["departure", "date_of_journey"], name="luggages_trip_dep_date_idx"),
+        ),
+        migrations.AddField(
+            model_name="staffprofile",
+            name="park",
+            field=models.ForeignKey(
+                help_text="Park the staff member books luggage at.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="staff",
+                to="luggages.parklocation",
+                verbose_name="Park",
+            ),
+        ),
+        migrations.AddField(
+            model_name="staffprofile",
+            name="user",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="staff_profile",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="User",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:46
+
+import secrets
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Copy of luggages.tags.generate_tag_code as it was when this migration was written,
+# so later changes to the tag format leave it alone.
+CODE_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CODE_LENGTH = 8
+
+
+def generate_tag_code():
+    return "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def fresh_codes(BagTag, count):
+    """Draw ``count`` distinct codes that no stored tag uses yet."""
+    codes = set()
+    while len(codes) < count:
+        drawn = list({generate_tag_code() for _ in range(count - len(codes))} - codes)
+        for start in range(0, len(drawn), 500):
+            chunk = drawn[start : start + 500]
+            codes.update(chunk)
+            codes.difference_update(BagTag.objects.filter(code__in=chunk).values_list("code", flat=True))
+    return list(codes)
+
+
+def tag_existing_luggage(apps, schema_editor):
+    Luggage = apps.get_model("luggages", "Luggage")
+    BagTag = apps.get_model("luggages", "BagTag")
+    items = Luggage.objects.order_by("pk").values_list("pk", "quantity")
+    last_pk = 0
+    while True:
+        batch = list(items.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        last_pk = batch[-1][0]
+        tags = [BagTag(luggage_id=pk, sequence=sequence) for pk, quantity in batch for sequence in range(1, quantity + 1)]
+        # Codes are random, so redraw the ones that repeat within the batch or match a stored tag
+        for tag, code in zip(tags, fresh_codes(BagTag, len(tags))):
+            tag.code = code
+        BagTag.objects.bulk_create(tags, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0024_staffprofile_trip_luggages_trip_dep_date_idx_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BagTag",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                (
+                    "sequence",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of the bag within its luggage item, from 1 to the quantity.",
+                        verbose_name="Sequence",
+                    ),
+                ),
+                ("code", models.CharField(max_length=8, unique=True, verbose_name="Tag Code")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("checked_in", "Checked in"), ("loaded", "Loaded"), ("delivered", "Delivered")],
+                        default="checked_in",
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("scanned_at", models.DateTimeField(blank=True, null=True, verbose_name="Last Scanned")),
+                (
+                    "luggage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tags",
+                        to="luggages.luggage",
+                        verbose_name="Luggage",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bag Tag",
+                "verbose_name_plural": "Bag Tags",
+                "ordering": ["luggage", "sequence"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="bagtag",
+            constraint=models.UniqueConstraint(
+                fields=("luggage", "sequence"), name="luggages_bagtag_luggage_seq_uniq"
+            ),
+        ),
+        migrations.RunPython(tag_existing_luggage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Copy of luggages.sequences.format_receipt_number as it was when this migration was written,
+# so later changes to the receipt format leave it alone.
+def format_receipt_number(park_id, day, number):
+    return f"{park_id:03d}-{day:%y%m%d}-{number:04d}"
+
+
+def number_existing_bills(apps, schema_editor):
+    """Number existing bills in creation order and record the high-water marks."""
+    LuggageBill = apps.get_model("luggages", "LuggageBill")
+    ReceiptSequence = apps.get_model("luggages", "ReceiptSequence")
+    db_alias = schema_editor.connection.alias
+    bills = (
+        LuggageBill.objects.using(db_alias)
+        .order_by("created", "pk")
+        .values_list("pk", "created", "trip__departure_id")
+    )
+    high_water = {}
+    batch = []
+    for pk, created, park_id in bills.iterator(chunk_size=2000):
+        key = (park_id, timezone.localdate(created))
+        high_water[key] = high_water.get(key, 0) + 1
+        batch.append(LuggageBill(pk=pk, receipt_number=format_receipt_number(*key, high_water[key])))
+        if len(batch) >= 2000:
+            LuggageBill.objects.using(db_alias).bulk_update(batch, ["receipt_number"])
+            batch = []
+    LuggageBill.objects.using(db_alias).bulk_update(batch, ["receipt_number"])
+    ReceiptSequence.objects.using(db_alias).bulk_create(
+        [ReceiptSequence(park_id=park_id, day=day, high_water=count) for (park_id, day), count in high_water.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0025_bagtag_bagtag_luggages_bagtag_luggage_seq_uniq"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="luggagebill",
+            name="receipt_number",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Departure park, day and sequence within that day, e.g. 007-241019-0042.",
+                max_length=32,
+                null=True,
+                unique=True,
+                verbose_name="Receipt Number",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ReceiptSequence",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(verbose_name="Day")),
+                (
+                    "high_water",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Last number reserved, including numbers held in unused blocks.",
+                        verbose_name="High-water Mark",
+                    ),
+                ),
+                (
+                    "park",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="receipt_sequences",
+                        to="luggages.parklocation",
+                        verbose_name="Park",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Receipt Sequence",
+                "verbose_name_plural": "Receipt Sequences",
+                "ordering": ["park", "day"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="receiptsequence",
+            constraint=models.UniqueConstraint(fields=("park", "day"), name="luggages_receiptseq_park_day_uniq"),
+        ),
+        migrations.RunPython(number_existing_bills, migrations.RunPython.noop),
+    ]
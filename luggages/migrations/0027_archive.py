@@ -0,0 +1,191 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0026_receipt_numbers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedLuggage",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField()),
+                ("updated", models.DateTimeField()),
+                ("archived", models.DateTimeField(auto_now_add=True, verbose_name="Archived")),
+                ("quantity", models.PositiveIntegerField(verbose_name="Quantity")),
+                (
+                    "bag_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.bagtype",
+                        verbose_name="Bag Type",
+                    ),
+                ),
+                (
+                    "weight",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.weight",
+                        verbose_name="Weight",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Luggage",
+                "verbose_name_plural": "Archived Luggages",
+                "ordering": ["-created"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedBagTag",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField()),
+                ("updated", models.DateTimeField()),
+                ("archived", models.DateTimeField(auto_now_add=True, verbose_name="Archived")),
+                ("sequence", models.PositiveSmallIntegerField(verbose_name="Sequence")),
+                ("code", models.CharField(max_length=8, unique=True, verbose_name="Tag Code")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("checked_in", "Checked in"), ("loaded", "Loaded"), ("delivered", "Delivered")],
+                        max_length=10,
+                        verbose_name="Status",
+                    ),
+                ),
+                ("scanned_at", models.DateTimeField(blank=True, null=True, verbose_name="Last Scanned")),
+                (
+                    "luggage",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tags",
+                        to="luggages.archivedluggage",
+                        verbose_name="Luggage",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Bag Tag",
+                "verbose_name_plural": "Archived Bag Tags",
+                "ordering": ["luggage", "sequence"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedLuggageBill",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField()),
+                ("updated", models.DateTimeField()),
+                ("archived", models.DateTimeField(auto_now_add=True, verbose_name="Archived")),
+                (
+                    "receipt_number",
+                    models.CharField(blank=True, max_length=32, null=True, unique=True, verbose_name="Receipt Number"),
+                ),
+                ("search_document", models.TextField(blank=True, verbose_name="Search document")),
+                (
+                    "added_by",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Added by",
+                    ),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_bills",
+                        to="luggages.customer",
+                        verbose_name="Customer",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Luggage Bill",
+                "verbose_name_plural": "Archived Luggage Bills",
+                "ordering": ["-created"],
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedluggage",
+            name="luggagebill",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="items",
+                to="luggages.archivedluggagebill",
+                verbose_name="Luggage Bill",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ArchivedTrip",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField()),
+                ("updated", models.DateTimeField()),
+                ("archived", models.DateTimeField(auto_now_add=True, verbose_name="Archived")),
+                ("name", models.CharField(max_length=50, unique=True, verbose_name="Trip")),
+                ("date_of_journey", models.DateTimeField(verbose_name="Date of Journey")),
+                ("duration", models.DurationField(verbose_name="Duration")),
+                (
+                    "bus",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_trips",
+                        to="luggages.bus",
+                        verbose_name="Bus",
+                    ),
+                ),
+                (
+                    "departure",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_departures",
+                        to="luggages.parklocation",
+                        verbose_name="Departure",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="archived_arrivals",
+                        to="luggages.parklocation",
+                        verbose_name="Destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Archived Trip",
+                "verbose_name_plural": "Archived Trips",
+                "ordering": ["-date_of_journey"],
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedluggagebill",
+            name="trip",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="luggagebills",
+                to="luggages.archivedtrip",
+                verbose_name="Trip",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedtrip",
+            index=models.Index(fields=["date_of_journey", "id"], name="luggages_atrip_date_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="archivedluggagebill",
+            index=models.Index(fields=["created", "id"], name="luggages_abill_created_id_idx"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.4 on 2026-10-19 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0027_archive"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bus",
+            name="deleted",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When the row was deleted; it is purged with everything depending on it later.",
+                null=True,
+                verbose_name="Deleted",
+            ),
+        ),
+        migrations.AddField(
+            model_name="customer",
+            name="deleted",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When the row was deleted; it is purged with everything depending on it later.",
+                null=True,
+                verbose_name="Deleted",
+            ),
+        ),
+        migrations.AddField(
+            model_name="parklocation",
+            name="deleted",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="When the row was deleted; it is purged with everything depending on it later.",
+                null=True,
+                verbose_name="Deleted",
+            ),
+        ),
+    ]
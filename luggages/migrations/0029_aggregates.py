@@ -0,0 +1,181 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0028_soft_delete"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BillTotal",
+            fields=[
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                (
+                    "bill",
+                    models.BigIntegerField(
+                        help_text="Id of the live or archived bill.",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Luggage Bill",
+                    ),
+                ),
+                ("trip", models.BigIntegerField(help_text="Id of the live or archived trip.", verbose_name="Trip")),
+                ("day", models.DateField(verbose_name="Day of Journey")),
+                ("items", models.PositiveIntegerField(verbose_name="Items")),
+                ("bags", models.PositiveIntegerField(verbose_name="Bags")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12, verbose_name="Amount")),
+                ("archived", models.BooleanField(verbose_name="Archived")),
+            ],
+            options={
+                "verbose_name": "Bill Total",
+                "verbose_name_plural": "Bill Totals",
+                "ordering": ["day", "bill"],
+                "indexes": [
+                    models.Index(fields=["day"], name="luggages_billtotal_day_idx"),
+                    models.Index(fields=["trip"], name="luggages_billtotal_trip_idx"),
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="BusUtilisation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                ("day", models.DateField(verbose_name="Day of Journey")),
+                ("trips", models.PositiveIntegerField(verbose_name="Trips")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                (
+                    "capacity",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Maximum luggage weight of the bus times its trips; empty when the bus has no maximum.",
+                        null=True,
+                        verbose_name="Capacity (kg)",
+                    ),
+                ),
+                (
+                    "bus",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="utilisation",
+                        to="luggages.bus",
+                        verbose_name="Bus",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Bus Utilisation",
+                "verbose_name_plural": "Bus Utilisation",
+                "ordering": ["day", "bus"],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyRevenue",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                ("day", models.DateField(verbose_name="Day of Journey")),
+                ("trips", models.PositiveIntegerField(verbose_name="Trips")),
+                ("bills", models.PositiveIntegerField(verbose_name="Bills")),
+                ("bags", models.PositiveIntegerField(verbose_name="Bags")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Revenue")),
+                (
+                    "park",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_revenues",
+                        to="luggages.parklocation",
+                        verbose_name="Departure Park",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Revenue",
+                "verbose_name_plural": "Daily Revenues",
+                "ordering": ["day", "park"],
+            },
+        ),
+        migrations.CreateModel(
+            name="TripRevenue",
+            fields=[
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                (
+                    "trip",
+                    models.BigIntegerField(
+                        help_text="Id of the live or archived trip.",
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="Trip",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="Day of Journey")),
+                ("bills", models.PositiveIntegerField(verbose_name="Bills")),
+                ("bags", models.PositiveIntegerField(verbose_name="Bags")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Revenue")),
+                ("archived", models.BooleanField(verbose_name="Archived")),
+                (
+                    "bus",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.bus",
+                        verbose_name="Bus",
+                    ),
+                ),
+                (
+                    "departure",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Departure",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Trip Revenue",
+                "verbose_name_plural": "Trip Revenues",
+                "ordering": ["day", "trip"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="busutilisation",
+            constraint=models.UniqueConstraint(fields=("day", "bus"), name="luggages_busutilisation_uniq"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailyrevenue",
+            constraint=models.UniqueConstraint(fields=("day", "park"), name="luggages_dailyrevenue_uniq"),
+        ),
+        migrations.AddIndex(
+            model_name="triprevenue",
+            index=models.Index(fields=["day"], name="luggages_triprevenue_day_idx"),
+        ),
+    ]
@@ -0,0 +1,124 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:15
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def summarise_existing_customers(apps, schema_editor):
+    """Summarise the live and archived bills of every customer."""
+    CustomerSummary = apps.get_model("luggages", "CustomerSummary")
+    db_alias = schema_editor.connection.alias
+    totals = defaultdict(lambda: {"trips": set(), "bills": 0, "bags": 0, "kilograms": 0, "spend": Decimal("0")})
+    last_trips = {}
+    routes = defaultdict(Counter)
+    for bill_model, item_model in [("LuggageBill", "Luggage"), ("ArchivedLuggageBill", "ArchivedLuggage")]:
+        bills = apps.get_model("luggages", bill_model).objects.using(db_alias).order_by()
+        for customer_id, trip_id, journey, departure_id, destination_id in bills.values_list(
+            "customer_id", "trip_id", "trip__date_of_journey", "trip__departure_id", "trip__destination_id"
+        ).iterator(chunk_size=2000):
+            total = totals[customer_id]
+            total["trips"].add((bill_model, trip_id))
+            total["bills"] += 1
+            routes[customer_id][(departure_id, destination_id)] += 1
+            if customer_id not in last_trips or journey > last_trips[customer_id]:
+                last_trips[customer_id] = journey
+        items = apps.get_model("luggages", item_model).objects.using(db_alias).order_by()
+        for customer_id, quantity, min_weight, price in items.values_list(
+            "luggagebill__customer_id", "quantity", "weight__min_weight", "weight__price"
+        ).iterator(chunk_size=2000):
+            total = totals[customer_id]
+            total["bags"] += quantity
+            total["kilograms"] += quantity * min_weight
+            total["spend"] += quantity * price
+    now = timezone.now()
+    summaries = []
+    for customer_id in apps.get_model("luggages", "Customer").objects.using(db_alias).values_list("pk", flat=True):
+        total = totals.get(customer_id, {"trips": (), "bills": 0, "bags": 0, "kilograms": 0, "spend": 0})
+        route = min(routes[customer_id].items(), key=lambda item: (-item[1], item[0]), default=((None, None), 0))[0]
+        summaries.append(
+            CustomerSummary(
+                customer_id=customer_id,
+                trips=len(total["trips"]),
+                bills=total["bills"],
+                bags=total["bags"],
+                kilograms=total["kilograms"],
+                spend=total["spend"],
+                last_trip=last_trips.get(customer_id),
+                favourite_departure_id=route[0],
+                favourite_destination_id=route[1],
+                refreshed=now,
+            )
+        )
+    CustomerSummary.objects.using(db_alias).bulk_create(summaries, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0029_aggregates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerSummary",
+            fields=[
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                (
+                    "customer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="summary",
+                        serialize=False,
+                        to="luggages.customer",
+                        verbose_name="Customer",
+                    ),
+                ),
+                ("trips", models.PositiveIntegerField(default=0, verbose_name="Trips")),
+                ("bills", models.PositiveIntegerField(default=0, verbose_name="Bills")),
+                ("bags", models.PositiveIntegerField(default=0, verbose_name="Bags")),
+                ("kilograms", models.PositiveIntegerField(default=0, verbose_name="Kilograms")),
+                ("spend", models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Total Spend")),
+                ("last_trip", models.DateTimeField(blank=True, null=True, verbose_name="Last Trip")),
+                (
+                    "favourite_departure",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Favourite Departure",
+                    ),
+                ),
+                (
+                    "favourite_destination",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Favourite Destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Customer Summary",
+                "verbose_name_plural": "Customer Summaries",
+                "indexes": [
+                    models.Index(fields=["spend"], name="luggages_custsum_spend_idx"),
+                    models.Index(fields=["trips"], name="luggages_custsum_trips_idx"),
+                    models.Index(fields=["kilograms"], name="luggages_custsum_kg_idx"),
+                    models.Index(fields=["last_trip"], name="luggages_custsum_last_idx"),
+                ],
+            },
+        ),
+        migrations.RunPython(summarise_existing_customers, migrations.RunPython.noop),
+    ]
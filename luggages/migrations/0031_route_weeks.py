@@ -0,0 +1,75 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0030_customer_summaries"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RouteWeek",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                ("week", models.DateField(help_text="Monday the week of journey starts on.", verbose_name="Week")),
+                ("trips", models.PositiveIntegerField(verbose_name="Trips")),
+                ("bills", models.PositiveIntegerField(verbose_name="Bills")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Revenue")),
+                (
+                    "capacity",
+                    models.PositiveIntegerField(
+                        help_text="Maximum luggage weight summed over the trips whose bus has one.",
+                        verbose_name="Capacity (kg)",
+                    ),
+                ),
+                (
+                    "capacity_kilograms",
+                    models.PositiveIntegerField(
+                        help_text="Kilograms carried by the trips counted in the capacity.",
+                        verbose_name="Kilograms against Capacity",
+                    ),
+                ),
+                ("small_bags", models.PositiveIntegerField(verbose_name="Small Bags")),
+                ("medium_bags", models.PositiveIntegerField(verbose_name="Medium Bags")),
+                ("large_bags", models.PositiveIntegerField(verbose_name="Large Bags")),
+                (
+                    "departure",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Departure",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Destination",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Route Week",
+                "verbose_name_plural": "Route Weeks",
+                "ordering": ["week", "departure", "destination"],
+                "indexes": [models.Index(fields=["week"], name="luggages_routeweek_week_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="routeweek",
+            constraint=models.UniqueConstraint(
+                fields=("departure", "destination", "week"), name="luggages_routeweek_uniq"
+            ),
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0031_route_weeks"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StaffDay",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                ("day", models.DateField(help_text="Local day the bills were created.", verbose_name="Day")),
+                ("bills", models.PositiveIntegerField(verbose_name="Bills")),
+                ("bags", models.PositiveIntegerField(verbose_name="Bags")),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Revenue")),
+            ],
+            options={
+                "verbose_name": "Staff Day",
+                "verbose_name_plural": "Staff Days",
+                "ordering": ["day", "park", "user"],
+            },
+        ),
+        migrations.AddIndex(
+            model_name="archivedluggagebill",
+            index=models.Index(fields=["added_by", "created"], name="luggages_abill_added_by_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="luggagebill",
+            index=models.Index(fields=["added_by", "created"], name="luggages_bill_added_by_idx"),
+        ),
+        migrations.AddField(
+            model_name="staffday",
+            name="park",
+            field=models.ForeignKey(
+                help_text="Departure park of the trips the bills were booked on.",
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="luggages.parklocation",
+                verbose_name="Park",
+            ),
+        ),
+        migrations.AddField(
+            model_name="staffday",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Staff Member",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="staffday",
+            index=models.Index(fields=["day", "park"], name="luggages_staffday_day_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="staffday",
+            constraint=models.UniqueConstraint(fields=("user", "day", "park"), name="luggages_staffday_uniq"),
+        ),
+    ]
@@ -0,0 +1,142 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0032_staff_days"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Settlement",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("day", models.DateField(help_text="Local day the settled bills were created.", verbose_name="Day")),
+                ("bills", models.PositiveIntegerField(verbose_name="Bills")),
+                ("bags", models.PositiveIntegerField(verbose_name="Bags")),
+                ("kilograms", models.PositiveIntegerField(verbose_name="Kilograms")),
+                ("revenue", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Revenue")),
+                (
+                    "closed_by",
+                    models.ForeignKey(
+                        blank=True,
+                        help_text="Empty when the day was closed by the closeday command.",
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Closed by",
+                    ),
+                ),
+                (
+                    "park",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="settlements",
+                        to="luggages.parklocation",
+                        verbose_name="Departure Park",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Settlement",
+                "verbose_name_plural": "Settlements",
+                "ordering": ["-day", "park"],
+            },
+        ),
+        migrations.AddField(
+            model_name="archivedluggagebill",
+            name="settlement",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="settled_archived_bills",
+                to="luggages.settlement",
+                verbose_name="Settlement",
+            ),
+        ),
+        migrations.AddField(
+            model_name="luggagebill",
+            name="settlement",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="Daily close of the departure park the bill was settled in; settled bills cannot change.",
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name="settled_bills",
+                to="luggages.settlement",
+                verbose_name="Settlement",
+            ),
+        ),
+        migrations.CreateModel(
+            name="SettlementLine",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "bill",
+                    models.BigIntegerField(
+                        help_text="Id of the bill, which may since have been archived.", verbose_name="Bill"
+                    ),
+                ),
+                (
+                    "item",
+                    models.BigIntegerField(
+                        help_text="Id of the luggage item, which may since have been archived.", verbose_name="Item"
+                    ),
+                ),
+                ("quantity", models.PositiveIntegerField(verbose_name="Quantity")),
+                ("unit_price", models.DecimalField(decimal_places=2, max_digits=10, verbose_name="Unit Price")),
+                ("unit_weight", models.PositiveIntegerField(verbose_name="Unit Weight")),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14, verbose_name="Amount")),
+                (
+                    "bag_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="luggages.bagtype",
+                        verbose_name="Bag Type",
+                    ),
+                ),
+                (
+                    "settlement",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="luggages.settlement",
+                        verbose_name="Settlement",
+                    ),
+                ),
+                (
+                    "weight",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="luggages.weight",
+                        verbose_name="Weight",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Settlement Line",
+                "verbose_name_plural": "Settlement Lines",
+                "ordering": ["settlement", "bill", "item"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="settlement",
+            constraint=models.UniqueConstraint(fields=("park", "day"), name="luggages_settlement_uniq"),
+        ),
+        migrations.AddConstraint(
+            model_name="settlementline",
+            constraint=models.UniqueConstraint(fields=("settlement", "item"), name="luggages_settlementline_uniq"),
+        ),
+    ]
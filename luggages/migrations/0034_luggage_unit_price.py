@@ -0,0 +1,93 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+BATCH_SIZE = 5000
+
+
+def capture_existing_prices(apps, schema_editor):
+    """Copy the current price and minimum weight of their weight onto the existing items, a batch at a time.
+
+    Each batch is priced by one ``UPDATE`` reading the weight through a subquery.
+    """
+    db_alias = schema_editor.connection.alias
+    weights = apps.get_model("luggages", "Weight").objects.using(db_alias).filter(pk=OuterRef("weight_id"))
+    for model_name in ("Luggage", "ArchivedLuggage"):
+        items = apps.get_model("luggages", model_name).objects.using(db_alias).order_by("pk")
+        last = 0
+        while True:
+            # Rows already priced by an interrupted run are skipped
+            pending = items.filter(pk__gt=last, unit_price__isnull=True)
+            end = pending.values_list("pk", flat=True)[BATCH_SIZE - 1 : BATCH_SIZE].first()
+            batch = pending if end is None else pending.filter(pk__lte=end)
+            batch.update(
+                unit_price=Subquery(weights.values("price")[:1]),
+                unit_weight=Subquery(weights.values("min_weight")[:1]),
+            )
+            if end is None:
+                break
+            last = end
+
+
+class Migration(migrations.Migration):
+    # Every batch is committed on its own, so large tables are not locked for the whole backfill
+    atomic = False
+
+    dependencies = [
+        ("luggages", "0033_settlements"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="luggage",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="luggage",
+            name="unit_weight",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name="archivedluggage",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name="archivedluggage",
+            name="unit_weight",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(capture_existing_prices, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="luggage",
+            name="unit_price",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                help_text="Price of the weight when the item was booked; later price changes leave it alone.",
+                max_digits=10,
+                verbose_name="Unit Price",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="luggage",
+            name="unit_weight",
+            field=models.PositiveIntegerField(
+                editable=False,
+                help_text="Minimum weight of the weight when the item was booked, in kilograms.",
+                verbose_name="Unit Weight",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="archivedluggage",
+            name="unit_price",
+            field=models.DecimalField(decimal_places=2, max_digits=10, verbose_name="Unit Price"),
+        ),
+        migrations.AlterField(
+            model_name="archivedluggage",
+            name="unit_weight",
+            field=models.PositiveIntegerField(verbose_name="Unit Weight"),
+        ),
+    ]
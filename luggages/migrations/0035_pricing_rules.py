@@ -0,0 +1,122 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:38
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0034_luggage_unit_price"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="luggage",
+            name="unit_price",
+            field=models.DecimalField(
+                decimal_places=2,
+                editable=False,
+                help_text="Price of one bag when the item was booked, after the pricing rules; later changes leave it alone.",
+                max_digits=10,
+                verbose_name="Unit Price",
+            ),
+        ),
+        migrations.CreateModel(
+            name="PricingRule",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("updated", models.DateTimeField(auto_now=True)),
+                ("name", models.CharField(max_length=100, verbose_name="Name")),
+                (
+                    "size",
+                    models.CharField(
+                        blank=True,
+                        choices=[("S", "Small"), ("M", "Medium"), ("L", "Large")],
+                        max_length=1,
+                        verbose_name="Bag Size",
+                    ),
+                ),
+                (
+                    "multiplier",
+                    models.DecimalField(
+                        decimal_places=3,
+                        default=Decimal("1"),
+                        help_text="Factor applied to the price of the weight, e.g. 1.2 for a 20% route premium.",
+                        max_digits=6,
+                        validators=[django.core.validators.MinValueValidator(Decimal("0"))],
+                        verbose_name="Multiplier",
+                    ),
+                ),
+                (
+                    "surcharge",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=Decimal("0"),
+                        help_text="Amount added per bag; negative for a discount.",
+                        max_digits=10,
+                        verbose_name="Surcharge",
+                    ),
+                ),
+                (
+                    "starts",
+                    models.DateField(
+                        blank=True,
+                        help_text="First day bags are booked at this price; empty for no start.",
+                        null=True,
+                        verbose_name="Starts",
+                    ),
+                ),
+                (
+                    "ends",
+                    models.DateField(
+                        blank=True,
+                        help_text="Last day bags are booked at this price; empty for no end.",
+                        null=True,
+                        verbose_name="Ends",
+                    ),
+                ),
+                ("active", models.BooleanField(default=True, verbose_name="Active")),
+                (
+                    "departure",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Departure",
+                    ),
+                ),
+                (
+                    "destination",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.parklocation",
+                        verbose_name="Destination",
+                    ),
+                ),
+                (
+                    "weight",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pricing_rules",
+                        to="luggages.weight",
+                        verbose_name="Weight",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pricing Rule",
+                "verbose_name_plural": "Pricing Rules",
+                "ordering": ["name"],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.4 on 2026-10-19 13:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("luggages", "0035_pricing_rules"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CustomerDuplicate",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                (
+                    "refreshed",
+                    models.DateTimeField(help_text="When the row was last recomputed.", verbose_name="Refreshed"),
+                ),
+                (
+                    "score",
+                    models.FloatField(help_text="Similarity of the two names, from 0 to 1.25.", verbose_name="Score"),
+                ),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.customer",
+                        verbose_name="Customer",
+                    ),
+                ),
+                (
+                    "other",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="luggages.customer",
+                        verbose_name="Similar Customer",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Customer Duplicate",
+                "verbose_name_plural": "Customer Duplicates",
+                "ordering": ["-score", "customer", "other"],
+                "indexes": [models.Index(fields=["-score", "customer", "other"], name="luggages_custdup_score_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="customerduplicate",
+            constraint=models.UniqueConstraint(fields=("customer", "other"), name="luggages_custdup_uniq"),
+        ),
+    ]
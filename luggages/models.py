@@ -1,9 +1,13 @@
+import datetime
+import re
+import unicodedata
 from decimal import Decimal
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, RegexValidator
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 User = settings.AUTH_USER_MODEL
@@ -19,7 +23,54 @@ class TimestampedModel(models.Model):
         abstract = True
 
 
-class Customer(TimestampedModel):
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet of a model whose rows are marked deleted before being purged."""
+
+    def alive(self):
+        """Return the rows that have not been deleted."""
+        return self.filter(deleted__isnull=True)
+
+    def soft_delete(self):
+        """Mark the rows deleted; ``purgedeleted`` removes them and their history later."""
+        now = timezone.now()
+        return self.filter(deleted__isnull=True).update(deleted=now, updated=now)
+
+    def restore(self):
+        """Bring back rows marked deleted that have not been purged yet."""
+        return self.filter(deleted__isnull=False).update(deleted=None, updated=timezone.now())
+
+
+class SoftDeleteModel(TimestampedModel):
+    """A timestamped model whose deletion is deferred to the ``purgedeleted`` command."""
+
+    deleted = models.DateTimeField(
+        _("Deleted"),
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("When the row was deleted; it is purged with everything depending on it later."),
+    )
+
+    objects = SoftDeleteQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def unique_error_message(self, model_class, unique_check):
+        """Point at the deleted row holding the value, which the admin hides until it is restored."""
+        if len(unique_check) == 1:
+            field = model_class._meta.get_field(unique_check[0])
+            value = getattr(self, field.attname)
+            if model_class._base_manager.filter(**{field.name: value}, deleted__isnull=False).exists():
+                return ValidationError(
+                    f"A deleted {model_class._meta.verbose_name} already has this {field.verbose_name}; "
+                    "restore it from the deleted rows instead.",
+                    code="unique",
+                )
+        return super().unique_error_message(model_class, unique_check)
+
+
+class Customer(SoftDeleteModel):
     """Model representing a customer instance."""
 
     phone_number_validator = RegexValidator(
@@ -52,6 +103,9 @@ class Customer(TimestampedModel):
 
     class Meta:
         ordering = ["fullname"]
+        indexes = [
+            models.Index(fields=["updated"], name="luggages_customer_updated_idx"),
+        ]
         verbose_name = _("Customer")
         verbose_name_plural = _("Customers")
 
@@ -60,7 +114,7 @@ class Customer(TimestampedModel):
         return self.fullname
 
 
-class Bus(TimestampedModel):
+class Bus(SoftDeleteModel):
     """Model representing a bus instance."""
 
     plate_number_validator = RegexValidator(
@@ -115,7 +169,7 @@ class State(TimestampedModel):
         return self.name
 
 
-class ParkLocation(TimestampedModel):
+class ParkLocation(SoftDeleteModel):
     """Model representing a park location instance."""
 
     state = models.ForeignKey(
@@ -207,6 +261,51 @@ class BagType(TimestampedModel):
         return f"{self.name} - {self.get_size_display()}"
 
 
+def max_trip_duration():
+    """Return the longest duration a trip is allowed to have."""
+    return datetime.timedelta(hours=settings.LUGGAGE_MAX_TRIP_DURATION)
+
+
+def normalize_search_text(*parts):
+    """Lowercase, strip accents and punctuation and collapse whitespace for search."""
+    text = unicodedata.normalize("NFKD", " ".join(str(part) for part in parts if part))
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    return " ".join(re.sub(r"[\W_]+", " ", text).split())
+
+
+class TripQuerySet(models.QuerySet):
+    """Custom queryset for the Trip model."""
+
+    def overlapping(self, bus, start, end):
+        """Return the trips of ``bus`` that are on the road between ``start`` and ``end``.
+
+        Trips are bounded by ``max_trip_duration()``, so only trips departing in
+        ``(start - max duration, end)`` can overlap. That range is served by the
+        ``(bus, date_of_journey)`` index before the arrival time is checked.
+        """
+        return (
+            self.filter(
+                bus=bus,
+                date_of_journey__gt=start - max_trip_duration(),
+                date_of_journey__lt=end,
+            )
+            .alias(
+                arrival=models.ExpressionWrapper(
+                    models.F("date_of_journey") + models.F("duration"), output_field=models.DateTimeField()
+                )
+            )
+            .filter(arrival__gt=start)
+        )
+
+    def upcoming(self, departure=None):
+        """Return the trips leaving today or later, soonest first, optionally from one park."""
+        start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        trips = self.filter(date_of_journey__gte=start)
+        if departure is not None:
+            trips = trips.filter(departure=departure)
+        return trips.order_by("date_of_journey", "id")
+
+
 class Trip(TimestampedModel):
     """Model representing a trip instance."""
 
@@ -236,21 +335,76 @@ class Trip(TimestampedModel):
     date_of_journey = models.DateTimeField(
         _("Date of Journey"),
     )
+    duration = models.DurationField(
+        _("Duration"),
+        default=datetime.timedelta(hours=8),
+        help_text=_("Expected time on the road, e.g. 08:30:00."),
+    )
+
+    objects = TripQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["bus", "date_of_journey"], name="luggages_trip_bus_date_idx"),
+            models.Index(fields=["date_of_journey", "id"], name="luggages_trip_date_id_idx"),
+            models.Index(fields=["departure", "date_of_journey"], name="luggages_trip_dep_date_idx"),
+        ]
 
     def __str__(self):
         """String representation of the Trip model."""
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Override from_db method to remember the route the luggage on the trip was priced for."""
+        instance = super().from_db(db, field_names, values)
+        if "departure_id" in instance.__dict__ and "destination_id" in instance.__dict__:
+            instance._priced_route = instance.route()
+        return instance
+
+    @staticmethod
+    def build_name(departure_code, destination_code, date_of_journey):
+        """Build a trip name from the state short codes and the journey date."""
+        return f"{departure_code}-to-{destination_code}-{date_of_journey.strftime('%d-%m-%Y')}"
+
     def save(self, *args, **kwargs):
-        """Override save method to automatically generate Trip name."""
+        """Override save method to automatically generate Trip name and reprice its luggage on a new route."""
         # Format trip name based on departure and destination location
-        self.name = f"{self.departure.state.short_code}-to-{self.destination.state.short_code}-{self.date_of_journey.strftime('%d-%m-%Y')}"
+        name = self.build_name(
+            self.departure.state.short_code,
+            self.destination.state.short_code,
+            self.date_of_journey,
+        )
+        # Keep the suffix given to same-day trips on the same route by the timetable generator
+        if not (self.name or "").startswith(f"{name}-"):
+            self.name = name
         super().save(*args, **kwargs)
+        priced_route, self._priced_route = getattr(self, "_priced_route", None), self.route()
+        if priced_route not in (None, self._priced_route):
+            # Imported here because the pricing engine is compiled from these models
+            from .pricing import reprice_items
+
+            reprice_items(Luggage.objects.filter(luggagebill__trip=self))
+
+    def route(self):
+        """Return the departure and destination ids of the trip."""
+        return self.departure_id, self.destination_id
 
     def clean(self):
-        """Ensure departure and destination locations are different."""
+        """Ensure departure and destination differ and the bus is not double-booked."""
         if self.departure_id == self.destination_id:
             raise ValidationError("Departure and destination locations must be different.")
+        if self.duration is not None and not datetime.timedelta(0) < self.duration <= max_trip_duration():
+            raise ValidationError({"duration": f"Duration must be positive and at most {max_trip_duration()}."})
+        if self.bus_id and self.date_of_journey and self.duration:
+            clash = (
+                Trip.objects.overlapping(self.bus_id, self.date_of_journey, self.date_of_journey + self.duration)
+                .exclude(pk=self.pk)
+                .order_by("date_of_journey")
+                .first()
+            )
+            if clash is not None:
+                raise ValidationError({"bus": f"This bus is already booked for trip {clash} at that time."})
 
     def total_luggage_amount(self):
         """Calculate the total luggage amount for the trip."""
@@ -276,9 +430,38 @@ class LuggageBill(TimestampedModel):
         on_delete=models.CASCADE,
         verbose_name=_("Added by"),
     )
+    receipt_number = models.CharField(
+        _("Receipt Number"),
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_("Departure park, day and sequence within that day, e.g. 007-241019-0042."),
+    )
+    search_document = models.TextField(
+        _("Search document"),
+        blank=True,
+        editable=False,
+        help_text=_("Normalised customer name, trip name, plate number and route used by the admin search."),
+    )
+    settlement = models.ForeignKey(
+        "Settlement",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="settled_bills",
+        verbose_name=_("Settlement"),
+        help_text=_("Daily close of the departure park the bill was settled in; settled bills cannot change."),
+    )
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["created", "id"], name="luggages_bill_created_id_idx"),
+            models.Index(fields=["added_by", "created"], name="luggages_bill_added_by_idx"),
+        ]
         verbose_name = _("Luggage Bill")
         verbose_name_plural = _("Luggage Bills")
 
@@ -286,13 +469,53 @@ class LuggageBill(TimestampedModel):
         """String representation of the LuggageBill model."""
         return f"Luggage Bill for {self.customer}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Override from_db method to remember the trip the items were priced for."""
+        instance = super().from_db(db, field_names, values)
+        instance._priced_trip_id = instance.__dict__.get("trip_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Override save method to keep the search document in sync and reprice items moved to another route."""
+        self.search_document = self.build_search_document()
+        super().save(*args, **kwargs)
+        priced_trip_id, self._priced_trip_id = getattr(self, "_priced_trip_id", None), self.trip_id
+        if priced_trip_id not in (None, self.trip_id):
+            trips = Trip.objects.filter(pk__in=[priced_trip_id, self.trip_id])
+            if len(set(trips.values_list("departure", "destination"))) > 1:
+                self.reprice_items()
+
+    def reprice_items(self):
+        """Capture the price of the items again, for the current route of the bill."""
+        # Imported here because the pricing engine is compiled from these models
+        from .pricing import reprice_items
+
+        reprice_items(self.items.all())
+
+    def clean(self):
+        """Refuse changes to a bill whose day was settled."""
+        if self.settlement_id is not None:
+            raise ValidationError(f"This bill was settled in {self.settlement} and can no longer change.")
+
+    def build_search_document(self):
+        """Build the normalised text the admin search matches bills against."""
+        trip = self.trip
+        return normalize_search_text(
+            self.customer.fullname,
+            trip.name,
+            trip.bus.plate_number,
+            trip.departure.location,
+            trip.destination.location,
+        )
+
     def total_amount(self):
         """Calculate the total amount for the luggage bill."""
         return sum(item.amount() for item in self.items.all())
 
     def total_weight_per_customer(self):
         """Calculate the total weight per customer for the luggage bill."""
-        return sum(item.weight.min_weight for item in self.items.all())
+        return sum(item.unit_weight for item in self.items.all())
 
 
 class Luggage(TimestampedModel):
@@ -319,9 +542,26 @@ class Luggage(TimestampedModel):
         default=1,
         validators=[MinValueValidator(1)],
     )
+    unit_price = models.DecimalField(
+        _("Unit Price"),
+        max_digits=10,
+        decimal_places=2,
+        editable=False,
+        help_text=_(
+            "Price of one bag when the item was booked, after the pricing rules; later changes leave it alone."
+        ),
+    )
+    unit_weight = models.PositiveIntegerField(
+        _("Unit Weight"),
+        editable=False,
+        help_text=_("Minimum weight of the weight when the item was booked, in kilograms."),
+    )
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["created", "id"], name="luggages_item_created_id_idx"),
+        ]
         verbose_name = _("Luggage")
         verbose_name_plural = _("Luggages")
 
@@ -329,6 +569,1136 @@ class Luggage(TimestampedModel):
         """String representation of the Luggage model."""
         return str(self.id)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Override from_db method to remember what the stored price was captured from."""
+        instance = super().from_db(db, field_names, values)
+        instance._priced_key = instance.pricing_key()
+        return instance
+
+    def save(self, *args, **kwargs):
+        """Override save method to capture the price of a new item, or of an item whose weight, bag or bill changed."""
+        if self.unit_price is None or self.pricing_key() != getattr(self, "_priced_key", None):
+            self.capture_price()
+        super().save(*args, **kwargs)
+        self._priced_key = self.pricing_key()
+
+    def pricing_key(self):
+        """Return the fields the unit price depends on; the route of the bill is watched by the bill and trip."""
+        return tuple(self.__dict__.get(field) for field in ("weight_id", "bag_type_id", "luggagebill_id"))
+
+    def capture_price(self):
+        """Price the item from its weight and the pricing rules in force today."""
+        # Imported here because the pricing engine is compiled from these models
+        from .pricing import price_luggage
+
+        price_luggage(self)
+
     def amount(self):
         """Calculate the amount for the luggage."""
-        return self.weight.price * self.quantity
+        return self.unit_price * self.quantity
+
+    def clean(self):
+        """Refuse changes to the items of a settled bill."""
+        bill = LuggageBill.objects.filter(pk=self.luggagebill_id, settlement__isnull=False).first()
+        if bill is not None:
+            bill.clean()
+
+
+class BagTag(TimestampedModel):
+    """Model representing the tag attached to one physical bag of a luggage item."""
+
+    class Status(models.TextChoices):
+        """Choices for where the bag is."""
+
+        CHECKED_IN = "checked_in", _("Checked in")
+        LOADED = "loaded", _("Loaded")
+        DELIVERED = "delivered", _("Delivered")
+
+    luggage = models.ForeignKey(
+        Luggage,
+        on_delete=models.CASCADE,
+        related_name="tags",
+        verbose_name=_("Luggage"),
+    )
+    sequence = models.PositiveSmallIntegerField(
+        _("Sequence"),
+        help_text=_("Number of the bag within its luggage item, from 1 to the quantity."),
+    )
+    code = models.CharField(
+        _("Tag Code"),
+        max_length=8,
+        unique=True,
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=10,
+        choices=Status.choices,
+        default=Status.CHECKED_IN,
+    )
+    scanned_at = models.DateTimeField(
+        _("Last Scanned"),
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["luggage", "sequence"]
+        constraints = [
+            models.UniqueConstraint(fields=["luggage", "sequence"], name="luggages_bagtag_luggage_seq_uniq"),
+        ]
+        verbose_name = _("Bag Tag")
+        verbose_name_plural = _("Bag Tags")
+
+    def __str__(self):
+        """String representation of the BagTag model."""
+        return self.code
+
+
+class TripSchedule(TimestampedModel):
+    """Model representing a recurring timetable entry used to generate trips."""
+
+    class Weekday(models.IntegerChoices):
+        """Choices for the day of the week, numbered like ``date.weekday()``."""
+
+        MONDAY = 0, _("Monday")
+        TUESDAY = 1, _("Tuesday")
+        WEDNESDAY = 2, _("Wednesday")
+        THURSDAY = 3, _("Thursday")
+        FRIDAY = 4, _("Friday")
+        SATURDAY = 5, _("Saturday")
+        SUNDAY = 6, _("Sunday")
+
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name="schedules",
+        verbose_name=_("Bus"),
+    )
+    departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="scheduled_departures",
+        verbose_name=_("Departure"),
+    )
+    destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="scheduled_arrivals",
+        verbose_name=_("Destination"),
+    )
+    weekday = models.PositiveSmallIntegerField(
+        _("Weekday"),
+        choices=Weekday.choices,
+    )
+    departure_time = models.TimeField(
+        _("Departure Time"),
+    )
+    duration = models.DurationField(
+        _("Duration"),
+        default=datetime.timedelta(hours=8),
+        help_text=_("Expected time on the road, e.g. 08:30:00."),
+    )
+    active = models.BooleanField(
+        _("Active"),
+        default=True,
+        help_text=_("Only active schedules are used when generating trips."),
+    )
+
+    class Meta:
+        ordering = ["weekday", "departure_time"]
+        verbose_name = _("Trip Schedule")
+        verbose_name_plural = _("Trip Schedules")
+
+    def __str__(self):
+        """String representation of the TripSchedule model."""
+        return (
+            f"{self.departure} to {self.destination} every {self.get_weekday_display()} at {self.departure_time:%H:%M}"
+        )
+
+    def clean(self):
+        """Ensure departure and destination differ and the duration is within bounds."""
+        if self.departure_id == self.destination_id:
+            raise ValidationError("Departure and destination locations must be different.")
+        if self.duration is not None and not datetime.timedelta(0) < self.duration <= max_trip_duration():
+            raise ValidationError({"duration": f"Duration must be positive and at most {max_trip_duration()}."})
+
+
+class DailyCount(models.Model):
+    """Model holding a row count per local day, used by the admin date drill-down."""
+
+    class Kind(models.TextChoices):
+        """Choices for the counted model and date field."""
+
+        BILL_CREATED = "bill_created", _("Luggage bills by creation date")
+        TRIP_JOURNEY = "trip_journey", _("Trips by date of journey")
+
+    kind = models.CharField(
+        _("Kind"),
+        max_length=20,
+        choices=Kind.choices,
+    )
+    day = models.DateField(
+        _("Day"),
+        help_text=_("Day in the local time zone."),
+    )
+    count = models.IntegerField(
+        _("Count"),
+        default=0,
+    )
+
+    class Meta:
+        ordering = ["kind", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["kind", "day"], name="luggages_dailycount_kind_day_uniq"),
+        ]
+        verbose_name = _("Daily Count")
+        verbose_name_plural = _("Daily Counts")
+
+    def __str__(self):
+        """String representation of the DailyCount model."""
+        return f"{self.get_kind_display()} on {self.day}: {self.count}"
+
+
+class BillSearchTrigram(models.Model):
+    """Model holding the trigrams of a bill's search document.
+
+    Only used on databases without ``pg_trgm``; with the extension
+    PostgreSQL indexes the search document directly.
+    """
+
+    bill = models.ForeignKey(
+        LuggageBill,
+        on_delete=models.CASCADE,
+        related_name="search_trigrams",
+        verbose_name=_("Luggage Bill"),
+    )
+    trigram = models.CharField(
+        _("Trigram"),
+        max_length=3,
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["trigram", "bill"], name="luggages_billtrigram_uniq"),
+        ]
+        verbose_name = _("Bill Search Trigram")
+        verbose_name_plural = _("Bill Search Trigrams")
+
+    def __str__(self):
+        """String representation of the BillSearchTrigram model."""
+        return self.trigram
+
+
+class StaffProfile(TimestampedModel):
+    """Model representing the park a staff member works at."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name="staff_profile",
+        verbose_name=_("User"),
+    )
+    park = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="staff",
+        verbose_name=_("Park"),
+        help_text=_("Park the staff member books luggage at."),
+    )
+
+    class Meta:
+        ordering = ["user"]
+        verbose_name = _("Staff Profile")
+        verbose_name_plural = _("Staff Profiles")
+
+    def __str__(self):
+        """String representation of the StaffProfile model."""
+        return f"{self.user} at {self.park}"
+
+
+class ReceiptSequence(models.Model):
+    """Model holding the highest receipt number handed out per park and day."""
+
+    park = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="receipt_sequences",
+        verbose_name=_("Park"),
+    )
+    day = models.DateField(
+        _("Day"),
+    )
+    high_water = models.PositiveIntegerField(
+        _("High-water Mark"),
+        default=0,
+        help_text=_("Last number reserved, including numbers held in unused blocks."),
+    )
+
+    class Meta:
+        ordering = ["park", "day"]
+        constraints = [
+            models.UniqueConstraint(fields=["park", "day"], name="luggages_receiptseq_park_day_uniq"),
+        ]
+        verbose_name = _("Receipt Sequence")
+        verbose_name_plural = _("Receipt Sequences")
+
+    def __str__(self):
+        """String representation of the ReceiptSequence model."""
+        return f"{self.park} on {self.day}: {self.high_water}"
+
+
+class ArchivedModel(models.Model):
+    """A model holding rows moved out of a live table, keeping their ids and timestamps."""
+
+    id = models.BigIntegerField(
+        _("ID"),
+        primary_key=True,
+    )
+    created = models.DateTimeField()
+    updated = models.DateTimeField()
+    archived = models.DateTimeField(
+        _("Archived"),
+        auto_now_add=True,
+    )
+
+    class Meta:
+        abstract = True
+
+
+class ArchivedTrip(ArchivedModel):
+    """Model representing a completed trip moved out of the live trips table."""
+
+    name = models.CharField(
+        _("Trip"),
+        max_length=50,
+        unique=True,
+    )
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name="archived_trips",
+        verbose_name=_("Bus"),
+    )
+    departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="archived_departures",
+        verbose_name=_("Departure"),
+    )
+    destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="archived_arrivals",
+        verbose_name=_("Destination"),
+    )
+    date_of_journey = models.DateTimeField(
+        _("Date of Journey"),
+    )
+    duration = models.DurationField(
+        _("Duration"),
+    )
+
+    class Meta:
+        ordering = ["-date_of_journey"]
+        indexes = [
+            models.Index(fields=["date_of_journey", "id"], name="luggages_atrip_date_id_idx"),
+        ]
+        verbose_name = _("Archived Trip")
+        verbose_name_plural = _("Archived Trips")
+
+    def __str__(self):
+        """String representation of the ArchivedTrip model."""
+        return self.name
+
+
+class ArchivedLuggageBill(ArchivedModel):
+    """Model representing a luggage bill of an archived trip."""
+
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name="archived_bills",
+        verbose_name=_("Customer"),
+    )
+    trip = models.ForeignKey(
+        ArchivedTrip,
+        on_delete=models.CASCADE,
+        related_name="luggagebills",
+        verbose_name=_("Trip"),
+    )
+    added_by = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Added by"),
+    )
+    receipt_number = models.CharField(
+        _("Receipt Number"),
+        max_length=32,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    search_document = models.TextField(
+        _("Search document"),
+        blank=True,
+    )
+    settlement = models.ForeignKey(
+        "Settlement",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="settled_archived_bills",
+        verbose_name=_("Settlement"),
+    )
+
+    class Meta:
+        ordering = ["-created"]
+        indexes = [
+            models.Index(fields=["created", "id"], name="luggages_abill_created_id_idx"),
+            models.Index(fields=["added_by", "created"], name="luggages_abill_added_by_idx"),
+        ]
+        verbose_name = _("Archived Luggage Bill")
+        verbose_name_plural = _("Archived Luggage Bills")
+
+    def __str__(self):
+        """String representation of the ArchivedLuggageBill model."""
+        return f"Luggage Bill for {self.customer}"
+
+    def total_amount(self):
+        """Calculate the total amount for the archived luggage bill."""
+        return sum(item.amount() for item in self.items.all())
+
+
+class ArchivedLuggage(ArchivedModel):
+    """Model representing a piece of luggage of an archived bill."""
+
+    luggagebill = models.ForeignKey(
+        ArchivedLuggageBill,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name=_("Luggage Bill"),
+    )
+    weight = models.ForeignKey(
+        Weight,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Weight"),
+    )
+    bag_type = models.ForeignKey(
+        BagType,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Bag Type"),
+    )
+    quantity = models.PositiveIntegerField(
+        _("Quantity"),
+    )
+    unit_price = models.DecimalField(
+        _("Unit Price"),
+        max_digits=10,
+        decimal_places=2,
+    )
+    unit_weight = models.PositiveIntegerField(
+        _("Unit Weight"),
+    )
+
+    class Meta:
+        ordering = ["-created"]
+        verbose_name = _("Archived Luggage")
+        verbose_name_plural = _("Archived Luggages")
+
+    def __str__(self):
+        """String representation of the ArchivedLuggage model."""
+        return str(self.id)
+
+    def amount(self):
+        """Calculate the amount for the archived luggage."""
+        return self.unit_price * self.quantity
+
+
+class ArchivedBagTag(ArchivedModel):
+    """Model representing the tag of a bag of an archived luggage item."""
+
+    luggage = models.ForeignKey(
+        ArchivedLuggage,
+        on_delete=models.CASCADE,
+        related_name="tags",
+        verbose_name=_("Luggage"),
+    )
+    sequence = models.PositiveSmallIntegerField(
+        _("Sequence"),
+    )
+    code = models.CharField(
+        _("Tag Code"),
+        max_length=8,
+        unique=True,
+    )
+    status = models.CharField(
+        _("Status"),
+        max_length=10,
+        choices=BagTag.Status.choices,
+    )
+    scanned_at = models.DateTimeField(
+        _("Last Scanned"),
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["luggage", "sequence"]
+        verbose_name = _("Archived Bag Tag")
+        verbose_name_plural = _("Archived Bag Tags")
+
+    def __str__(self):
+        """String representation of the ArchivedBagTag model."""
+        return self.code
+
+
+class AggregateModel(models.Model):
+    """A model holding figures derived from the bills, rebuilt by ``rebuild_aggregates``."""
+
+    refreshed = models.DateTimeField(
+        _("Refreshed"),
+        help_text=_("When the row was last recomputed."),
+    )
+
+    class Meta:
+        abstract = True
+
+
+class BillTotal(AggregateModel):
+    """Model holding the totals of a live or archived luggage bill."""
+
+    bill = models.BigIntegerField(
+        _("Luggage Bill"),
+        primary_key=True,
+        help_text=_("Id of the live or archived bill."),
+    )
+    trip = models.BigIntegerField(
+        _("Trip"),
+        help_text=_("Id of the live or archived trip."),
+    )
+    day = models.DateField(
+        _("Day of Journey"),
+    )
+    items = models.PositiveIntegerField(
+        _("Items"),
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    amount = models.DecimalField(
+        _("Amount"),
+        max_digits=12,
+        decimal_places=2,
+    )
+    archived = models.BooleanField(
+        _("Archived"),
+    )
+
+    class Meta:
+        ordering = ["day", "bill"]
+        indexes = [
+            models.Index(fields=["day"], name="luggages_billtotal_day_idx"),
+            models.Index(fields=["trip"], name="luggages_billtotal_trip_idx"),
+        ]
+        verbose_name = _("Bill Total")
+        verbose_name_plural = _("Bill Totals")
+
+    def __str__(self):
+        """String representation of the BillTotal model."""
+        return f"Bill {self.bill}: {self.amount}"
+
+
+class TripRevenue(AggregateModel):
+    """Model holding the bills, bags, weight and revenue of a live or archived trip."""
+
+    trip = models.BigIntegerField(
+        _("Trip"),
+        primary_key=True,
+        help_text=_("Id of the live or archived trip."),
+    )
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Bus"),
+    )
+    departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Departure"),
+    )
+    destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Destination"),
+    )
+    day = models.DateField(
+        _("Day of Journey"),
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    revenue = models.DecimalField(
+        _("Revenue"),
+        max_digits=14,
+        decimal_places=2,
+    )
+    archived = models.BooleanField(
+        _("Archived"),
+    )
+
+    class Meta:
+        ordering = ["day", "trip"]
+        indexes = [
+            models.Index(fields=["day"], name="luggages_triprevenue_day_idx"),
+        ]
+        verbose_name = _("Trip Revenue")
+        verbose_name_plural = _("Trip Revenues")
+
+    def __str__(self):
+        """String representation of the TripRevenue model."""
+        return f"Trip {self.trip}: {self.revenue}"
+
+
+class DailyRevenue(AggregateModel):
+    """Model holding the trips, bills and revenue departing a park on a day."""
+
+    day = models.DateField(
+        _("Day of Journey"),
+    )
+    park = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="daily_revenues",
+        verbose_name=_("Departure Park"),
+    )
+    trips = models.PositiveIntegerField(
+        _("Trips"),
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    revenue = models.DecimalField(
+        _("Revenue"),
+        max_digits=14,
+        decimal_places=2,
+    )
+
+    class Meta:
+        ordering = ["day", "park"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "park"], name="luggages_dailyrevenue_uniq"),
+        ]
+        verbose_name = _("Daily Revenue")
+        verbose_name_plural = _("Daily Revenues")
+
+    def __str__(self):
+        """String representation of the DailyRevenue model."""
+        return f"{self.park} on {self.day}: {self.revenue}"
+
+
+class BusUtilisation(AggregateModel):
+    """Model holding how much luggage a bus carried on a day against what it could carry."""
+
+    day = models.DateField(
+        _("Day of Journey"),
+    )
+    bus = models.ForeignKey(
+        Bus,
+        on_delete=models.CASCADE,
+        related_name="utilisation",
+        verbose_name=_("Bus"),
+    )
+    trips = models.PositiveIntegerField(
+        _("Trips"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    capacity = models.PositiveIntegerField(
+        _("Capacity (kg)"),
+        null=True,
+        blank=True,
+        help_text=_("Maximum luggage weight of the bus times its trips; empty when the bus has no maximum."),
+    )
+
+    class Meta:
+        ordering = ["day", "bus"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "bus"], name="luggages_busutilisation_uniq"),
+        ]
+        verbose_name = _("Bus Utilisation")
+        verbose_name_plural = _("Bus Utilisation")
+
+    def __str__(self):
+        """String representation of the BusUtilisation model."""
+        return f"{self.bus} on {self.day}: {self.kilograms}kg"
+
+    @property
+    def load_factor(self):
+        """Share of the capacity used, or None when the bus has no maximum."""
+        if not self.capacity:
+            return None
+        return self.kilograms / self.capacity
+
+
+class CustomerSummary(AggregateModel):
+    """Model holding the lifetime trips, spend and favourite route of a customer."""
+
+    customer = models.OneToOneField(
+        Customer,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="summary",
+        verbose_name=_("Customer"),
+    )
+    trips = models.PositiveIntegerField(
+        _("Trips"),
+        default=0,
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+        default=0,
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+        default=0,
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+        default=0,
+    )
+    spend = models.DecimalField(
+        _("Total Spend"),
+        max_digits=14,
+        decimal_places=2,
+        default=0,
+    )
+    last_trip = models.DateTimeField(
+        _("Last Trip"),
+        null=True,
+        blank=True,
+    )
+    favourite_departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Favourite Departure"),
+    )
+    favourite_destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Favourite Destination"),
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["spend"], name="luggages_custsum_spend_idx"),
+            models.Index(fields=["trips"], name="luggages_custsum_trips_idx"),
+            models.Index(fields=["kilograms"], name="luggages_custsum_kg_idx"),
+            models.Index(fields=["last_trip"], name="luggages_custsum_last_idx"),
+        ]
+        verbose_name = _("Customer Summary")
+        verbose_name_plural = _("Customer Summaries")
+
+    def __str__(self):
+        """String representation of the CustomerSummary model."""
+        return f"{self.customer}: {self.trips} trips, {self.spend}"
+
+    @property
+    def favourite_route(self):
+        """The route the customer sent most bills on, as text."""
+        if self.favourite_departure_id is None:
+            return ""
+        return f"{self.favourite_departure} to {self.favourite_destination}"
+
+
+class RouteWeek(AggregateModel):
+    """Model holding the trips, load, revenue and bag mix of a route in a week."""
+
+    departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Departure"),
+    )
+    destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Destination"),
+    )
+    week = models.DateField(
+        _("Week"),
+        help_text=_("Monday the week of journey starts on."),
+    )
+    trips = models.PositiveIntegerField(
+        _("Trips"),
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    revenue = models.DecimalField(
+        _("Revenue"),
+        max_digits=14,
+        decimal_places=2,
+    )
+    capacity = models.PositiveIntegerField(
+        _("Capacity (kg)"),
+        help_text=_("Maximum luggage weight summed over the trips whose bus has one."),
+    )
+    capacity_kilograms = models.PositiveIntegerField(
+        _("Kilograms against Capacity"),
+        help_text=_("Kilograms carried by the trips counted in the capacity."),
+    )
+    small_bags = models.PositiveIntegerField(
+        _("Small Bags"),
+    )
+    medium_bags = models.PositiveIntegerField(
+        _("Medium Bags"),
+    )
+    large_bags = models.PositiveIntegerField(
+        _("Large Bags"),
+    )
+
+    class Meta:
+        ordering = ["week", "departure", "destination"]
+        constraints = [
+            models.UniqueConstraint(fields=["departure", "destination", "week"], name="luggages_routeweek_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["week"], name="luggages_routeweek_week_idx"),
+        ]
+        verbose_name = _("Route Week")
+        verbose_name_plural = _("Route Weeks")
+
+    def __str__(self):
+        """String representation of the RouteWeek model."""
+        return f"{self.departure} to {self.destination}, week of {self.week}"
+
+
+class StaffDay(AggregateModel):
+    """Model holding the bills, bags and revenue a staff member booked at a park on a day."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Staff Member"),
+    )
+    day = models.DateField(
+        _("Day"),
+        help_text=_("Local day the bills were created."),
+    )
+    park = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Park"),
+        help_text=_("Departure park of the trips the bills were booked on."),
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+    )
+    revenue = models.DecimalField(
+        _("Revenue"),
+        max_digits=14,
+        decimal_places=2,
+    )
+
+    class Meta:
+        ordering = ["day", "park", "user"]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day", "park"], name="luggages_staffday_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["day", "park"], name="luggages_staffday_day_idx"),
+        ]
+        verbose_name = _("Staff Day")
+        verbose_name_plural = _("Staff Days")
+
+    def __str__(self):
+        """String representation of the StaffDay model."""
+        return f"{self.user} at {self.park} on {self.day}: {self.bills} bills"
+
+
+class Settlement(TimestampedModel):
+    """Model holding the frozen totals of the bills created at a departure park on a day.
+
+    Written once by ``settlements.close_day``; the prices of the items are
+    kept on its ``SettlementLine`` rows, so later price changes do not alter it.
+    """
+
+    park = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.PROTECT,
+        related_name="settlements",
+        verbose_name=_("Departure Park"),
+    )
+    day = models.DateField(
+        _("Day"),
+        help_text=_("Local day the settled bills were created."),
+    )
+    closed_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Closed by"),
+        help_text=_("Empty when the day was closed by the closeday command."),
+    )
+    bills = models.PositiveIntegerField(
+        _("Bills"),
+    )
+    bags = models.PositiveIntegerField(
+        _("Bags"),
+    )
+    kilograms = models.PositiveIntegerField(
+        _("Kilograms"),
+    )
+    revenue = models.DecimalField(
+        _("Revenue"),
+        max_digits=14,
+        decimal_places=2,
+    )
+
+    class Meta:
+        ordering = ["-day", "park"]
+        constraints = [
+            models.UniqueConstraint(fields=["park", "day"], name="luggages_settlement_uniq"),
+        ]
+        verbose_name = _("Settlement")
+        verbose_name_plural = _("Settlements")
+
+    def __str__(self):
+        """String representation of the Settlement model."""
+        return f"{self.park} on {self.day}"
+
+
+class SettlementLine(models.Model):
+    """Model holding a luggage item as it was priced when its day was settled."""
+
+    settlement = models.ForeignKey(
+        Settlement,
+        on_delete=models.CASCADE,
+        related_name="lines",
+        verbose_name=_("Settlement"),
+    )
+    bill = models.BigIntegerField(
+        _("Bill"),
+        help_text=_("Id of the bill, which may since have been archived."),
+    )
+    item = models.BigIntegerField(
+        _("Item"),
+        help_text=_("Id of the luggage item, which may since have been archived."),
+    )
+    weight = models.ForeignKey(
+        Weight,
+        on_delete=models.PROTECT,
+        related_name="+",
+        verbose_name=_("Weight"),
+    )
+    bag_type = models.ForeignKey(
+        BagType,
+        on_delete=models.PROTECT,
+        related_name="+",
+        verbose_name=_("Bag Type"),
+    )
+    quantity = models.PositiveIntegerField(
+        _("Quantity"),
+    )
+    unit_price = models.DecimalField(
+        _("Unit Price"),
+        max_digits=10,
+        decimal_places=2,
+    )
+    unit_weight = models.PositiveIntegerField(
+        _("Unit Weight"),
+    )
+    amount = models.DecimalField(
+        _("Amount"),
+        max_digits=14,
+        decimal_places=2,
+    )
+
+    class Meta:
+        ordering = ["settlement", "bill", "item"]
+        constraints = [
+            models.UniqueConstraint(fields=["settlement", "item"], name="luggages_settlementline_uniq"),
+        ]
+        verbose_name = _("Settlement Line")
+        verbose_name_plural = _("Settlement Lines")
+
+    def __str__(self):
+        """String representation of the SettlementLine model."""
+        return f"Item {self.item} of bill {self.bill}: {self.amount}"
+
+
+class PricingRule(TimestampedModel):
+    """Model representing an adjustment of the price of the bags matching a route, weight and size.
+
+    The unit price of a bag is the price of its weight times the multipliers
+    of every active rule matching it, plus their surcharges. Fields left empty
+    match everything.
+    """
+
+    name = models.CharField(
+        _("Name"),
+        max_length=100,
+    )
+    departure = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Departure"),
+    )
+    destination = models.ForeignKey(
+        ParkLocation,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Destination"),
+    )
+    weight = models.ForeignKey(
+        Weight,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="pricing_rules",
+        verbose_name=_("Weight"),
+    )
+    size = models.CharField(
+        _("Bag Size"),
+        max_length=1,
+        choices=BagType.SizeOption.choices,
+        blank=True,
+    )
+    multiplier = models.DecimalField(
+        _("Multiplier"),
+        max_digits=6,
+        decimal_places=3,
+        default=Decimal("1"),
+        validators=[MinValueValidator(Decimal("0"))],
+        help_text=_("Factor applied to the price of the weight, e.g. 1.2 for a 20% route premium."),
+    )
+    surcharge = models.DecimalField(
+        _("Surcharge"),
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0"),
+        help_text=_("Amount added per bag; negative for a discount."),
+    )
+    starts = models.DateField(
+        _("Starts"),
+        null=True,
+        blank=True,
+        help_text=_("First day bags are booked at this price; empty for no start."),
+    )
+    ends = models.DateField(
+        _("Ends"),
+        null=True,
+        blank=True,
+        help_text=_("Last day bags are booked at this price; empty for no end."),
+    )
+    active = models.BooleanField(
+        _("Active"),
+        default=True,
+    )
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = _("Pricing Rule")
+        verbose_name_plural = _("Pricing Rules")
+
+    def __str__(self):
+        """String representation of the PricingRule model."""
+        return self.name
+
+    def clean(self):
+        """Ensure a route names both parks and the dates are in order."""
+        if (self.departure_id is None) != (self.destination_id is None):
+            raise ValidationError("Give both the departure and the destination of the route, or neither.")
+        if self.departure_id is not None and self.departure_id == self.destination_id:
+            raise ValidationError("Departure and destination locations must be different.")
+        if self.starts and self.ends and self.starts > self.ends:
+            raise ValidationError({"ends": "The rule must end on or after the day it starts."})
+
+    def matches(self, route, weight_id, size):
+        """Return whether the rule applies to bags of ``weight_id`` and ``size`` on ``route``."""
+        return (
+            (self.departure_id is None or (self.departure_id, self.destination_id) == route)
+            and (self.weight_id is None or self.weight_id == weight_id)
+            and (not self.size or self.size == size)
+        )
+
+
+class CustomerDuplicate(AggregateModel):
+    """Model holding a pair of customers whose names look alike, found by ``findduplicatecustomers``."""
+
+    customer = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Customer"),
+    )
+    other = models.ForeignKey(
+        Customer,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("Similar Customer"),
+    )
+    score = models.FloatField(
+        _("Score"),
+        help_text=_("Similarity of the two names, from 0 to 1.25."),
+    )
+
+    class Meta:
+        ordering = ["-score", "customer", "other"]
+        constraints = [
+            models.UniqueConstraint(fields=["customer", "other"], name="luggages_custdup_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["-score", "customer", "other"], name="luggages_custdup_score_idx"),
+        ]
+        verbose_name = _("Customer Duplicate")
+        verbose_name_plural = _("Customer Duplicates")
+
+    def __str__(self):
+        """String representation of the CustomerDuplicate model."""
+        return f"{self.customer} and {self.other}: {self.score:.2f}"
@@ -0,0 +1,239 @@
+"""Keyset pagination and cheap result counts for large admin changelists.
+
+Django's changelist paginates with ``OFFSET`` and runs ``COUNT(*)`` twice per
+page. On tables with millions of rows both get slower the deeper a clerk
+pages. ``KeysetChangeList`` instead seeks from the last row shown using the
+admin's keyset ordering (e.g. ``("-created", "-id")``), and reports an
+estimated count taken from the backend statistics or a cached count.
+
+Autocomplete widgets only need to know whether another page exists, so
+``LookaheadPaginator`` fetches one extra row instead of counting, and
+``BoundedInlineFormSet`` caps how many related rows an inline loads.
+"""
+
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ALL_VAR, ORDER_VAR, ChangeList
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.forms.models import BaseInlineFormSet
+
+AFTER_VAR = "after"
+BEFORE_VAR = "before"
+CURSOR_VARS = (AFTER_VAR, BEFORE_VAR)
+
+
+def estimated_count(queryset):
+    """Return a cheap, possibly approximate, number of rows in ``queryset``.
+
+    Unfiltered querysets on PostgreSQL use the planner statistics from
+    ``pg_class``. Everything else is counted once and cached for
+    ``LUGGAGE_COUNT_CACHE_TIMEOUT`` seconds.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql" and not queryset.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        # Statistics are missing (-1) or meaningless until the table was analyzed.
+        if row and row[0] >= settings.LUGGAGE_COUNT_ESTIMATE_THRESHOLD:
+            return row[0]
+    sql, params = queryset.query.sql_with_params()
+    key = "luggages:count:" + hashlib.md5(f"{queryset.db}:{sql}:{params!r}".encode()).hexdigest()
+    return cache.get_or_set(key, queryset.count, settings.LUGGAGE_COUNT_CACHE_TIMEOUT)
+
+
+def encode_cursor(values):
+    payload = json.dumps(values, default=str, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(payload)
+
+
+class KeysetChangeList(ChangeList):
+    """A changelist that pages by seeking on the admin's ``keyset_ordering``.
+
+    Keyset mode is used while the list is in its default order. Sorting by a
+    column, showing all rows or editing in the list fall back to the regular
+    paginator. Search and ``list_filter`` are applied as usual since only the
+    pagination step is replaced.
+    """
+
+    keyset_mode = False
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = None
+        self.cursor_direction = None
+        for var in CURSOR_VARS:
+            if var in request.GET:
+                self.cursor_direction = var
+                self.cursor = request.GET[var]
+                break
+        super().__init__(request, *args, **kwargs)
+
+    @property
+    def keyset(self):
+        return self.model_admin.keyset_ordering
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        for var in CURSOR_VARS:
+            lookup_params.pop(var, None)
+        return lookup_params
+
+    def get_query_string(self, new_params=None, remove=None):
+        # Filters, search and sorting links start again from the first page.
+        new_params = dict(new_params or {})
+        for var in CURSOR_VARS:
+            new_params.setdefault(var, None)
+        return super().get_query_string(new_params, remove)
+
+    def use_keyset(self):
+        return not (ORDER_VAR in self.params or ALL_VAR in self.params or self.list_editable)
+
+    def keyset_filter(self, values, forward):
+        """Build the ``(a, b) > (x, y)`` seek predicate for the keyset fields."""
+        query = Q()
+        equal = Q()
+        for field_name, value in zip(self.keyset, values):
+            name = field_name.lstrip("-")
+            lookup = "lt" if field_name.startswith("-") == forward else "gt"
+            query |= equal & Q(**{f"{name}__{lookup}": value})
+            equal &= Q(**{name: value})
+        return query
+
+    def get_results(self, request):
+        if not self.use_keyset():
+            return super().get_results(request)
+
+        ordering = list(self.keyset)
+        queryset = self.queryset.order_by(*ordering)
+        if self.cursor:
+            try:
+                raw_values = decode_cursor(self.cursor)
+                values = [
+                    self.lookup_opts.get_field(name.lstrip("-")).to_python(value)
+                    for name, value in zip(ordering, raw_values)
+                ]
+            except (ValueError, TypeError, ValidationError) as error:
+                raise IncorrectLookupParameters(error)
+            if self.cursor_direction == AFTER_VAR:
+                queryset = queryset.filter(self.keyset_filter(values, forward=True))
+            else:
+                queryset = queryset.filter(self.keyset_filter(values, forward=False)).reverse()
+
+        rows = list(queryset[: self.list_per_page + 1])
+        has_more = len(rows) > self.list_per_page
+        rows = rows[: self.list_per_page]
+        if self.cursor_direction == BEFORE_VAR:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, bool(self.cursor)
+
+        self.keyset_mode = True
+        self.result_list = rows
+        self.result_count = estimated_count(self.queryset)
+        self.full_result_count = None
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.can_show_all = False
+        self.multi_page = self.has_next or self.has_previous
+        self.paginator = None
+        self.next_url = self.previous_url = None
+        if rows and self.has_next:
+            self.next_url = self.cursor_url(AFTER_VAR, rows[-1])
+        if rows and self.has_previous:
+            self.previous_url = self.cursor_url(BEFORE_VAR, rows[0])
+
+    def cursor_url(self, var, obj):
+        values = [getattr(obj, self.lookup_opts.get_field(name.lstrip("-")).attname) for name in self.keyset]
+        return super().get_query_string({var: encode_cursor(values)}, remove=CURSOR_VARS)
+
+
+class KeysetPaginationMixin:
+    """ModelAdmin mixin switching the changelist to keyset pagination.
+
+    ``keyset_ordering`` must end with a unique field and should be backed by
+    a matching index.
+    """
+
+    keyset_ordering = ("-created", "-id")
+    show_full_result_count = False
+
+    def get_ordering(self, request):
+        return self.ordering or self.keyset_ordering
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+def is_autocomplete_request(request):
+    """Return whether ``request`` comes from an admin autocomplete widget."""
+    return request.resolver_match is not None and request.resolver_match.url_name == "autocomplete"
+
+
+class LookaheadPage(Page):
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+
+class LookaheadPaginator(Paginator):
+    """A paginator that never counts; it reads one row past the page instead.
+
+    Only ``has_next()`` and ``has_previous()`` are meaningful on its pages.
+    """
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger("That page number is not an integer")
+        if number < 1:
+            raise InvalidPage("That page number is less than 1")
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom : bottom + self.per_page + 1])
+        return LookaheadPage(rows[: self.per_page], number, self, len(rows) > self.per_page)
+
+
+class LookaheadAutocompleteMixin:
+    """ModelAdmin mixin serving autocomplete pages without ``COUNT(*)`` queries."""
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        if is_autocomplete_request(request):
+            return LookaheadPaginator(queryset, per_page, allow_empty_first_page=allow_empty_first_page)
+        return super().get_paginator(request, queryset, per_page, orphans, allow_empty_first_page)
+
+
+class BoundedInlineFormSet(BaseInlineFormSet):
+    """Inline formset loading at most ``max_shown`` rows of its ordered queryset."""
+
+    max_shown = 10
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self._queryset = super().get_queryset()[: self.max_shown]
+        return self._queryset
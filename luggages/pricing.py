@@ -0,0 +1,213 @@
+"""Pricing bags from the weights and pricing rules, through compiled lookup tables.
+
+The unit price of a bag depends on its route, its weight tier, its bag size
+and the day it is booked: the price of the ``Weight`` times the multipliers
+of every active ``PricingRule`` matching the bag, plus their surcharges.
+Matching the rules for every bag would cost a scan of the rules per bag, so
+``compile_pricing`` evaluates them once for every combination instead. The
+booking days are cut into periods at the days a rule starts or stops, and
+for every period the ``PricingTable`` holds one dictionary per route named
+by a rule, plus one for every other route, mapping ``(weight, size)`` to the
+final unit price. Pricing a bag is then one dictionary lookup, and pricing
+bills never touches the database.
+
+``pricing_engine`` keeps the compiled table per process. At most every
+``VERSION_CHECK_INTERVAL`` seconds it reads a version of the weights, bag
+types and rules from the database: their count and latest ``updated`` time,
+which change whenever one is saved or deleted. Every process therefore
+recompiles its table within a few seconds of any change, whatever cache
+backend is configured, and the process that made the change does so right
+after it commits (see ``signals.py``). Queryset ``update()`` calls skip
+``updated`` and must not be used on weights, bag types and rules.
+"""
+
+import bisect
+import datetime
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import BagType, Luggage, PricingRule, Weight
+
+CENT = Decimal("0.01")
+
+# The version of the weights and rules is read at most this often, in seconds.
+VERSION_CHECK_INTERVAL = 5
+
+
+class PricingTable:
+    """Unit prices per booking period, route, weight and bag size."""
+
+    def __init__(self, starts, periods, min_weights, bag_sizes=None):
+        # starts[i] is the first booking day of periods[i]
+        self.starts = starts
+        self.periods = periods
+        self.min_weights = min_weights
+        self.bag_sizes = bag_sizes or {}
+
+    def route_prices(self, departure_id, destination_id, day):
+        """Return the ``(weight, size)`` to unit price mapping of a route on a booking day."""
+        routes = self.periods[bisect.bisect_right(self.starts, day) - 1]
+        prices = routes.get((departure_id, destination_id))
+        return routes[None] if prices is None else prices
+
+    def unit_price(self, departure_id, destination_id, weight_id, size, day):
+        """Return the price of one bag."""
+        return self.route_prices(departure_id, destination_id, day)[weight_id, size]
+
+    def price_items(self, departure_id, destination_id, day, items):
+        """Return the total of ``(weight, size, quantity)`` items booked on a route on a day."""
+        prices = self.route_prices(departure_id, destination_id, day)
+        total = Decimal("0")
+        for weight_id, size, quantity in items:
+            total += prices[weight_id, size] * quantity
+        return total
+
+    def price_bills(self, bills):
+        """Return the totals of ``(departure, destination, day, items)`` bills, in order."""
+        return [self.price_items(*bill) for bill in bills]
+
+
+def booking_periods(rules):
+    """Return the first day of every period in which the same rules are in force."""
+    starts = {datetime.date.min}
+    for rule in rules:
+        if rule.starts is not None:
+            starts.add(rule.starts)
+        if rule.ends is not None and rule.ends < datetime.date.max:
+            starts.add(rule.ends + datetime.timedelta(days=1))
+    return sorted(starts)
+
+
+def compile_pricing(weights=None, rules=None, bag_types=None):
+    """Evaluate the ``rules`` for every period, route, weight and size into a ``PricingTable``.
+
+    ``weights`` are ``(pk, price, min_weight)`` rows, ``rules`` are
+    ``PricingRule`` instances and ``bag_types`` are ``(pk, size)`` rows; all
+    are read from the database when omitted.
+    """
+    if weights is None:
+        weights = list(Weight.objects.values_list("pk", "price", "min_weight"))
+    if rules is None:
+        rules = list(PricingRule.objects.filter(active=True))
+    if bag_types is None:
+        bag_types = list(BagType.objects.values_list("pk", "size"))
+    sizes = BagType.SizeOption.values
+    routes = [None, *sorted({(rule.departure_id, rule.destination_id) for rule in rules if rule.departure_id})]
+    starts = booking_periods(rules)
+    periods = []
+    for start in starts:
+        # Rules only start or stop at the first day of a period
+        in_force = [
+            rule
+            for rule in rules
+            if (rule.starts is None or rule.starts <= start) and (rule.ends is None or start <= rule.ends)
+        ]
+        table = {}
+        for route in routes:
+            prices = table[route] = {}
+            for weight_id, price, _ in weights:
+                for size in sizes:
+                    multiplier, surcharge = Decimal("1"), Decimal("0")
+                    for rule in in_force:
+                        if rule.matches(route, weight_id, size):
+                            multiplier *= rule.multiplier
+                            surcharge += rule.surcharge
+                    unit_price = (price * multiplier + surcharge).quantize(CENT, ROUND_HALF_UP)
+                    prices[weight_id, size] = max(unit_price, Decimal("0.00"))
+        periods.append(table)
+    return PricingTable(
+        starts, periods, {weight_id: min_weight for weight_id, _, min_weight in weights}, dict(bag_types)
+    )
+
+
+class PricingEngine:
+    """The compiled ``PricingTable`` of this process, recompiled when the rules or weights change."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version_compiled = None
+        self.compiled = None
+        self.checked = None
+
+    def version(self):
+        """Return a stamp of the weights, bag types and rules that changes whenever one is saved or deleted."""
+        return tuple(
+            tuple(model.objects.aggregate(rows=Count("pk"), updated=Max("updated")).values())
+            for model in (Weight, BagType, PricingRule)
+        )
+
+    def invalidate(self):
+        """Have the next ``table()`` call read the version again."""
+        self.checked = None
+
+    def table(self):
+        """Return the current ``PricingTable``, reading the version at most every ``VERSION_CHECK_INTERVAL`` seconds."""
+        checked = self.checked
+        if self.compiled is not None and checked is not None and time.monotonic() - checked < VERSION_CHECK_INTERVAL:
+            return self.compiled
+        now = time.monotonic()
+        version = self.version()
+        if self.compiled is None or self.version_compiled != version:
+            with self.lock:
+                if self.compiled is None or self.version_compiled != version:
+                    # Read the version first, so a change made while compiling triggers another compile
+                    self.compiled = compile_pricing()
+                    self.version_compiled = version
+        self.checked = now
+        return self.compiled
+
+
+pricing_engine = PricingEngine()
+
+
+def price_luggage(luggage, table=None):
+    """Set the unit price and weight of ``luggage`` from the pricing rules of today.
+
+    The size of the bag comes from ``table``, so only the trip of the bill is
+    read, once per bill instance.
+    """
+    table = table or pricing_engine.table()
+    trip = luggage.luggagebill.trip
+    luggage.unit_price = table.unit_price(
+        trip.departure_id,
+        trip.destination_id,
+        luggage.weight_id,
+        table.bag_sizes[luggage.bag_type_id],
+        timezone.localdate(),
+    )
+    luggage.unit_weight = table.min_weights[luggage.weight_id]
+
+
+def reprice_items(items):
+    """Capture the price of the unsettled ``items`` again, after the route of their bill changed."""
+    table = pricing_engine.table()
+    for item in items.filter(luggagebill__settlement__isnull=True).select_related("luggagebill__trip"):
+        price_luggage(item, table)
+        item.save()
+
+
+def bill_rows(bills, chunk_size=2000):
+    """Return the bills as ``(departure, destination, day, items)`` rows for ``PricingTable.price_bills``.
+
+    ``day`` is the local day the bill was created. Reads the items of all the
+    bills with one query.
+    """
+    rows = {}
+    for bill_id, departure_id, destination_id, created in (
+        bills.order_by("pk")
+        .values_list("pk", "trip__departure_id", "trip__destination_id", "created")
+        .iterator(chunk_size)
+    ):
+        rows[bill_id] = (departure_id, destination_id, timezone.localdate(created), [])
+    items = (
+        Luggage.objects.filter(luggagebill__in=bills)
+        .order_by()
+        .values_list("luggagebill_id", "weight_id", "bag_type__size", "quantity")
+    )
+    for bill_id, weight_id, size, quantity in items.iterator(chunk_size):
+        rows[bill_id][3].append((weight_id, size, quantity))
+    return rows
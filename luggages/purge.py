@@ -0,0 +1,219 @@
+"""Deferred, batched deletion of buses, parks and customers.
+
+Every foreign key cascades, so deleting a bus, park or customer with years
+of history would make Django collect and delete every trip, bill, luggage
+item and bag tag depending on it in one request. The admin therefore only
+marks such rows deleted (see ``SoftDeleteModel``) and the ``purgedeleted``
+command removes them later, deepest relations first and at most
+``batch_size`` rows per transaction, so no single statement or lock covers
+the whole history.
+
+The rows are removed with the plain ``DELETE`` statements of
+``archive.delete_rows``, so no per-row signal fires. Each batch adjusts the
+per-day counts in its own transaction, as archiving does, and remembers the
+customers, routes and weeks, and staff days its rows fed; those summaries
+are refreshed once, after the last batch of an instance, rather than once
+per batch. An interrupted purge leaves them for the rebuild commands.
+
+Rows that must outlive the purge keep it from starting: rows referenced
+through a ``PROTECT`` foreign key, such as a park with settlements, and
+settled bills, which are frozen. Such an instance is left marked deleted
+and reported instead of having part of its history removed.
+"""
+
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import ProtectedError
+from django.db.models.deletion import get_candidate_relations_to_delete
+
+from .archive import delete_rows
+from .dashboard import mark_dashboard_stale
+from .fuzzy import customer_index
+from .models import (
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    Bus,
+    Customer,
+    DailyCount,
+    LuggageBill,
+    ParkLocation,
+    PricingRule,
+    Trip,
+)
+from .pagination import estimated_count
+from .pricing import pricing_engine
+from .rollups import bump_daily_counts
+from .settlements import SETTLED_MODELS
+from .summaries import (
+    refresh_customer_summaries,
+    refresh_route_week_keys,
+    refresh_staff_days,
+    route_week_key,
+    staff_day_key,
+)
+
+SOFT_DELETE_MODELS = [Customer, Bus, ParkLocation]
+
+
+def cascade_relations(model, on_delete=models.CASCADE):
+    """Return the reverse relations, hidden ones included, whose rows ``on_delete`` handles along with ``model``."""
+    return [relation for relation in get_candidate_relations_to_delete(model._meta) if relation.on_delete is on_delete]
+
+
+class PurgedRows:
+    """The summaries fed by the rows a purge deleted, refreshed once it is done."""
+
+    def __init__(self):
+        self.customers = set()
+        self.route_weeks = set()
+        self.staff_days = set()
+        self.pricing = False
+
+    def collect(self, model, pks, using):
+        """Remember what the ``model`` rows ``pks`` fed and remove them from the per-day counts."""
+        if model in (LuggageBill, ArchivedLuggageBill):
+            bills = list(
+                model._base_manager.using(using)
+                .filter(pk__in=pks)
+                .values_list(
+                    "customer_id",
+                    "added_by_id",
+                    "created",
+                    "trip__departure_id",
+                    "trip__destination_id",
+                    "trip__date_of_journey",
+                )
+            )
+            for customer_id, added_by_id, created, *route in bills:
+                self.customers.add(customer_id)
+                self.staff_days.add(staff_day_key(added_by_id, created))
+                self.route_weeks.add(route_week_key(*route))
+            if model is LuggageBill:
+                bump_daily_counts(DailyCount.Kind.BILL_CREATED, [row[2] for row in bills], -1)
+        elif model in (Trip, ArchivedTrip):
+            trips = list(
+                model._base_manager.using(using)
+                .filter(pk__in=pks)
+                .values_list("departure_id", "destination_id", "date_of_journey")
+            )
+            self.route_weeks.update(route_week_key(*row) for row in trips)
+            if model is Trip:
+                bump_daily_counts(DailyCount.Kind.TRIP_JOURNEY, [row[2] for row in trips], -1)
+        elif model is Customer:
+            for pk in pks:
+                customer_index.discard(pk)
+        elif model is PricingRule:
+            self.pricing = True
+
+    def refresh(self):
+        refresh_customer_summaries(self.customers)
+        refresh_route_week_keys(self.route_weeks)
+        refresh_staff_days(self.staff_days)
+        mark_dashboard_stale()
+        if self.pricing:
+            pricing_engine.invalidate()
+
+
+def held_rows(model, path, pk):
+    """Yield the querysets of rows keeping the ``model`` rows whose ``path`` leads to ``pk`` from being deleted."""
+    rows = model._base_manager.filter(**{path: pk}).order_by()
+    for relation in cascade_relations(model, models.PROTECT):
+        lookup = relation.field.name if path == "pk" else f"{relation.field.name}__{path}"
+        yield relation.related_model._base_manager.filter(**{lookup: pk}).order_by()
+    if model in {bill_model for bill_model, _ in SETTLED_MODELS}:
+        yield rows.filter(settlement__isnull=False)
+    for relation in cascade_relations(model):
+        child_path = relation.field.name if path == "pk" else f"{relation.field.name}__{path}"
+        yield from held_rows(relation.related_model, child_path, pk)
+
+
+def check_purgeable(instance):
+    """Raise ``ProtectedError`` if rows depending on ``instance`` must be kept."""
+    held = [rows for rows in held_rows(type(instance), "pk", instance.pk) if rows.exists()]
+    if held:
+        summary = ", ".join(f"{rows.count()} {rows.model._meta.verbose_name_plural}" for rows in held)
+        raise ProtectedError(
+            f"{instance._meta.verbose_name} {instance} is kept by {summary}.",
+            {row for rows in held for row in rows[:10]},
+        )
+
+
+def delete_in_batches(model, path, pk, batch_size, purged, using="default"):
+    """Delete the ``model`` rows whose ``path`` leads to the row ``pk``, children first.
+
+    What the rows fed is collected into the ``PurgedRows`` ``purged``.
+    Yields ``(model, count)`` after every batch.
+    """
+    for relation in cascade_relations(model):
+        child_path = relation.field.name if path == "pk" else f"{relation.field.name}__{path}"
+        yield from delete_in_batches(relation.related_model, child_path, pk, batch_size, purged, using)
+    rows = model._base_manager.using(using).filter(**{path: pk}).order_by()
+    while True:
+        pks = list(rows.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        with transaction.atomic(using=using):
+            for relation in cascade_relations(model, models.SET_NULL):
+                relation.related_model._base_manager.using(using).filter(**{f"{relation.field.name}__in": pks}).update(
+                    **{relation.field.name: None}
+                )
+            purged.collect(model, pks, using)
+            delete_rows(model, model._meta.pk.name, pks, using)
+        yield model, len(pks)
+
+
+def purge(instance, batch_size=500):
+    """Delete ``instance`` with everything depending on it, yielding progress after every batch.
+
+    Raises ``ProtectedError`` before deleting anything if some of it must be kept.
+    """
+    check_purgeable(instance)
+    purged = PurgedRows()
+    try:
+        yield from delete_in_batches(type(instance), "pk", instance.pk, batch_size, purged, instance._state.db)
+    finally:
+        purged.refresh()
+
+
+def purge_deleted(model_classes=None, batch_size=500):
+    """Purge every row of ``models`` marked deleted, yielding ``(instance, model, count)`` progress.
+
+    An instance that cannot be purged is left alone and yielded once as
+    ``(instance, None, error)`` with the ``ProtectedError``.
+    """
+    for model in model_classes or SOFT_DELETE_MODELS:
+        for instance in model.objects.filter(deleted__isnull=False).order_by("deleted", "pk"):
+            try:
+                for deleted_model, count in purge(instance, batch_size):
+                    yield instance, deleted_model, count
+            except ProtectedError as error:
+                # Also covers rows protected after the check, e.g. a day closed while purging
+                yield instance, None, error
+
+
+def estimate_cascade(model, instances):
+    """Estimate how many rows of each model depend on ``instances``.
+
+    Direct relations are counted through their foreign key index. Deeper ones
+    are extrapolated from the average number of children per row, taken from
+    the cheap table-wide ``estimated_count``, so the estimate never joins the
+    history tables.
+    """
+    totals = Counter()
+
+    def add(related_model, count):
+        totals[related_model] += count
+        parents = estimated_count(related_model._base_manager.all())
+        if not count or not parents:
+            return
+        for relation in cascade_relations(related_model):
+            children = estimated_count(relation.related_model._base_manager.all())
+            add(relation.related_model, round(count * children / parents))
+
+    for relation in cascade_relations(model):
+        add(
+            relation.related_model,
+            relation.related_model._base_manager.filter(**{f"{relation.field.name}__in": instances}).count(),
+        )
+    return totals
@@ -0,0 +1,46 @@
+"""Streaming batch printing of luggage bill receipts.
+
+Bills are read in primary key batches, each batch with one query for the
+bills, customers, trips, buses and parks and one prefetch query for their
+items, weights and bag types. Receipts are rendered one by one into a single
+print document with a page break after each, so printing hundreds of
+receipts is one request with a handful of queries and bounded memory.
+"""
+
+from django.db.models import Prefetch
+from django.template.loader import get_template, render_to_string
+from django.utils.timezone import localtime
+
+from .models import Luggage
+
+RECEIPT_BATCH_SIZE = 100
+
+
+def receipt_bills(queryset, batch_size=RECEIPT_BATCH_SIZE):
+    """Yield the bills of ``queryset`` in id order with everything a receipt shows."""
+    bills = (
+        queryset.order_by("pk")
+        .select_related("customer", "trip__bus", "trip__departure__state", "trip__destination__state")
+        .prefetch_related(
+            Prefetch("items", queryset=Luggage.objects.select_related("weight", "bag_type").order_by("pk"))
+        )
+    )
+    last_pk = 0
+    while True:
+        batch = list(bills.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1].pk
+
+
+def stream_receipts(queryset, title="Luggage Receipts"):
+    """Yield an HTML print document holding one receipt page per bill."""
+    context = {"title": title, "printed": localtime()}
+    yield render_to_string("admin/luggages/luggagebill/receipts_start.html", context)
+    receipt = get_template("admin/luggages/luggagebill/receipt.html")
+    count = 0
+    for bill in receipt_bills(queryset):
+        count += 1
+        yield receipt.render({"luggagebill": bill})
+    yield render_to_string("admin/luggages/luggagebill/receipts_end.html", {**context, "count": count})
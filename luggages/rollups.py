@@ -0,0 +1,180 @@
+"""Maintained per-day row counts backing the admin date drill-down and date facets.
+
+The admin ``date_hierarchy`` and the date ``list_filter`` facets normally run
+``DISTINCT`` date-truncation queries and conditional counts over the whole
+table on every click. ``DailyCount`` keeps one row per kind and local day
+instead. Single-row writes keep it exact through signals (see ``signals.py``),
+which sum the changes of a transaction and apply them once it committed, so
+the check-ins of a day do not wait on each other for its row. Bulk writes
+rebuild the days they touched, and reads are cached for
+``LUGGAGE_DAILY_COUNT_CACHE_TIMEOUT`` seconds, which bounds how stale the
+numbers shown in the admin can be.
+"""
+
+import datetime
+import hashlib
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import DailyCount, LuggageBill, Trip
+
+DAILY_COUNT_SOURCES = {
+    DailyCount.Kind.BILL_CREATED: (LuggageBill, "created"),
+    DailyCount.Kind.TRIP_JOURNEY: (Trip, "date_of_journey"),
+}
+
+
+def daily_count_kind(model, field_name):
+    """Return the DailyCount kind maintained for ``model.field_name``, if any."""
+    for kind, source in DAILY_COUNT_SOURCES.items():
+        if source == (model, field_name):
+            return kind
+    return None
+
+
+def bump_daily_counts(kind, values, delta):
+    """Add ``delta`` once per datetime in ``values`` to the count of its local day."""
+    for day, count in Counter(timezone.localdate(value) for value in values).items():
+        _bump_day(kind, day, delta * count)
+
+
+def bump_day_counts(counts):
+    """Add the deltas of the ``{(kind, day): delta}`` ``counts``."""
+    for (kind, day), delta in sorted(counts.items()):
+        _bump_day(kind, day, delta)
+
+
+def daily_count_key(kind, value):
+    """Return the ``(kind, day)`` key of the local day of the datetime ``value``."""
+    return kind, timezone.localdate(value)
+
+
+def _bump_day(kind, day, delta):
+    updated = DailyCount.objects.filter(kind=kind, day=day).update(count=F("count") + delta)
+    if not updated:
+        try:
+            with transaction.atomic():
+                DailyCount.objects.create(kind=kind, day=day, count=delta)
+        except IntegrityError:
+            # Another writer created the row in the meantime.
+            DailyCount.objects.filter(kind=kind, day=day).update(count=F("count") + delta)
+
+
+def rebuild_daily_counts(kind, start=None, end=None):
+    """Recount ``kind`` from its source table for the local days ``start`` to ``end``.
+
+    Both bounds are inclusive and optional; without them every day is rebuilt.
+    """
+    model, field_name = DAILY_COUNT_SOURCES[kind]
+    tz = timezone.get_current_timezone()
+    rows = model._base_manager.order_by()
+    existing = DailyCount.objects.filter(kind=kind)
+    if start is not None:
+        rows = rows.filter(**{f"{field_name}__gte": datetime.datetime.combine(start, datetime.time.min, tz)})
+        existing = existing.filter(day__gte=start)
+    if end is not None:
+        next_day = end + datetime.timedelta(days=1)
+        rows = rows.filter(**{f"{field_name}__lt": datetime.datetime.combine(next_day, datetime.time.min, tz)})
+        existing = existing.filter(day__lte=end)
+    counts = rows.annotate(day=TruncDate(field_name, tzinfo=tz)).values("day").annotate(count=Count("pk"))
+    with transaction.atomic():
+        existing.delete()
+        DailyCount.objects.bulk_create(
+            [DailyCount(kind=kind, day=row["day"], count=row["count"]) for row in counts],
+            batch_size=1000,
+        )
+
+
+def rebuild_daily_count_days(kind, days):
+    """Recount ``kind`` for the local ``days`` only, one rebuild per run of consecutive days."""
+    days = sorted(set(days))
+    start = None
+    for index, day in enumerate(days):
+        start = start or day
+        if index + 1 == len(days) or days[index + 1] != day + datetime.timedelta(days=1):
+            rebuild_daily_counts(kind, start, day)
+            start = None
+
+
+def _cached(key, compute):
+    key = "luggages:daily:" + hashlib.md5(key.encode()).hexdigest()
+    return cache.get_or_set(key, compute, settings.LUGGAGE_DAILY_COUNT_CACHE_TIMEOUT)
+
+
+def daily_count_range(kind, **day_filters):
+    """Return the first and last local day having rows."""
+    return _cached(
+        f"{kind}:range:{sorted(day_filters.items())}",
+        lambda: DailyCount.objects.filter(kind=kind, count__gt=0, **day_filters).aggregate(
+            first=Min("day"), last=Max("day")
+        ),
+    )
+
+
+def daily_count_dates(kind, level, **day_filters):
+    """Return the distinct years, months or days having rows, as dates."""
+    return _cached(
+        f"{kind}:{level}:{sorted(day_filters.items())}",
+        lambda: list(DailyCount.objects.filter(kind=kind, count__gt=0, **day_filters).dates("day", level)),
+    )
+
+
+def daily_count_totals(kind, ranges, **day_filters):
+    """Sum the counts of each ``(since, until)`` range of days in one query.
+
+    ``ranges`` maps a label to a pair of optional dates, ``until`` exclusive.
+    """
+
+    def compute():
+        aggregates = {}
+        for label, (since, until) in ranges.items():
+            condition = Q()
+            if since is not None:
+                condition &= Q(day__gte=since)
+            if until is not None:
+                condition &= Q(day__lt=until)
+            aggregates[label] = Coalesce(Sum("count", filter=condition), 0)
+        return DailyCount.objects.filter(kind=kind, **day_filters).aggregate(**aggregates)
+
+    return _cached(f"{kind}:totals:{sorted(ranges.items())}:{sorted(day_filters.items())}", compute)
+
+
+def day_filters_for(changelist, field_path):
+    """Translate the changelist parameters into ``DailyCount.day`` lookups.
+
+    Returns None when the changelist is narrowed by anything the per-day
+    counts cannot express, e.g. a search or a filter on another field.
+    """
+    if changelist.query:
+        return None
+    field = changelist.model._meta.get_field(field_path)
+    day_filters = {}
+    for key, values in changelist.get_filters_params().items():
+        lookup = key.removeprefix(f"{field_path}__")
+        if lookup == key:
+            return None
+        value = values[-1]
+        try:
+            if lookup in ("year", "month", "day"):
+                day_filters[f"day__{lookup}"] = int(value)
+            elif lookup in ("gte", "lt"):
+                value = field.to_python(value)
+                if isinstance(value, datetime.datetime):
+                    if timezone.is_aware(value):
+                        value = timezone.localtime(value)
+                    if value.time() != datetime.time.min:
+                        return None
+                    value = value.date()
+                day_filters[f"day__{lookup}"] = value
+            else:
+                return None
+        except (ValueError, TypeError, ValidationError):
+            return None
+    return day_filters
@@ -0,0 +1,204 @@
+"""Generate trips in bulk from recurring timetable schedules and detect bus double-bookings.
+
+``Trip.save()`` looks up the state short codes of both parks for every trip,
+and ``bulk_create`` bypasses ``save()`` altogether, so the generator computes
+trip names itself from an in-memory map of park short codes.
+"""
+
+import bisect
+import calendar
+import datetime
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .dashboard import mark_dashboard_stale
+from .deferred import call_on_commit, refresh_on_commit
+from .models import DailyCount, ParkLocation, Trip, TripSchedule, max_trip_duration
+from .rollups import rebuild_daily_counts
+from .summaries import refresh_route_week_keys, route_week_key
+
+Conflict = namedtuple("Conflict", ["bus_id", "first_id", "second_id", "overlap_start", "overlap_end"])
+SkippedTrip = namedtuple("SkippedTrip", ["schedule", "date_of_journey", "clash"])
+
+
+def add_months(day, months):
+    """Return ``day`` moved forward by ``months``, clamped to the end of the month."""
+    year, month = divmod(day.month - 1 + months, 12)
+    year += day.year
+    month += 1
+    return day.replace(year=year, month=month, day=min(day.day, calendar.monthrange(year, month)[1]))
+
+
+def short_code_map():
+    """Map every park location id to the short code of its state."""
+    return dict(ParkLocation.objects.values_list("pk", "state__short_code"))
+
+
+class TripNameAllocator:
+    """Hand out unique trip names.
+
+    Trip names only carry the route and the date, so two trips on the same
+    route and day collide. The first one keeps the plain name and the next ones
+    get a ``-2``, ``-3``... suffix. Candidates must be allocated in a stable
+    order for the suffixes to be deterministic.
+    """
+
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+
+    def allocate(self, base):
+        name, counter = base, 1
+        while name in self.taken:
+            counter += 1
+            name = f"{base}-{counter}"
+        self.taken.add(name)
+        return name
+
+
+class BusCalendar:
+    """In-memory interval index of the journeys of each bus.
+
+    Journeys are kept sorted by departure per bus. Because no trip is longer
+    than ``max_trip_duration()``, an overlap check only needs to look at the
+    journeys departing within that window before the candidate's arrival.
+    """
+
+    def __init__(self):
+        self.max_duration = max_trip_duration()
+        self.journeys = {}
+
+    def add(self, bus_id, start, end, label):
+        bisect.insort(self.journeys.setdefault(bus_id, []), (start, end, label))
+
+    def clash(self, bus_id, start, end):
+        """Return the label of a journey overlapping ``[start, end)``, if any."""
+        journeys = self.journeys.get(bus_id, [])
+        low = bisect.bisect_right(journeys, (start - self.max_duration,))
+        high = bisect.bisect_left(journeys, (end,))
+        for other_start, other_end, label in journeys[low:high]:
+            if other_end > start:
+                return label
+        return None
+
+
+def schedule_trips(start, end, schedules=None):
+    """Build unsaved trips for every active schedule between ``start`` and ``end``.
+
+    Both dates are inclusive. Trips that already exist for the same bus at the
+    same time are skipped, so generating an overlapping period twice is safe.
+    Trips that would double-book a bus are skipped and reported.
+
+    Returns:
+        tuple: The unsaved ``Trip`` instances ordered by departure time, and
+        a list of ``SkippedTrip`` for the conflicting schedule occurrences.
+    """
+    if schedules is None:
+        schedules = TripSchedule.objects.filter(
+            active=True,
+            bus__deleted__isnull=True,
+            departure__deleted__isnull=True,
+            destination__deleted__isnull=True,
+        )
+    by_weekday = {}
+    for schedule in schedules.order_by("departure_time", "pk"):
+        by_weekday.setdefault(schedule.weekday, []).append(schedule)
+    if not by_weekday:
+        return [], []
+
+    tz = timezone.get_current_timezone()
+    window_start = datetime.datetime.combine(start, datetime.time.min, tz)
+    window_end = datetime.datetime.combine(end + datetime.timedelta(days=1), datetime.time.min, tz)
+    # Names are built from the local date and journeys may run over midnight,
+    # so look at existing trips slightly beyond both ends of the window.
+    slack = max(datetime.timedelta(days=1), max_trip_duration())
+    existing = Trip.objects.filter(
+        date_of_journey__gte=window_start - slack,
+        date_of_journey__lt=window_end + slack,
+    ).values_list("name", "bus_id", "date_of_journey", "duration")
+    names = TripNameAllocator()
+    booked = set()
+    buses = BusCalendar()
+    for name, bus_id, date_of_journey, duration in existing:
+        names.taken.add(name)
+        booked.add((bus_id, date_of_journey))
+        buses.add(bus_id, date_of_journey, date_of_journey + duration, name)
+
+    codes = short_code_map()
+    trips, skipped = [], []
+    day = start
+    while day <= end:
+        for schedule in by_weekday.get(day.weekday(), []):
+            date_of_journey = datetime.datetime.combine(day, schedule.departure_time, tz)
+            if (schedule.bus_id, date_of_journey) in booked:
+                continue
+            arrival = date_of_journey + schedule.duration
+            clash = buses.clash(schedule.bus_id, date_of_journey, arrival)
+            if clash is not None:
+                skipped.append(SkippedTrip(schedule, date_of_journey, clash))
+                continue
+            base = Trip.build_name(codes[schedule.departure_id], codes[schedule.destination_id], date_of_journey)
+            trip = Trip(
+                name=names.allocate(base),
+                bus_id=schedule.bus_id,
+                departure_id=schedule.departure_id,
+                destination_id=schedule.destination_id,
+                date_of_journey=date_of_journey,
+                duration=schedule.duration,
+            )
+            booked.add((schedule.bus_id, date_of_journey))
+            buses.add(schedule.bus_id, date_of_journey, arrival, trip.name)
+            trips.append(trip)
+        day += datetime.timedelta(days=1)
+    return trips, skipped
+
+
+def generate_trips(start, end, schedules=None, batch_size=1000):
+    """Create the trips scheduled between ``start`` and ``end`` in one bulk insert.
+
+    ``bulk_create`` sends no signals, so the per-day counts, the route weeks
+    of the new trips and the dashboard are refreshed here.
+
+    Returns:
+        tuple: The created trips and the skipped, conflicting occurrences.
+    """
+    trips, skipped = schedule_trips(start, end, schedules)
+    with transaction.atomic():
+        trips = Trip.objects.bulk_create(trips, batch_size=batch_size)
+        if trips:
+            rebuild_daily_counts(DailyCount.Kind.TRIP_JOURNEY, start, end)
+            keys = {route_week_key(trip.departure_id, trip.destination_id, trip.date_of_journey) for trip in trips}
+            refresh_on_commit(refresh_route_week_keys, keys)
+            call_on_commit(mark_dashboard_stale)
+    return trips, skipped
+
+
+def find_conflicts(start, end):
+    """Find every pair of trips sharing a bus at the same time.
+
+    Only pairs where at least one trip departs in ``[start, end)`` are reported.
+    Trips are streamed ordered by ``(bus, date_of_journey)``, which the trip
+    index serves directly, and swept once while keeping the journeys that are
+    still on the road, so the cost is linear in the number of trips.
+
+    Returns:
+        list: ``Conflict`` tuples ordered by bus and departure.
+    """
+    rows = (
+        Trip.objects.filter(date_of_journey__gt=start - max_trip_duration(), date_of_journey__lt=end)
+        .order_by("bus_id", "date_of_journey", "pk")
+        .values_list("pk", "bus_id", "date_of_journey", "duration")
+    )
+    conflicts = []
+    current_bus, on_road = None, []
+    for pk, bus_id, departure, duration in rows.iterator(chunk_size=5000):
+        if bus_id != current_bus:
+            current_bus, on_road = bus_id, []
+        arrival = departure + duration
+        on_road = [journey for journey in on_road if journey[1] > departure]
+        for other_pk, other_arrival, other_departure in on_road:
+            if departure >= start or other_departure >= start:
+                conflicts.append(Conflict(bus_id, other_pk, pk, departure, min(arrival, other_arrival)))
+        on_road.append((pk, arrival, departure))
+    return conflicts
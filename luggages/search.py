@@ -0,0 +1,169 @@
+"""Indexed search over the denormalised ``LuggageBill.search_document``.
+
+Each bill stores its customer name, trip name, plate number and route as one
+normalised string, so a search never joins the customer, trip and bus tables.
+On PostgreSQL with the ``pg_trgm`` extension the column carries a trigram
+GIN index, which serves the ``LIKE '%term%'`` lookups directly. Other
+databases, and PostgreSQL roles that may not create the extension, get the
+same effect from the ``BillSearchTrigram`` side table: every search term is reduced to its
+trigrams, the bills having all of them are found through the
+``(trigram, bill)`` index and only those candidates are checked with a
+substring match.
+
+Renaming a customer, trip, bus or park changes the documents of all the
+bills showing it. They are rebuilt in batches once the rename committed,
+outside the admin's save transaction.
+"""
+
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.utils.text import smart_split, unescape_string_literal
+
+from .models import BillSearchTrigram, LuggageBill, normalize_search_text
+
+SEARCH_FIELDS = {
+    "customer": ["fullname"],
+    "trip": ["name", "bus_id", "departure_id", "destination_id"],
+    "bus": ["plate_number"],
+    "parklocation": ["location"],
+}
+
+
+TRIGRAM_INDEX = "luggages_bill_search_trgm_idx"
+
+# Whether the trigram index exists, per database alias; it only changes through migrations.
+_pg_trgm = {}
+
+
+def uses_pg_trgm(using="default"):
+    """Return whether the search document is indexed by ``pg_trgm`` on ``using``."""
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return False
+    if using not in _pg_trgm:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = %s", [TRIGRAM_INDEX])
+            _pg_trgm[using] = cursor.fetchone() is not None
+    return _pg_trgm[using]
+
+
+def document_trigrams(document):
+    """Return the trigrams of every word, padded like ``pg_trgm`` does."""
+    trigrams = set()
+    for word in document.split():
+        padded = f"  {word} "
+        trigrams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return trigrams
+
+
+def term_trigrams(term):
+    """Return the trigrams a document must contain to match ``term``.
+
+    Terms shorter than three characters match the start of a word.
+    """
+    if len(term) < 3:
+        return {f"  {term}"[-3:]}
+    return {term[i : i + 3] for i in range(len(term) - 2)}
+
+
+def search_terms(search_term):
+    """Split ``search_term`` like the admin does, keeping quoted phrases together."""
+    for bit in smart_split(search_term):
+        if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+            bit = unescape_string_literal(bit)
+        term = normalize_search_text(bit)
+        if term:
+            yield term
+
+
+def search_bills(queryset, search_term):
+    """Narrow ``queryset`` to the bills whose document contains every term."""
+    using = queryset.db
+    for term in search_terms(search_term):
+        if uses_pg_trgm(using):
+            queryset = queryset.filter(search_document__contains=term)
+            continue
+        words = term.split()
+        trigrams = set()
+        for position, word in enumerate(words):
+            # In a phrase, a short leading word may end a longer word and has no usable trigram.
+            if position or len(word) >= 3 or len(words) == 1:
+                trigrams |= term_trigrams(word)
+        if trigrams:
+            candidates = (
+                BillSearchTrigram.objects.using(using)
+                .filter(trigram__in=trigrams)
+                .values("bill")
+                .annotate(matched=Count("trigram"))
+                .filter(matched=len(trigrams))
+                .values("bill")
+            )
+            queryset = queryset.filter(pk__in=candidates)
+        if len(words) > 1 or len(term) >= 3:
+            # Trigrams may be spread over the document; check they are contiguous.
+            queryset = queryset.filter(search_document__contains=term)
+    return queryset
+
+
+def index_bills(bills, using="default"):
+    """Replace the trigram rows of ``bills`` with those of their current document."""
+    if uses_pg_trgm(using) or not bills:
+        return
+    with transaction.atomic(using=using):
+        BillSearchTrigram.objects.using(using).filter(bill__in=[bill.pk for bill in bills]).delete()
+        BillSearchTrigram.objects.using(using).bulk_create(
+            [
+                BillSearchTrigram(bill_id=bill.pk, trigram=trigram)
+                for bill in bills
+                for trigram in document_trigrams(bill.search_document)
+            ],
+            batch_size=5000,
+        )
+
+
+def reindex_bills(queryset, batch_size=1000):
+    """Rebuild the search documents of the bills in ``queryset``.
+
+    Only bills whose document actually changed are written and re-indexed.
+    Returns the number of bills updated.
+    """
+    using = queryset.db
+    queryset = queryset.select_related("customer", "trip__bus", "trip__departure", "trip__destination").order_by("pk")
+    updated = 0
+    last_pk = 0
+    while True:
+        bills = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        if not bills:
+            return updated
+        last_pk = bills[-1].pk
+        changed = []
+        for bill in bills:
+            document = bill.build_search_document()
+            if document != bill.search_document:
+                bill.search_document = document
+                changed.append(bill)
+        with transaction.atomic(using=using):
+            LuggageBill.objects.using(using).bulk_update(changed, ["search_document"])
+            index_bills(changed, using)
+        updated += len(changed)
+
+
+# Paths from a bill to the objects of every model whose fields its search document shows.
+REFERENCE_PATHS = {
+    "customer": ["customer"],
+    "trip": ["trip"],
+    "bus": ["trip__bus"],
+    "parklocation": ["trip__departure", "trip__destination"],
+}
+
+
+def reindex_referencing(keys):
+    """Rebuild the search documents of the bills showing the ``(using, model_name, pk)`` keys."""
+    by_model = {}
+    for using, model_name, pk in keys:
+        by_model.setdefault((using, model_name), set()).add(pk)
+    for (using, model_name), pks in by_model.items():
+        condition = Q()
+        for path in REFERENCE_PATHS[model_name]:
+            condition |= Q(**{f"{path}__in": pks})
+        reindex_bills(LuggageBill.objects.using(using).filter(condition))
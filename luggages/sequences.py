@@ -0,0 +1,155 @@
+"""Per-park, per-day receipt numbers handed out in blocks.
+
+Taking ``MAX() + 1`` or bumping a single counter row on every check-in would
+serialise all clerks. Instead each process reserves a block of
+``LUGGAGE_RECEIPT_BLOCK_SIZE`` numbers for a park and day with a single
+atomic upsert on ``ReceiptSequence`` and hands them out from memory. The
+counter row is therefore touched once per block, numbers never repeat, and
+at most one block per process, park and day goes unused when a process
+stops.
+
+A block reserved inside a transaction first serves the later bills of that
+same transaction, such as an import batch, and only becomes available to
+other bills once the transaction commits. If the transaction, or the
+savepoint the block was reserved in, rolls back, the reservation is undone
+with it and the block is dropped, so no number is handed out twice. Blocks
+of earlier days are forgotten once a later day is numbered.
+"""
+
+import threading
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import ReceiptSequence, Trip
+
+
+def format_receipt_number(park_id, day, number):
+    return f"{park_id:03d}-{day:%y%m%d}-{number:04d}"
+
+
+def reserve_block(park_id, day, size, using="default"):
+    """Atomically reserve ``size`` numbers and return the first and last of them."""
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    table = quote(ReceiptSequence._meta.db_table)
+    high_water = quote("high_water")
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({quote('park_id')}, {quote('day')}, {high_water}) VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({quote('park_id')}, {quote('day')}) "
+            f"DO UPDATE SET {high_water} = {table}.{high_water} + EXCLUDED.{high_water} "
+            f"RETURNING {high_water}",
+            [park_id, connection.ops.adapt_datefield_value(day), size],
+        )
+        last = cursor.fetchone()[0]
+    return last - size + 1, last
+
+
+class ReceiptNumberAllocator:
+    """Hand out receipt numbers from blocks reserved by this process."""
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.blocks = defaultdict(deque)
+        # Blocks reserved by the open transaction of each thread, not committed yet
+        self.local = threading.local()
+        self.day = None
+
+    def take(self, key):
+        with self.lock:
+            blocks = self.blocks[key]
+            while blocks:
+                start, end = blocks[0]
+                if start <= end:
+                    blocks[0] = (start + 1, end)
+                    return start
+                blocks.popleft()
+        return None
+
+    def keep(self, key, start, end):
+        with self.lock:
+            # A transaction may commit the block of a day evicted meanwhile
+            if start <= end and (self.day is None or key[2] >= self.day):
+                self.blocks[key].append((start, end))
+
+    def evict(self, day):
+        """Forget the blocks of the days before ``day``."""
+        with self.lock:
+            if self.day is not None and day <= self.day:
+                return
+            self.day = day
+            for key in [key for key in self.blocks if key[2] < day]:
+                del self.blocks[key]
+
+    def pending(self):
+        if not hasattr(self.local, "blocks"):
+            self.local.blocks = {}
+        return self.local.blocks
+
+    def take_pending(self, key, using):
+        """Take a number from the block reserved by the open transaction, if it is still reserved."""
+        block = self.pending().get(key)
+        if block is None:
+            return None
+        start, end, commit = block
+        # Django has no rollback hook; a rolled back transaction or savepoint discards its on_commit callbacks
+        connection = transaction.get_connection(using)
+        if start > end or all(callback is not commit for _, callback, _ in connection.run_on_commit):
+            del self.pending()[key]
+            return None
+        block[0] = start + 1
+        return start
+
+    def next_number(self, park_id, day, using="default"):
+        key = (using, park_id, day)
+        self.evict(day)
+        number = self.take_pending(key, using)
+        if number is None:
+            number = self.take(key)
+        if number is None:
+            size = self.block_size or settings.LUGGAGE_RECEIPT_BLOCK_SIZE
+            number, end = reserve_block(park_id, day, size, using)
+            if transaction.get_autocommit(using):
+                self.keep(key, number + 1, end)
+            else:
+                block = [number + 1, end, None]
+
+                def commit():
+                    if self.pending().get(key) is block:
+                        del self.pending()[key]
+                    self.keep(key, block[0], block[1])
+
+                block[2] = commit
+                self.pending()[key] = block
+                transaction.on_commit(commit, using=using)
+        return number
+
+
+allocator = ReceiptNumberAllocator()
+
+
+def assign_receipt_number(bill, using="default"):
+    """Give an unsaved bill the next receipt number of its departure park."""
+    day = timezone.localdate()
+    park_id = bill.trip.departure_id
+    bill.receipt_number = format_receipt_number(park_id, day, allocator.next_number(park_id, day, using))
+
+
+def assign_receipt_numbers(bills, using="default"):
+    """Number many unsaved bills, reserving exactly as many numbers as each park needs."""
+    bills = [bill for bill in bills if not bill.receipt_number]
+    departures = dict(
+        Trip.objects.using(using).filter(pk__in={bill.trip_id for bill in bills}).values_list("pk", "departure_id")
+    )
+    by_park = defaultdict(list)
+    for bill in bills:
+        by_park[departures[bill.trip_id]].append(bill)
+    day = timezone.localdate()
+    for park_id, park_bills in by_park.items():
+        first, _ = reserve_block(park_id, day, len(park_bills), using)
+        for number, bill in enumerate(park_bills, first):
+            bill.receipt_number = format_receipt_number(park_id, day, number)
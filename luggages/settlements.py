@@ -0,0 +1,169 @@
+"""Closing a park's day: freezing its bills and keeping their totals as settled.
+
+At the end of every day each park reconciles the cash taken against the
+bills created there. Recomputing those totals later from ``Luggage`` is
+slow, and items can still be corrected until the day is closed.
+``close_day`` therefore settles the bills created on a local day at a
+departure park once: every item is copied to a ``SettlementLine`` with the
+price and weight it had at closing, the totals are stored on the
+``Settlement`` and the bills point at it, which keeps them from being
+edited (see ``LuggageBill.clean`` and the admin). Archived bills are
+settled too, so days can be closed after their trips were archived.
+
+``settlement_report`` reads the totals of closed days from the settlements
+only. Days not closed yet are still summed from their items and are
+flagged as open.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, F, IntegerField, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import (
+    ArchivedLuggage,
+    ArchivedLuggageBill,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    Settlement,
+    SettlementLine,
+)
+from .summaries import local_day_range
+
+# Bill tables settled and the items of each.
+SETTLED_MODELS = [
+    (LuggageBill, Luggage),
+    (ArchivedLuggageBill, ArchivedLuggage),
+]
+
+
+def unsettled_bills(bill_model, park, since, until):
+    return bill_model._base_manager.filter(
+        trip__departure=park, created__gte=since, created__lt=until, settlement__isnull=True
+    ).order_by()
+
+
+def close_day(park, day, user=None):
+    """Settle the bills created at the departure ``park`` on the local ``day``.
+
+    Raises ``ValidationError`` if the day has not ended yet or was already
+    closed. Returns the ``Settlement``.
+    """
+    if day >= timezone.localdate():
+        raise ValidationError(f"{day} has not ended yet and cannot be closed.")
+    since, until = local_day_range(day)
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                settlement = Settlement.objects.create(
+                    park=park, day=day, closed_by=user, bills=0, bags=0, kilograms=0, revenue=Decimal("0")
+                )
+        except IntegrityError:
+            raise ValidationError(f"{park} was already closed for {day}.")
+
+        lines = []
+        for bill_model, item_model in SETTLED_MODELS:
+            # Lock the bills so that none changes between pricing and freezing them
+            bill_ids = list(
+                unsettled_bills(bill_model, park, since, until).select_for_update().values_list("pk", flat=True)
+            )
+            items = (
+                item_model._base_manager.filter(luggagebill_id__in=bill_ids)
+                .order_by()
+                .values_list(
+                    "luggagebill_id",
+                    "pk",
+                    "weight_id",
+                    "bag_type_id",
+                    "quantity",
+                    "unit_price",
+                    "unit_weight",
+                )
+            )
+            for bill_id, item_id, weight_id, bag_type_id, quantity, price, min_weight in items.iterator():
+                lines.append(
+                    SettlementLine(
+                        settlement=settlement,
+                        bill=bill_id,
+                        item=item_id,
+                        weight_id=weight_id,
+                        bag_type_id=bag_type_id,
+                        quantity=quantity,
+                        unit_price=price,
+                        unit_weight=min_weight,
+                        amount=price * quantity,
+                    )
+                )
+            settlement.bills += bill_model._base_manager.filter(pk__in=bill_ids).update(settlement=settlement)
+        SettlementLine.objects.bulk_create(lines, batch_size=1000)
+        settlement.bags = sum(line.quantity for line in lines)
+        settlement.kilograms = sum(line.unit_weight * line.quantity for line in lines)
+        settlement.revenue = sum((line.amount for line in lines), Decimal("0"))
+        settlement.save(update_fields=["bills", "bags", "kilograms", "revenue"])
+    return settlement
+
+
+def open_parks(day):
+    """Return the departure parks with bills created on the local ``day`` that are not settled."""
+    since, until = local_day_range(day)
+    park_ids = set()
+    for bill_model, _ in SETTLED_MODELS:
+        bills = bill_model._base_manager.filter(created__gte=since, created__lt=until, settlement__isnull=True)
+        park_ids.update(bills.order_by().values_list("trip__departure_id", flat=True).distinct())
+    return ParkLocation.objects.filter(pk__in=park_ids).order_by("location")
+
+
+def settlement_report(start, end, park=None):
+    """Return the bills, bags, kilograms and revenue per departure park and local day from ``start`` to ``end``.
+
+    Closed days are read from their ``Settlement``; the unsettled bills of
+    the other days are summed from their items and returned with
+    ``settlement`` set to ``None``. Rows are ordered newest day first.
+    """
+    settlements = Settlement.objects.filter(day__gte=start, day__lte=end).select_related("park", "closed_by")
+    if park is not None:
+        settlements = settlements.filter(park=park)
+    rows = [
+        {
+            "park": settlement.park,
+            "day": settlement.day,
+            "bills": settlement.bills,
+            "bags": settlement.bags,
+            "kilograms": settlement.kilograms,
+            "revenue": settlement.revenue,
+            "settlement": settlement,
+        }
+        for settlement in settlements
+    ]
+
+    since, _ = local_day_range(start)
+    _, until = local_day_range(end)
+    open_days = defaultdict(
+        lambda: {"bills": 0, "bags": 0, "kilograms": 0, "revenue": Decimal("0"), "settlement": None}
+    )
+    for bill_model, _ in SETTLED_MODELS:
+        bills = bill_model._base_manager.filter(created__gte=since, created__lt=until, settlement__isnull=True)
+        if park is not None:
+            bills = bills.filter(trip__departure=park)
+        days = bills.order_by().values_list("trip__departure_id", TruncDate("created"))
+        for park_id, day, count in days.annotate(count=Count("pk")):
+            open_days[park_id, day]["bills"] += count
+        totals = days.annotate(
+            quantity=Coalesce(Sum("items__quantity"), 0),
+            carried=Coalesce(Sum(F("items__quantity") * F("items__unit_weight"), output_field=IntegerField()), 0),
+            amount=Sum(F("items__quantity") * F("items__unit_price"), output_field=DecimalField()),
+        )
+        for park_id, day, quantity, carried, amount in totals:
+            row = open_days[park_id, day]
+            row["bags"] += quantity
+            row["kilograms"] += carried
+            row["revenue"] += amount or 0
+    parks = ParkLocation.objects.in_bulk({park_id for park_id, _ in open_days})
+    rows.extend({"park": parks[park_id], "day": day, **totals} for (park_id, day), totals in open_days.items())
+    rows.sort(key=lambda row: (-row["day"].toordinal(), row["park"].location, row["settlement"] is None))
+    return rows
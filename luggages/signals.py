@@ -0,0 +1,279 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .dashboard import mark_dashboard_stale
+from .deferred import call_on_commit, count_on_commit, refresh_on_commit
+from .fuzzy import customer_index
+from .models import (
+    BagType,
+    Bus,
+    Customer,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    PricingRule,
+    Trip,
+    Weight,
+)
+from .pricing import pricing_engine
+from .rollups import bump_day_counts, daily_count_key
+from .search import SEARCH_FIELDS, index_bills, reindex_referencing
+from .sequences import assign_receipt_number
+from .summaries import (
+    refresh_customer_summaries,
+    refresh_route_week_keys,
+    refresh_staff_days,
+    route_week_key,
+    staff_day_key,
+)
+from .tags import sync_bag_tags
+
+
+@receiver(pre_save, sender=LuggageBill)
+def number_new_bill(sender, instance, raw=False, using="default", **kwargs):
+    """Give a new bill the next receipt number of its departure park."""
+    if not raw and not instance.receipt_number and instance.trip_id is not None:
+        assign_receipt_number(instance, using)
+
+
+@receiver(post_save, sender=LuggageBill)
+def count_created_bill(sender, instance, created, **kwargs):
+    """Count a new bill on the day it was created."""
+    if created:
+        count_on_commit(bump_day_counts, {daily_count_key(DailyCount.Kind.BILL_CREATED, instance.created): 1})
+
+
+@receiver(post_delete, sender=LuggageBill)
+def uncount_deleted_bill(sender, instance, **kwargs):
+    """Remove a deleted bill from the count of the day it was created."""
+    count_on_commit(bump_day_counts, {daily_count_key(DailyCount.Kind.BILL_CREATED, instance.created): -1})
+
+
+@receiver(pre_save, sender=Trip)
+def remember_journey_date(sender, instance, **kwargs):
+    """Keep the stored journey date so a rescheduled trip can be moved between days."""
+    instance._stored_date_of_journey = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_date_of_journey = (
+            Trip.objects.filter(pk=instance.pk).values_list("date_of_journey", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Trip)
+def count_saved_trip(sender, instance, created, **kwargs):
+    """Count a new or rescheduled trip on its day of journey."""
+    previous = getattr(instance, "_stored_date_of_journey", None)
+    if created:
+        count_on_commit(bump_day_counts, {daily_count_key(DailyCount.Kind.TRIP_JOURNEY, instance.date_of_journey): 1})
+    elif previous is not None and previous != instance.date_of_journey:
+        counts = Counter({daily_count_key(DailyCount.Kind.TRIP_JOURNEY, instance.date_of_journey): 1})
+        counts[daily_count_key(DailyCount.Kind.TRIP_JOURNEY, previous)] -= 1
+        count_on_commit(bump_day_counts, counts)
+
+
+@receiver(post_delete, sender=Trip)
+def uncount_deleted_trip(sender, instance, **kwargs):
+    """Remove a deleted trip from the count of its day of journey."""
+    count_on_commit(bump_day_counts, {daily_count_key(DailyCount.Kind.TRIP_JOURNEY, instance.date_of_journey): -1})
+
+
+@receiver(post_save, sender=LuggageBill)
+def index_saved_bill(sender, instance, raw=False, using="default", **kwargs):
+    """Index the search document of a saved bill."""
+    if not raw:
+        index_bills([instance], using)
+
+
+@receiver(pre_save, sender=Customer)
+@receiver(pre_save, sender=Trip)
+@receiver(pre_save, sender=Bus)
+@receiver(pre_save, sender=ParkLocation)
+def remember_search_fields(sender, instance, **kwargs):
+    """Keep the stored values of the fields copied into bill search documents."""
+    instance._stored_search_fields = None
+    if not instance._state.adding and instance.pk is not None:
+        fields = SEARCH_FIELDS[sender._meta.model_name]
+        instance._stored_search_fields = sender._base_manager.filter(pk=instance.pk).values_list(*fields).first()
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_save, sender=Trip)
+@receiver(post_save, sender=Bus)
+@receiver(post_save, sender=ParkLocation)
+def reindex_referencing_bills(sender, instance, created, raw=False, **kwargs):
+    """Rebuild the search documents of the bills showing a renamed object, once the rename commits."""
+    previous = getattr(instance, "_stored_search_fields", None)
+    if created or raw or previous is None:
+        return
+    fields = SEARCH_FIELDS[sender._meta.model_name]
+    if previous != tuple(getattr(instance, field) for field in fields):
+        refresh_on_commit(reindex_referencing, [(instance._state.db, sender._meta.model_name, instance.pk)])
+
+
+@receiver(post_delete, sender=Customer)
+def forget_deleted_customer(sender, instance, **kwargs):
+    """Drop a deleted customer from this process's fuzzy index."""
+    customer_index.discard(instance.pk)
+
+
+@receiver(post_save, sender=Luggage)
+def tag_saved_luggage(sender, instance, raw=False, using="default", **kwargs):
+    """Keep one tag per bag of a saved luggage item."""
+    if not raw:
+        sync_bag_tags([instance], using)
+
+
+@receiver(pre_save, sender=LuggageBill)
+def remember_bill_customer(sender, instance, **kwargs):
+    """Keep the stored customer so moving a bill to another customer refreshes both."""
+    instance._stored_customer_id = None
+    if not instance._state.adding and instance.pk is not None:
+        instance._stored_customer_id = (
+            LuggageBill.objects.filter(pk=instance.pk).values_list("customer_id", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=LuggageBill)
+def summarise_saved_bill(sender, instance, raw=False, **kwargs):
+    """Refresh the summary of the customer of a saved bill."""
+    if not raw:
+        refresh_on_commit(
+            refresh_customer_summaries, {instance.customer_id, getattr(instance, "_stored_customer_id", None)} - {None}
+        )
+
+
+@receiver(post_delete, sender=LuggageBill)
+def summarise_deleted_bill(sender, instance, origin=None, **kwargs):
+    """Refresh the summary of the customer of a deleted bill, unless the customer goes too."""
+    if not isinstance(origin, Customer) and getattr(origin, "model", None) is not Customer:
+        refresh_on_commit(refresh_customer_summaries, [instance.customer_id])
+
+
+@receiver(post_save, sender=Luggage)
+@receiver(post_delete, sender=Luggage)
+def summarise_changed_luggage(sender, instance, raw=False, origin=None, **kwargs):
+    """Refresh the summary of the customer whose luggage was saved or deleted on its own."""
+    if raw or (origin is not None and origin is not instance and getattr(origin, "model", None) is not Luggage):
+        # Deleting a bill, trip or customer refreshes the summary once instead
+        return
+    refresh_on_commit(
+        refresh_customer_summaries,
+        LuggageBill.objects.filter(pk=instance.luggagebill_id).values_list("customer_id", flat=True),
+    )
+
+
+@receiver(post_save, sender=Trip)
+def summarise_rescheduled_trip(sender, instance, created, raw=False, **kwargs):
+    """Refresh the last trip of the customers of a rescheduled trip."""
+    previous = getattr(instance, "_stored_date_of_journey", None)
+    if not created and not raw and previous is not None and previous != instance.date_of_journey:
+        refresh_on_commit(refresh_customer_summaries, instance.luggagebills.values_list("customer_id", flat=True))
+
+
+def trip_route_week(trip_id):
+    """Return the route and week key of a live trip, if it still exists."""
+    row = Trip.objects.filter(pk=trip_id).values_list("departure_id", "destination_id", "date_of_journey").first()
+    return [route_week_key(*row)] if row else []
+
+
+@receiver(post_save, sender=LuggageBill)
+@receiver(post_delete, sender=LuggageBill)
+def summarise_bill_route(sender, instance, raw=False, origin=None, **kwargs):
+    """Refresh the route and week of a bill saved or deleted on its own."""
+    if raw or isinstance(origin, (Trip, ParkLocation)) or getattr(origin, "model", None) in (Trip, ParkLocation):
+        return
+    refresh_on_commit(refresh_route_week_keys, trip_route_week(instance.trip_id))
+
+
+@receiver(post_save, sender=Luggage)
+@receiver(post_delete, sender=Luggage)
+def summarise_luggage_route(sender, instance, raw=False, origin=None, **kwargs):
+    """Refresh the route and week of luggage saved or deleted on its own."""
+    if raw or (origin is not None and origin is not instance and getattr(origin, "model", None) is not Luggage):
+        return
+    trip_id = LuggageBill.objects.filter(pk=instance.luggagebill_id).values_list("trip_id", flat=True).first()
+    refresh_on_commit(refresh_route_week_keys, trip_route_week(trip_id))
+
+
+@receiver(post_save, sender=Trip)
+def summarise_trip_route(sender, instance, created, raw=False, **kwargs):
+    """Refresh the route and week of a saved trip, and those it was moved from."""
+    if raw:
+        return
+    keys = {route_week_key(instance.departure_id, instance.destination_id, instance.date_of_journey)}
+    previous_fields = getattr(instance, "_stored_search_fields", None)
+    previous_date = getattr(instance, "_stored_date_of_journey", None)
+    if previous_fields is not None and previous_date is not None:
+        fields = SEARCH_FIELDS["trip"]
+        previous = dict(zip(fields, previous_fields))
+        keys.add(route_week_key(previous["departure_id"], previous["destination_id"], previous_date))
+    refresh_on_commit(refresh_route_week_keys, keys)
+
+
+@receiver(post_delete, sender=Trip)
+def summarise_deleted_trip_route(sender, instance, **kwargs):
+    """Refresh the route and week of a deleted trip."""
+    refresh_on_commit(
+        refresh_route_week_keys,
+        [route_week_key(instance.departure_id, instance.destination_id, instance.date_of_journey)],
+    )
+
+
+@receiver(post_save, sender=LuggageBill)
+@receiver(post_delete, sender=LuggageBill)
+def summarise_bill_staff_day(sender, instance, raw=False, origin=None, **kwargs):
+    """Refresh the day of the staff member who added a saved or deleted bill, unless they go too."""
+    User = get_user_model()
+    if raw or isinstance(origin, User) or getattr(origin, "model", None) is User:
+        return
+    refresh_on_commit(refresh_staff_days, [staff_day_key(instance.added_by_id, instance.created)])
+
+
+@receiver(post_save, sender=Luggage)
+@receiver(post_delete, sender=Luggage)
+def summarise_luggage_staff_day(sender, instance, raw=False, origin=None, **kwargs):
+    """Refresh the staff day of the bill of luggage saved or deleted on its own."""
+    if raw or (origin is not None and origin is not instance and getattr(origin, "model", None) is not Luggage):
+        return
+    bills = LuggageBill.objects.filter(pk=instance.luggagebill_id).values_list("added_by_id", "created")
+    refresh_on_commit(refresh_staff_days, [staff_day_key(*row) for row in bills])
+
+
+@receiver(post_save, sender=Trip)
+def summarise_moved_trip_staff_days(sender, instance, created, raw=False, **kwargs):
+    """Refresh the staff days of the bills of a trip moved to another departure park."""
+    previous_fields = getattr(instance, "_stored_search_fields", None)
+    if created or raw or previous_fields is None:
+        return
+    if dict(zip(SEARCH_FIELDS["trip"], previous_fields))["departure_id"] != instance.departure_id:
+        bills = instance.luggagebills.values_list("added_by_id", "created")
+        refresh_on_commit(refresh_staff_days, {staff_day_key(*row) for row in bills})
+
+
+@receiver(post_save, sender=LuggageBill)
+@receiver(post_delete, sender=LuggageBill)
+@receiver(post_save, sender=Luggage)
+@receiver(post_delete, sender=Luggage)
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+def refresh_dashboard(sender, **kwargs):
+    """Have the admin index dashboard pick up the writes once the transaction commits."""
+    call_on_commit(mark_dashboard_stale)
+
+
+@receiver(post_save, sender=PricingRule)
+@receiver(post_delete, sender=PricingRule)
+@receiver(post_save, sender=Weight)
+@receiver(post_delete, sender=Weight)
+@receiver(post_save, sender=BagType)
+@receiver(post_delete, sender=BagType)
+def recheck_pricing(sender, **kwargs):
+    """Have this process read the pricing version again rather than wait for the next check."""
+    pricing_engine.invalidate()
+    # Again once committed, in case another thread compiled the old rules meanwhile
+    transaction.on_commit(pricing_engine.invalidate)
@@ -0,0 +1,267 @@
+"""Append-only columnar snapshots of the luggage history, read through ``numpy.memmap``.
+
+Heavy historical reports should not compete with the clerks for the
+database. ``export_snapshot`` copies every luggage item, denormalised with
+its bill, trip, bag type and weight, into fixed-width binary column files
+under ``LUGGAGE_SNAPSHOT_DIR``, one directory per month the item was
+created in::
+
+    snapshots/items/2024-10/id.bin
+    snapshots/items/2024-10/quantity.bin
+    ...
+    snapshots/manifest.json
+
+Prices and weights are the ones captured on the items, so an export never
+reads ``Weight``. Exports are incremental: only items whose row, bill or
+trip changed since the watermark of the previous export are read, and they
+are appended to the partition of their creation month. A changed item is
+therefore stored again and readers keep its last copy. Archived items are
+exported too, so the snapshot keeps the history the live tables shed.
+
+The manifest records how many rows of every partition are complete and is
+replaced atomically after the files are flushed. Readers only map that many
+rows, so a reader never sees a half written export, and an interrupted
+export is truncated away by the next one. ``load_snapshot`` maps the column
+files read-only, which lets the operating system share the pages between
+every process reading them.
+"""
+
+import datetime
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .analytics import DERIVED_FIELDS, SIZE_CODES, ItemFrame, local_day, lookup
+from .models import ArchivedLuggage, BagType, Luggage
+
+# Stored columns, their fixed-width type and the item field they come from.
+SNAPSHOT_COLUMNS = {
+    "id": ("<i8", "pk"),
+    "bill": ("<i8", "luggagebill_id"),
+    "trip": ("<i4", "luggagebill__trip_id"),
+    "departure": ("<i4", "luggagebill__trip__departure_id"),
+    "destination": ("<i4", "luggagebill__trip__destination_id"),
+    "bus": ("<i4", "luggagebill__trip__bus_id"),
+    "bag_type": ("<i4", "bag_type_id"),
+    "weight": ("<i4", "weight_id"),
+    "quantity": ("<i4", "quantity"),
+    "journey": ("<i4", "luggagebill__trip__date_of_journey"),
+    "created": ("<i4", "created"),
+    "price": ("<i8", "unit_price"),
+    "min_weight": ("<i8", "unit_weight"),
+    "size": ("<i4", None),
+}
+
+# Rows changed this long before the watermark are read again, in case their
+# transaction had not committed when the previous export ran.
+WATERMARK_OVERLAP = datetime.timedelta(minutes=5)
+
+
+class SnapshotStore:
+    """The snapshot files and manifest under one directory."""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or settings.LUGGAGE_SNAPSHOT_DIR)
+
+    def partition_path(self, month):
+        return self.directory / "items" / month
+
+    def column_path(self, month, column):
+        return self.partition_path(month) / f"{column}.bin"
+
+    def read_manifest(self):
+        try:
+            with open(self.directory / "manifest.json") as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return {"watermark": None, "partitions": {}}
+
+    def write_manifest(self, manifest):
+        path = self.directory / "manifest.json"
+        temporary = path.with_suffix(".tmp")
+        with open(temporary, "w") as output:
+            json.dump(manifest, output, indent=2, sort_keys=True)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, path)
+
+    @contextmanager
+    def lock(self):
+        """Hold the exclusive export lock of the store."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def truncate(self, month, rows):
+        """Cut the column files of ``month`` back to ``rows`` complete rows."""
+        for column, (dtype, _) in SNAPSHOT_COLUMNS.items():
+            path = self.column_path(month, column)
+            if path.exists():
+                os.truncate(path, rows * np.dtype(dtype).itemsize)
+
+    def append(self, month, columns):
+        partition = self.partition_path(month)
+        partition.mkdir(parents=True, exist_ok=True)
+        for column, (dtype, _) in SNAPSHOT_COLUMNS.items():
+            with open(self.column_path(month, column), "ab") as output:
+                columns[column].astype(dtype).tofile(output)
+                output.flush()
+                os.fsync(output.fileno())
+
+    def open_column(self, month, column, rows):
+        """Map the first ``rows`` values of a column read-only."""
+        if not rows:
+            return np.empty(0, dtype=SNAPSHOT_COLUMNS[column][0])
+        return np.memmap(self.column_path(month, column), dtype=SNAPSHOT_COLUMNS[column][0], mode="r", shape=(rows,))
+
+
+def changed_items(model, since):
+    """Return the items of ``model`` whose row, bill or trip changed since ``since``."""
+    items = model._base_manager.order_by()
+    if since is None:
+        return items
+    changed = Q(updated__gte=since) | Q(luggagebill__updated__gte=since) | Q(luggagebill__trip__updated__gte=since)
+    if model is ArchivedLuggage:
+        # Archiving keeps the timestamps of the live row
+        changed |= Q(archived__gte=since)
+    return items.filter(changed)
+
+
+def item_columns(rows, bag_types):
+    """Turn a chunk of item rows into snapshot columns."""
+    fields = [column for column, (_, field) in SNAPSHOT_COLUMNS.items() if field]
+    values = dict(zip(fields, zip(*rows)))
+    columns = {}
+    for column in fields:
+        if column in ("journey", "created"):
+            columns[column] = np.array([local_day(value) for value in values[column]], dtype=np.int32)
+        elif column == "price":
+            columns[column] = np.array([int(value * 100) for value in values[column]], dtype=np.int64)
+        else:
+            columns[column] = np.array(values[column], dtype=np.int64)
+    columns["size"] = lookup(bag_types[0], bag_types[1], columns["bag_type"])
+    return columns
+
+
+def export_snapshot(directory=None, full=False, chunk_size=20000):
+    """Append the items changed since the last export to the snapshot.
+
+    With ``full`` the snapshot is rebuilt from scratch. Returns the number of
+    rows written.
+    """
+    store = SnapshotStore(directory)
+    with store.lock():
+        if full:
+            shutil.rmtree(store.directory / "items", ignore_errors=True)
+            (store.directory / "manifest.json").unlink(missing_ok=True)
+        manifest = store.read_manifest()
+        partitions = manifest["partitions"]
+        for month, partition in partitions.items():
+            store.truncate(month, partition["rows"])
+        since = manifest["watermark"] and datetime.datetime.fromisoformat(manifest["watermark"]) - WATERMARK_OVERLAP
+        started = timezone.now()
+
+        bag_type_rows = list(BagType.objects.values_list("pk", "size"))
+        bag_types = (
+            np.array([pk for pk, _ in bag_type_rows], dtype=np.int64),
+            np.array([SIZE_CODES.get(size, -1) for _, size in bag_type_rows], dtype=np.int32),
+        )
+        fields = [field for _, field in SNAPSHOT_COLUMNS.values() if field]
+        written = 0
+        for model in (Luggage, ArchivedLuggage):
+            rows = changed_items(model, since).values_list(*fields).iterator(chunk_size)
+            while chunk := list(islice(rows, chunk_size)):
+                columns = item_columns(chunk, bag_types)
+                months = columns["created"].astype("datetime64[D]").astype("datetime64[M]")
+                for month in np.unique(months):
+                    mask = months == month
+                    key = str(month)
+                    store.append(key, {column: values[mask] for column, values in columns.items()})
+                    partition = partitions.setdefault(
+                        key, {"rows": 0, "journey_min": None, "journey_max": None, "deduplicate": False}
+                    )
+                    journeys = columns["journey"][mask]
+                    partition["rows"] += int(mask.sum())
+                    partition["journey_min"] = min(int(journeys.min()), partition["journey_min"] or 1 << 30)
+                    partition["journey_max"] = max(int(journeys.max()), partition["journey_max"] or 0)
+                    partition["deduplicate"] = partition["deduplicate"] or since is not None
+                    written += int(mask.sum())
+        manifest["watermark"] = started.isoformat()
+        store.write_manifest(manifest)
+    return written
+
+
+def required_columns(columns):
+    needed = set()
+    for column in columns:
+        if column in SNAPSHOT_COLUMNS:
+            needed.add(column)
+        else:
+            needed.update(DERIVED_FIELDS[column])
+    return sorted(needed & SNAPSHOT_COLUMNS.keys())
+
+
+def load_snapshot(columns, start=None, end=None, directory=None):
+    """Open the ``columns`` of the snapshot as an ``ItemFrame`` without querying the database.
+
+    ``start`` and ``end`` are optional local dates bounding the day of
+    journey, both inclusive. A single partition read without filtering is
+    returned as memory maps; otherwise only the selected rows are copied.
+    """
+    store = SnapshotStore(directory)
+    manifest = store.read_manifest()
+    first = (start - datetime.date(1970, 1, 1)).days if start else None
+    last = (end - datetime.date(1970, 1, 1)).days if end else None
+    needed = required_columns(columns)
+    parts = []
+    for month, partition in sorted(manifest["partitions"].items()):
+        rows = partition["rows"]
+        if not rows:
+            continue
+        if (
+            first is not None
+            and partition["journey_max"] < first
+            or last is not None
+            and partition["journey_min"] > last
+        ):
+            continue
+        maps = {column: store.open_column(month, column, rows) for column in needed}
+        mask = None
+        if partition["deduplicate"]:
+            # Keep the last copy of every item
+            ids = store.open_column(month, "id", rows)
+            _, last_copies = np.unique(ids[::-1], return_index=True)
+            mask = np.zeros(rows, dtype=bool)
+            mask[rows - 1 - last_copies] = True
+        if first is not None or last is not None:
+            journey = store.open_column(month, "journey", rows)
+            in_range = np.ones(rows, dtype=bool)
+            if first is not None:
+                in_range &= journey >= first
+            if last is not None:
+                in_range &= journey <= last
+            mask = in_range if mask is None else mask & in_range
+        parts.append(maps if mask is None else {column: values[mask] for column, values in maps.items()})
+    if len(parts) == 1:
+        return ItemFrame(parts[0])
+    return ItemFrame(
+        {
+            column: np.concatenate([part[column] for part in parts])
+            if parts
+            else np.empty(0, dtype=SNAPSHOT_COLUMNS[column][0])
+            for column in needed
+        }
+    )
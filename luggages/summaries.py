@@ -0,0 +1,388 @@
+"""Maintained summaries of customers and routes.
+
+``CustomerSummary`` keeps what used to be derived by walking a customer's
+bills and calling ``total_amount()`` on each: the number of trips and
+bills, the bags, kilograms and money sent, the last trip and the route
+sent on most. Live and archived bills both count, so archiving a trip does
+not change a customer's lifetime figures.
+
+A summary is recomputed from two grouped queries per bill table, filtered
+on the indexed ``customer`` key, so refreshing one customer costs the same
+however many customers there are. Saving or deleting a bill or an item
+refreshes its customer (see ``signals.py``) and bulk imports refresh the
+customers they added bills for. ``refresh_customer_summaries`` without ids
+rebuilds every customer in batches, e.g. after items were corrected in
+bulk.
+
+``RouteWeek`` does the same for a route, i.e. a departure and destination
+park, in a week of journey: trips, bills, kilograms and revenue, the load
+against the ``max_luggage_weight`` of the buses and the bags of every
+``BagType.SizeOption``. Changing a bill, an item or a trip refreshes the
+route and week it belongs to, and the route dashboard reads these rows only.
+
+``StaffDay`` holds the bills, bags and revenue every staff member booked
+per day and departure park. Changing a bill or an item refreshes the day of
+the clerk who added the bill, reading only that clerk's bills of that day
+through the ``(added_by, created)`` index.
+
+The signals do not refresh anything right away: they collect the
+customers, routes and staff days a transaction touched and refresh each of
+them once when it commits (see ``deferred.py``).
+"""
+
+import datetime
+from collections import Counter, defaultdict
+from decimal import Decimal
+from itertools import islice
+
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    F,
+    IntegerField,
+    Max,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    ArchivedLuggage,
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    BagType,
+    Customer,
+    CustomerSummary,
+    Luggage,
+    LuggageBill,
+    RouteWeek,
+    StaffDay,
+    Trip,
+)
+
+SUMMARY_FIELDS = [
+    "trips",
+    "bills",
+    "bags",
+    "kilograms",
+    "spend",
+    "last_trip",
+    "favourite_departure",
+    "favourite_destination",
+    "refreshed",
+]
+
+
+def summarise(customer_ids):
+    """Return an unsaved ``CustomerSummary`` for each of ``customer_ids``."""
+    now = timezone.now()
+    summaries = {pk: CustomerSummary(customer_id=pk, refreshed=now) for pk in customer_ids}
+    routes = {pk: Counter() for pk in customer_ids}
+    for bill_model in (LuggageBill, ArchivedLuggageBill):
+        bills = bill_model._base_manager.filter(customer_id__in=customer_ids).order_by()
+        totals = bills.values("customer_id").annotate(
+            trip_count=Count("trip", distinct=True),
+            bill_count=Count("pk", distinct=True),
+            last_trip=Max("trip__date_of_journey"),
+            bags=Coalesce(Sum("items__quantity"), 0),
+            kilograms=Coalesce(Sum(F("items__quantity") * F("items__unit_weight"), output_field=IntegerField()), 0),
+            spend=Coalesce(
+                Sum(F("items__quantity") * F("items__unit_price"), output_field=DecimalField()),
+                Value(Decimal("0")),
+                output_field=DecimalField(),
+            ),
+        )
+        for row in totals:
+            summary = summaries[row["customer_id"]]
+            summary.trips += row["trip_count"]
+            summary.bills += row["bill_count"]
+            summary.bags += row["bags"]
+            summary.kilograms += row["kilograms"]
+            summary.spend += row["spend"]
+            if summary.last_trip is None or row["last_trip"] > summary.last_trip:
+                summary.last_trip = row["last_trip"]
+        by_route = bills.values_list("customer_id", "trip__departure_id", "trip__destination_id").annotate(
+            count=Count("pk")
+        )
+        for customer_id, departure_id, destination_id, count in by_route:
+            routes[customer_id][(departure_id, destination_id)] += count
+    for pk, counts in routes.items():
+        if counts:
+            # Ties go to the route with the lowest park ids so the choice is stable
+            (departure_id, destination_id), _ = min(counts.items(), key=lambda item: (-item[1], item[0]))
+            summaries[pk].favourite_departure_id = departure_id
+            summaries[pk].favourite_destination_id = destination_id
+    return list(summaries.values())
+
+
+def refresh_customer_summaries(customer_ids=None, batch_size=1000):
+    """Recompute the summaries of ``customer_ids``, or of every customer when None.
+
+    Returns the number of summaries written.
+    """
+    customers = Customer.objects.order_by("pk").values_list("pk", flat=True)
+    if customer_ids is not None:
+        # Keys collected for a transaction may belong to customers it deleted
+        customers = customers.filter(pk__in=set(customer_ids))
+    customers = customers.iterator(batch_size)
+    written = 0
+    while batch := list(islice(customers, batch_size)):
+        summaries = summarise(batch)
+        CustomerSummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=["customer"], update_fields=SUMMARY_FIELDS
+        )
+        written += len(summaries)
+    return written
+
+
+ROUTE_SOURCES = [
+    (Trip, LuggageBill, Luggage),
+    (ArchivedTrip, ArchivedLuggageBill, ArchivedLuggage),
+]
+
+BAG_SIZE_FIELDS = {
+    BagType.SizeOption.SMALL: "small_bags",
+    BagType.SizeOption.MEDIUM: "medium_bags",
+    BagType.SizeOption.LARGE: "large_bags",
+}
+
+ROUTE_FIELDS = ["trips", "bills", "kilograms", "revenue", "capacity", "capacity_kilograms", *BAG_SIZE_FIELDS.values()]
+
+
+def week_of(value):
+    """Return the Monday of the local week of the datetime ``value``."""
+    day = timezone.localdate(value)
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def route_week_key(departure_id, destination_id, date_of_journey):
+    return departure_id, destination_id, week_of(date_of_journey)
+
+
+def refresh_route_weeks(weeks, routes=None):
+    """Recompute the ``RouteWeek`` rows of ``weeks``, limited to the ``(departure, destination)`` ``routes``.
+
+    Rows of routes left without trips are deleted. Returns the number of rows written.
+    """
+    tz = timezone.get_current_timezone()
+    written = 0
+    for week in sorted(set(weeks)):
+        since = datetime.datetime.combine(week, datetime.time.min, tz)
+        until = since + datetime.timedelta(weeks=1)
+        route_filter = Q()
+        for departure_id, destination_id in routes or ():
+            route_filter |= Q(departure_id=departure_id, destination_id=destination_id)
+        now = timezone.now()
+        rows = {}
+        for trip_model, bill_model, item_model in ROUTE_SOURCES:
+            trips = {
+                pk: (departure_id, destination_id, max_luggage_weight)
+                for pk, departure_id, destination_id, max_luggage_weight in trip_model._base_manager.filter(
+                    route_filter, date_of_journey__gte=since, date_of_journey__lt=until
+                )
+                .order_by()
+                .values_list("pk", "departure_id", "destination_id", "bus__max_luggage_weight")
+            }
+            kilograms = Counter()
+            for departure_id, destination_id, max_luggage_weight in trips.values():
+                row = rows.setdefault(
+                    (departure_id, destination_id),
+                    RouteWeek(
+                        departure_id=departure_id,
+                        destination_id=destination_id,
+                        week=week,
+                        refreshed=now,
+                        revenue=Decimal("0"),
+                        **{name: 0 for name in ROUTE_FIELDS if name != "revenue"},
+                    ),
+                )
+                row.trips += 1
+                row.capacity += max_luggage_weight or 0
+            bills = bill_model._base_manager.filter(trip_id__in=trips).order_by()
+            for trip_id, count in bills.values_list("trip_id").annotate(count=Count("pk")):
+                rows[trips[trip_id][:2]].bills += count
+            items = item_model._base_manager.filter(luggagebill__trip_id__in=trips).order_by()
+            for trip_id, size, bags, weight, revenue in items.values_list(
+                "luggagebill__trip_id", "bag_type__size"
+            ).annotate(
+                bags=Sum("quantity"),
+                carried=Sum(F("quantity") * F("unit_weight"), output_field=IntegerField()),
+                amount=Sum(F("quantity") * F("unit_price"), output_field=DecimalField()),
+            ):
+                row = rows[trips[trip_id][:2]]
+                row.kilograms += weight
+                row.revenue += revenue
+                if size in BAG_SIZE_FIELDS:
+                    setattr(row, BAG_SIZE_FIELDS[size], getattr(row, BAG_SIZE_FIELDS[size]) + bags)
+                kilograms[trip_id] += weight
+            for trip_id, (departure_id, destination_id, max_luggage_weight) in trips.items():
+                if max_luggage_weight:
+                    rows[departure_id, destination_id].capacity_kilograms += kilograms[trip_id]
+
+        RouteWeek.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=["departure", "destination", "week"],
+            update_fields=ROUTE_FIELDS + ["refreshed"],
+        )
+        RouteWeek.objects.filter(route_filter, week=week, refreshed__lt=now).delete()
+        written += len(rows)
+    return written
+
+
+def refresh_route_week_keys(keys):
+    """Recompute the ``RouteWeek`` rows of the ``(departure, destination, week)`` ``keys``."""
+    routes_by_week = defaultdict(set)
+    for departure_id, destination_id, week in keys:
+        routes_by_week[week].add((departure_id, destination_id))
+    for week, routes in routes_by_week.items():
+        refresh_route_weeks([week], routes)
+
+
+def rebuild_route_weeks():
+    """Recompute every ``RouteWeek`` row from the live and archived trips."""
+    weeks = set(RouteWeek.objects.values_list("week", flat=True))
+    for trip_model, _, _ in ROUTE_SOURCES:
+        journeys = trip_model._base_manager.order_by().values_list("date_of_journey", flat=True)
+        weeks.update(week_of(journey) for journey in journeys.iterator(chunk_size=2000))
+    return refresh_route_weeks(weeks)
+
+
+def route_dashboard(weeks=12):
+    """Compare the routes over the last ``weeks`` weeks, best revenue first, from ``RouteWeek`` alone.
+
+    Returns one dict per route with its trips per week, revenue per trip,
+    average load against capacity (None when no bus has a maximum) and the
+    share of bags of every size.
+    """
+    first_week = week_of(timezone.now()) - datetime.timedelta(weeks=weeks - 1)
+    routes = (
+        RouteWeek.objects.filter(week__gte=first_week)
+        .values("departure__location", "destination__location")
+        .annotate(**{name: Sum(name) for name in ROUTE_FIELDS})
+        .order_by("-revenue", "departure__location", "destination__location")
+    )
+    dashboard = []
+    for route in routes:
+        bags = sum(route[name] for name in BAG_SIZE_FIELDS.values())
+        dashboard.append(
+            {
+                "departure": route["departure__location"],
+                "destination": route["destination__location"],
+                "trips": route["trips"],
+                "trips_per_week": route["trips"] / weeks,
+                "revenue": route["revenue"],
+                "revenue_per_trip": route["revenue"] / route["trips"] if route["trips"] else Decimal("0"),
+                "load": route["capacity_kilograms"] / route["capacity"] if route["capacity"] else None,
+                "bags": bags,
+                "bag_mix": {
+                    BagType.SizeOption(size).label: route[name] / bags if bags else 0
+                    for size, name in BAG_SIZE_FIELDS.items()
+                },
+            }
+        )
+    return dashboard
+
+
+STAFF_FIELDS = ["bills", "bags", "revenue"]
+
+
+def local_day_range(day):
+    """Return the aware datetimes bounding the local ``day``."""
+    since = datetime.datetime.combine(day, datetime.time.min, timezone.get_current_timezone())
+    return since, since + datetime.timedelta(days=1)
+
+
+def staff_day_key(user_id, created):
+    """Return the ``(user, day)`` key of a bill added by ``user_id`` at ``created``."""
+    return user_id, timezone.localdate(created)
+
+
+def refresh_staff_days(keys):
+    """Recompute the ``StaffDay`` rows of the ``(user, day)`` ``keys``.
+
+    Returns the number of rows written.
+    """
+    written = 0
+    for user_id, day in sorted(set(keys)):
+        since, until = local_day_range(day)
+        now = timezone.now()
+        rows = {}
+        for bill_model in (LuggageBill, ArchivedLuggageBill):
+            bills = bill_model._base_manager.filter(added_by_id=user_id, created__gte=since, created__lt=until)
+            for park_id, count in bills.order_by().values_list("trip__departure_id").annotate(count=Count("pk")):
+                row = rows.setdefault(
+                    park_id,
+                    StaffDay(user_id=user_id, day=day, park_id=park_id, bills=0, bags=0, revenue=0, refreshed=now),
+                )
+                row.bills += count
+            items = (
+                bills.order_by()
+                .values_list("trip__departure_id")
+                .annotate(
+                    quantity=Sum("items__quantity"),
+                    amount=Sum(F("items__quantity") * F("items__unit_price"), output_field=DecimalField()),
+                )
+            )
+            for park_id, bags, revenue in items:
+                rows[park_id].bags += bags or 0
+                rows[park_id].revenue += revenue or 0
+        StaffDay.objects.bulk_create(
+            rows.values(),
+            update_conflicts=True,
+            unique_fields=["user", "day", "park"],
+            update_fields=STAFF_FIELDS + ["refreshed"],
+        )
+        StaffDay.objects.filter(user_id=user_id, day=day, refreshed__lt=now).delete()
+        written += len(rows)
+    return written
+
+
+def rebuild_staff_days():
+    """Recompute every ``StaffDay`` row from the live and archived bills."""
+    keys = set(StaffDay.objects.values_list("user_id", "day"))
+    for bill_model in (LuggageBill, ArchivedLuggageBill):
+        bills = bill_model._base_manager.order_by().values_list("added_by_id", "created")
+        keys.update(staff_day_key(*row) for row in bills.iterator(chunk_size=2000))
+    return refresh_staff_days(keys)
+
+
+def staff_productivity(start, end, park=None):
+    """Compare every staff member's days from ``start`` to ``end`` with the average of their park.
+
+    Returns one dict per staff member, park and day, newest day first, with
+    the bills, bags and revenue booked and the average per staff member of
+    the same park and day. Reads ``StaffDay`` only.
+    """
+    days = StaffDay.objects.filter(day__gte=start, day__lte=end)
+    if park is not None:
+        days = days.filter(park=park)
+    averages = {
+        (row["park"], row["day"]): row
+        for row in days.order_by()
+        .values("park", "day")
+        .annotate(staff=Count("user"), average_bills=Avg("bills"), average_revenue=Avg("revenue"))
+    }
+    report = []
+    for staff_day in days.select_related("user", "park").order_by("-day", "park__location", "-revenue"):
+        average = averages[staff_day.park_id, staff_day.day]
+        report.append(
+            {
+                "staff": staff_day.user,
+                "park": staff_day.park,
+                "day": staff_day.day,
+                "bills": staff_day.bills,
+                "bags": staff_day.bags,
+                "revenue": staff_day.revenue,
+                "park_staff": average["staff"],
+                "average_bills": average["average_bills"],
+                "average_revenue": average["average_revenue"],
+                "bills_against_average": staff_day.bills / average["average_bills"]
+                if average["average_bills"]
+                else None,
+            }
+        )
+    return report
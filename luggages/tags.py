@@ -0,0 +1,97 @@
+"""Per-bag tag codes for luggage items and scanning at loading bays.
+
+``Luggage.quantity`` stands for several identical bags, so every item gets
+one ``BagTag`` per bag, numbered from 1 to the quantity and carrying a short
+random code in Crockford's base 32 (8 characters, 40 bits). Codes are unique
+and indexed, so resolving a scanned code is a single indexed lookup.
+"""
+
+import secrets
+
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import BagTag
+
+CODE_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+CODE_LENGTH = 8
+# Characters misread from printed or handwritten tags.
+CODE_ALIASES = str.maketrans({"O": "0", "I": "1", "L": "1"})
+
+
+def generate_tag_code():
+    return "".join(secrets.choice(CODE_ALPHABET) for _ in range(CODE_LENGTH))
+
+
+def normalize_tag_code(code):
+    """Return the canonical form of a scanned or typed tag code."""
+    return code.strip().upper().replace("-", "").replace(" ", "").translate(CODE_ALIASES)
+
+
+def sync_bag_tags(items, using="default"):
+    """Give every item one tag per bag, in bulk.
+
+    Missing tags are created; tags beyond a lowered quantity are removed.
+    """
+    items = [item for item in items if item.pk is not None]
+    if not items:
+        return
+    last_sequence = dict(
+        BagTag.objects.using(using)
+        .filter(luggage__in=items)
+        .values("luggage")
+        .annotate(last=Max("sequence"))
+        .values_list("luggage", "last")
+    )
+    tags = []
+    for item in items:
+        last = last_sequence.get(item.pk, 0)
+        if last > item.quantity:
+            BagTag.objects.using(using).filter(luggage=item, sequence__gt=item.quantity).delete()
+        tags.extend(BagTag(luggage=item, sequence=sequence) for sequence in range(last + 1, item.quantity + 1))
+    create_bag_tags(tags, using)
+
+
+def create_bag_tags(tags, using="default", attempts=5):
+    """Insert ``tags`` with fresh codes, drawing new codes on a collision."""
+    for attempt in range(attempts):
+        for tag in tags:
+            tag.code = generate_tag_code()
+        try:
+            with transaction.atomic(using=using):
+                return BagTag.objects.using(using).bulk_create(tags, batch_size=1000)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def scan_tag(code):
+    """Return the tag for ``code`` with its bag, bill, customer and trip, or None."""
+    return (
+        BagTag.objects.select_related(
+            "luggage__bag_type",
+            "luggage__weight",
+            "luggage__luggagebill__customer",
+            "luggage__luggagebill__trip",
+        )
+        .filter(code=normalize_tag_code(code))
+        .first()
+    )
+
+
+def mark_tags(codes, status, batch_size=500):
+    """Set ``status`` on the tags of ``codes`` in one transaction.
+
+    Returns the number of tags updated and the codes that matched no tag.
+    """
+    codes = list(dict.fromkeys(normalize_tag_code(code) for code in codes if code.strip()))
+    now = timezone.now()
+    updated = 0
+    found = set()
+    with transaction.atomic():
+        for start in range(0, len(codes), batch_size):
+            batch = codes[start : start + batch_size]
+            found.update(BagTag.objects.filter(code__in=batch).values_list("code", flat=True))
+            updated += BagTag.objects.filter(code__in=batch).update(status=status, scanned_at=now, updated=now)
+    return updated, [code for code in codes if code not in found]
@@ -1,7 +1,20 @@
+import datetime
+
 from django import template
+from django.contrib.admin.templatetags.admin_list import date_hierarchy
 from django.shortcuts import get_object_or_404
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
 
-from ..models import LuggageBill, Trip
+from ..dashboard import dashboard
+from ..models import Trip
+from ..rollups import (
+    daily_count_dates,
+    daily_count_kind,
+    daily_count_range,
+    day_filters_for,
+)
 
 register = template.Library()
 
@@ -11,9 +24,99 @@ def display_trip_luggages(trip_id):
     """
     Display the luggages attached to this trip in admin change_form view.
     """
-    trip = get_object_or_404(Trip, id=trip_id)
-    luggages = LuggageBill.objects.filter(trip=trip)
+    # Bill and trip totals are summed from the prefetched items
+    trip = get_object_or_404(Trip.objects.prefetch_related("luggagebills__items"), id=trip_id)
+    luggages = trip.luggagebills.all()
     return {
         "luggages": luggages,
         "trip": trip,
     }
+
+
+@register.inclusion_tag("admin/luggages/dashboard.html", takes_context=True)
+def admin_dashboard(context):
+    """
+    Display today's operational figures on the admin index, from the cache.
+    """
+    if not context["request"].user.has_perm("luggages.view_luggagebill"):
+        return {"dashboard": None}
+    return {"dashboard": dashboard()}
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def daily_date_hierarchy(cl):
+    """
+    Display the admin date drill-down from the per-day counts instead of
+    date-truncation queries over the whole table.
+    """
+    field_name = cl.date_hierarchy
+    kind = daily_count_kind(cl.model, field_name)
+    day_filters = day_filters_for(cl, field_name) if kind else None
+    if day_filters is None:
+        return date_hierarchy(cl)
+
+    year_field = f"{field_name}__year"
+    month_field = f"{field_name}__month"
+    day_field = f"{field_name}__day"
+    year_lookup = cl.params.get(year_field)
+    month_lookup = cl.params.get(month_field)
+    day_lookup = cl.params.get(day_field)
+    range_filters = {key: value for key, value in day_filters.items() if key in ("day__gte", "day__lt")}
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if not (year_lookup or month_lookup or day_lookup):
+        # select appropriate start level
+        date_range = daily_count_range(kind, **range_filters)
+        if date_range["first"] and date_range["last"]:
+            if date_range["first"].year == date_range["last"].year:
+                year_lookup = date_range["first"].year
+                if date_range["first"].month == date_range["last"].month:
+                    month_lookup = date_range["first"].month
+
+    if year_lookup and month_lookup and day_lookup:
+        day = datetime.date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [{"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}],
+        }
+    elif year_lookup and month_lookup:
+        days = daily_count_dates(
+            kind, "day", day__year=int(year_lookup), day__month=int(month_lookup), **range_filters
+        )
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")),
+                }
+                for day in days
+            ],
+        }
+    elif year_lookup:
+        months = daily_count_dates(kind, "month", day__year=int(year_lookup), **range_filters)
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in months
+            ],
+        }
+    else:
+        years = daily_count_dates(kind, "year", **range_filters)
+        return {
+            "show": True,
+            "back": None,
+            "choices": [{"link": link({year_field: str(year.year)}), "title": str(year.year)} for year in years],
+        }
@@ -0,0 +1,172 @@
+import datetime
+from unittest import mock
+
+from django.contrib.admin.views.autocomplete import AutocompleteJsonView
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..admin import LuggageBillAdmin, TripInlineBus
+from ..models import Bus, Customer, LuggageBill, ParkLocation, StaffProfile, State, Trip
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        departure = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        destination = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        trip = Trip.objects.create(
+            bus=bus, departure=departure, destination=destination, date_of_journey=timezone.now()
+        )
+        self.bills = []
+        for index in range(5):
+            customer = Customer.objects.create(
+                fullname=f"Customer {index}",
+                email=f"customer{index}@example.com",
+                address="1 Main St",
+                next_of_kin="Next of Kin",
+                next_of_kin_phonenumber="08031234567",
+            )
+            self.bills.append(LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user))
+        # Give every bill the same timestamp so the id tie-breaker is exercised.
+        LuggageBill.objects.update(created=timezone.now() - datetime.timedelta(days=1))
+        self.url = reverse("admin:luggages_luggagebill_changelist")
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.context["cl"]
+
+    @mock.patch.object(LuggageBillAdmin, "list_per_page", 2)
+    def test_pages_follow_created_then_id(self):
+        cl = self.page(self.url)
+        self.assertTrue(cl.keyset_mode)
+        self.assertEqual(cl.result_count, 5)
+        seen = [bill.pk for bill in cl.result_list]
+        while cl.next_url:
+            cl = self.page(self.url + cl.next_url)
+            seen.extend(bill.pk for bill in cl.result_list)
+        self.assertEqual(seen, sorted((bill.pk for bill in self.bills), reverse=True))
+
+        previous = self.page(self.url + cl.previous_url)
+        self.assertEqual([bill.pk for bill in previous.result_list], seen[2:4])
+
+    @mock.patch.object(LuggageBillAdmin, "list_per_page", 2)
+    def test_search_is_applied_before_seeking(self):
+        cl = self.page(self.url + "?q=%22Customer+3%22")
+        self.assertEqual([bill.pk for bill in cl.result_list], [self.bills[3].pk])
+        self.assertIsNone(cl.next_url)
+
+    def test_column_sort_falls_back_to_offset_pagination(self):
+        cl = self.page(self.url + "?o=1")
+        self.assertFalse(cl.keyset_mode)
+        self.assertEqual(cl.result_count, 5)
+
+
+class AutocompleteTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        now = timezone.now()
+        self.past = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=now - datetime.timedelta(days=3)
+        )
+        self.later = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=now + datetime.timedelta(days=2)
+        )
+        self.sooner = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=now + datetime.timedelta(days=1)
+        )
+        self.inbound = Trip.objects.create(
+            bus=bus, departure=self.nsukka, destination=self.ikeja, date_of_journey=now + datetime.timedelta(days=1)
+        )
+
+    def autocomplete(self, field_name, term=""):
+        params = {"term": term, "app_label": "luggages", "model_name": "luggagebill", "field_name": field_name}
+        response = self.client.get(reverse("admin:autocomplete"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_trip_suggestions_are_upcoming_departures_from_the_clerks_park(self):
+        results = self.autocomplete("trip")["results"]
+        self.assertEqual(
+            [result["id"] for result in results], [str(self.sooner.pk), str(self.inbound.pk), str(self.later.pk)]
+        )
+        StaffProfile.objects.create(user=self.user, park=self.ikeja)
+        results = self.autocomplete("trip")["results"]
+        self.assertEqual([result["id"] for result in results], [str(self.sooner.pk), str(self.later.pk)])
+        # Searching still reaches every trip
+        results = self.autocomplete("trip", self.past.name)["results"]
+        self.assertEqual([result["id"] for result in results], [str(self.past.pk)])
+
+    @mock.patch.object(AutocompleteJsonView, "paginate_by", 2)
+    def test_pages_are_not_counted(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.autocomplete("trip")
+        self.assertTrue(data["pagination"]["more"])
+        self.assertFalse(any("COUNT(" in query["sql"] for query in queries.captured_queries))
+
+    def test_add_bill_form_does_not_list_every_choice(self):
+        response = self.client.get(reverse("admin:luggages_luggagebill_add"))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, self.past.name)
+
+
+@mock.patch.object(TripInlineBus, "max_shown", 3)
+class RecentTripInlineTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        start = timezone.now()
+        self.trips = [
+            Trip.objects.create(
+                bus=self.bus,
+                departure=ikeja,
+                destination=nsukka,
+                date_of_journey=start + datetime.timedelta(days=day),
+            )
+            for day in range(5)
+        ]
+        self.url = reverse("admin:luggages_bus_change", args=[self.bus.pk])
+
+    def test_only_latest_trips_are_shown(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        shown = [form.instance for form in response.context["inline_admin_formsets"][0].formset.forms]
+        self.assertEqual(shown, self.trips[:1:-1])
+        self.assertContains(response, f"?bus__id__exact={self.bus.pk}")
+
+        response = self.client.get(reverse("admin:luggages_trip_changelist") + f"?bus__id__exact={self.bus.pk}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_bus_can_be_saved(self):
+        response = self.client.get(self.url)
+        formset = response.context["inline_admin_formsets"][0].formset
+        data = {"plate_number": "XYZ-456-UVW", "driver_name": "John Driver"}
+        data.update({f"{formset.prefix}-{key}": value for key, value in formset.management_form.initial.items()})
+        for index, form in enumerate(formset.forms):
+            data[f"{formset.prefix}-{index}-id"] = form.instance.pk
+            data[f"{formset.prefix}-{index}-bus"] = self.bus.pk
+        response = self.client.post(self.url, data)
+        self.assertEqual(response.status_code, 302)
+        self.bus.refresh_from_db()
+        self.assertEqual(self.bus.plate_number, "XYZ-456-UVW")
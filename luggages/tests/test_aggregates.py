@@ -0,0 +1,123 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..aggregates import partition_days, rebuild_aggregates
+from ..archive import archive_trips
+from ..models import (
+    BagType,
+    BillTotal,
+    Bus,
+    BusUtilisation,
+    Customer,
+    DailyRevenue,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    TripRevenue,
+    Weight,
+)
+
+
+class RebuildAggregatesTestCase(TestCase):
+    def setUp(self):
+        self.user = user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian", max_luggage_weight=100)
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.light = Weight.objects.create(name="Light", min_weight=5, price="500.50")
+        heavy = Weight.objects.create(name="Heavy", min_weight=20, price=2000)
+        box = BagType.objects.create(name="Box", size="S")
+        now = timezone.now()
+        self.trips = []
+        for day in (200, 3, 2):
+            trip = Trip.objects.create(
+                bus=self.bus,
+                departure=self.ikeja,
+                destination=nsukka,
+                date_of_journey=now - datetime.timedelta(days=day),
+            )
+            bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=user)
+            Luggage.objects.create(luggagebill=bill, weight=self.light, bag_type=box, quantity=2)
+            Luggage.objects.create(luggagebill=bill, weight=heavy, bag_type=box, quantity=1)
+            LuggageBill.objects.create(customer=customer, trip=trip, added_by=user)
+            self.trips.append(trip)
+        archive_trips(now - datetime.timedelta(days=100))
+
+    def test_partitions_cover_every_day_once(self):
+        start = datetime.date(2024, 1, 1)
+        partitions = partition_days(start, datetime.date(2024, 1, 10), 4)
+        self.assertEqual(
+            partitions,
+            [
+                (start, datetime.date(2024, 1, 4)),
+                (datetime.date(2024, 1, 5), datetime.date(2024, 1, 8)),
+                (datetime.date(2024, 1, 9), datetime.date(2024, 1, 10)),
+            ],
+        )
+
+    def test_totals_match_the_models(self):
+        self.assertEqual(rebuild_aggregates(days=1), (6, 3))
+        for bill in LuggageBill.objects.all():
+            total = BillTotal.objects.get(bill=bill.pk)
+            self.assertEqual(total.amount, bill.total_amount())
+            self.assertEqual(total.kilograms, 30 if bill.items.exists() else 0)
+            self.assertFalse(total.archived)
+        self.assertTrue(BillTotal.objects.get(trip=self.trips[0].pk, items=2).archived)
+
+        revenue = TripRevenue.objects.get(trip=self.trips[1].pk)
+        self.assertEqual((revenue.bills, revenue.bags, revenue.revenue), (2, 3, Decimal("3001.00")))
+        self.assertEqual(DailyRevenue.objects.get(day=revenue.day, park=self.ikeja).revenue, Decimal("3001.00"))
+        self.assertEqual(DailyRevenue.objects.count(), 3)
+        utilisation = BusUtilisation.objects.get(bus=self.bus, day=revenue.day)
+        self.assertEqual((utilisation.kilograms, utilisation.capacity, utilisation.load_factor), (30, 100, 0.3))
+
+    def test_rebuild_keeps_captured_prices_and_removes_stale_rows(self):
+        rebuild_aggregates()
+        self.light.price = 1000
+        self.light.save()
+        self.trips[2].delete()
+
+        rebuild_aggregates()
+        self.assertEqual(TripRevenue.objects.get(trip=self.trips[1].pk).revenue, Decimal("3001.00"))
+        self.assertFalse(TripRevenue.objects.filter(trip=self.trips[2].pk).exists())
+        self.assertEqual(BillTotal.objects.count(), 4)
+
+    def test_command_reports_progress(self):
+        output = io.StringIO()
+        call_command("rebuild_aggregates", "--workers", "1", "--days", "30", stdout=output)
+        self.assertIn("Rebuilt the aggregates of 6 bills and 3 trips with 1 workers", output.getvalue())
+        self.assertIn("bills/s overall", output.getvalue())
+
+    def test_revenue_report_reads_the_aggregates(self):
+        rebuild_aggregates()
+        self.client.force_login(self.user)
+        response = self.client.get(
+            reverse("admin_revenue_report"),
+            {"start": (timezone.localdate() - datetime.timedelta(days=3)).isoformat(), "park": self.ikeja.pk},
+        )
+        self.assertEqual(response.status_code, 200)
+        report = response.context["report"]
+        self.assertEqual([row.trips for row in report["days"]], [1, 1])
+        self.assertEqual(report["totals"]["revenue"], Decimal("6002.00"))
+        self.assertEqual([row.load_factor for row in report["buses"]], [0.3, 0.3])
+        self.assertEqual([row.trip for row in report["trips"]], [self.trips[2].pk, self.trips[1].pk])
+        self.assertEqual([row.amount for row in report["bills"]], [Decimal("3001.00"), Decimal("3001.00"), 0, 0])
+        self.assertContains(response, reverse("admin_trip_luggages", args=[self.trips[2].pk]))
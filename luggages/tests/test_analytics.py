@@ -0,0 +1,109 @@
+import datetime
+import io
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F, Sum
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..analytics import Grouping, ItemFrame, load_items, luggage_report
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+
+
+class GroupingTestCase(TestCase):
+    def test_sums_and_percentiles_match_numpy(self):
+        rng = np.random.default_rng(1)
+        first = rng.integers(0, 5, 1000)
+        second = rng.integers(0, 3, 1000)
+        values = rng.integers(1, 10000, 1000)
+        grouping = Grouping([first, second])
+        self.assertEqual(len(grouping), 15)
+        for index in range(len(grouping)):
+            mask = (first == grouping.keys[0][index]) & (second == grouping.keys[1][index])
+            self.assertEqual(grouping.count()[index], mask.sum())
+            self.assertEqual(grouping.sum(values)[index], values[mask].sum())
+            self.assertAlmostEqual(grouping.percentile(values, 90)[index], np.percentile(values[mask], 90))
+
+    def test_buckets_start_on_monday_and_the_first_of_the_month(self):
+        days = np.array([(datetime.date(2024, 10, 19) - datetime.date(1970, 1, 1)).days])
+        frame = ItemFrame({"journey": days})
+        self.assertEqual(frame.bucket("journey", "week")[0].item(), datetime.date(2024, 10, 14))
+        self.assertEqual(frame.bucket("journey", "month")[0].item(), datetime.date(2024, 10, 1))
+        self.assertEqual(frame.bucket("journey", "day")[0].item(), datetime.date(2024, 10, 19))
+
+
+class LuggageReportTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        light = Weight.objects.create(name="Light", min_weight=5, price="500.50")
+        heavy = Weight.objects.create(name="Heavy", min_weight=20, price=2000)
+        box = BagType.objects.create(name="Box", size="S")
+        trunk = BagType.objects.create(name="Trunk", size="L")
+        self.today = timezone.localdate()
+        for day, departure, destination in [(0, ikeja, nsukka), (1, nsukka, ikeja), (40, ikeja, nsukka)]:
+            trip = Trip.objects.create(
+                bus=bus,
+                departure=departure,
+                destination=destination,
+                date_of_journey=timezone.now() - datetime.timedelta(days=day),
+            )
+            bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user)
+            Luggage.objects.create(luggagebill=bill, weight=light, bag_type=box, quantity=2)
+            Luggage.objects.create(luggagebill=bill, weight=heavy, bag_type=trunk, quantity=1)
+
+    def test_totals_match_the_database(self):
+        frame = load_items(["amount", "kilograms"])
+        expected = Luggage.objects.aggregate(amount=Sum(F("quantity") * F("weight__price")))["amount"]
+        self.assertEqual(frame["amount"].sum(), expected * 100)
+        self.assertEqual(frame["kilograms"].sum(), 3 * (2 * 5 + 20))
+
+    def test_report_groups_by_size_and_route(self):
+        report = luggage_report(["size", "route"], None, self.today - datetime.timedelta(days=7), self.today)
+        self.assertEqual(
+            [(row["size"], row["route"], row["bags"], row["revenue"]) for row in report],
+            [
+                ("Small", "Ikeja to Nsukka", 2, 1001),
+                ("Small", "Nsukka to Ikeja", 2, 1001),
+                ("Large", "Ikeja to Nsukka", 1, 2000),
+                ("Large", "Nsukka to Ikeja", 1, 2000),
+            ],
+        )
+        monthly = luggage_report(["size"], "month")
+        self.assertEqual(sum(row["items"] for row in monthly), 6)
+
+    def test_admin_page_and_command(self):
+        response = self.client.get(reverse("admin_luggage_analytics"), {"group_by": ["bag_type"], "period": "week"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Trunk (L)")
+
+        out = io.StringIO()
+        call_command("luggagereport", group_by=["size"], stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], "size,items,bags,kilograms,revenue,p50,p90")
+        self.assertIn("Large,3,3,60,6000.00,2000.00,2000.00", lines)
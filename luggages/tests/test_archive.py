@@ -0,0 +1,131 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_trips, restore_trips
+from ..models import (
+    ArchivedBagTag,
+    ArchivedLuggage,
+    ArchivedLuggageBill,
+    ArchivedTrip,
+    BagTag,
+    BagType,
+    BillSearchTrigram,
+    Bus,
+    Customer,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+from ..rollups import rebuild_daily_counts
+from ..search import search_bills
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        with self.captureOnCommitCallbacks(execute=True):
+            now = timezone.now()
+            self.old = Trip.objects.create(
+                bus=bus, departure=ikeja, destination=nsukka, date_of_journey=now - datetime.timedelta(days=200)
+            )
+            self.recent = Trip.objects.create(
+                bus=bus, departure=nsukka, destination=ikeja, date_of_journey=now - datetime.timedelta(days=2)
+            )
+            customer = Customer.objects.create(
+                fullname="Chinedu Okafor",
+                email="customer@example.com",
+                address="1 Main St",
+                next_of_kin="Next of Kin",
+                next_of_kin_phonenumber="08031234567",
+            )
+            weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+            bag_type = BagType.objects.create(name="Box", size="S")
+            self.bills = {}
+            for trip in (self.old, self.recent):
+                bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user)
+                Luggage.objects.create(luggagebill=bill, weight=weight, bag_type=bag_type, quantity=2)
+                self.bills[trip.pk] = bill
+        self.bill_created = self.bills[self.old.pk].created
+
+    def assertDailyCountsExact(self):
+        maintained = set(DailyCount.objects.exclude(count=0).values_list("kind", "day", "count"))
+        for kind in DailyCount.Kind.values:
+            rebuild_daily_counts(kind)
+        self.assertEqual(maintained, set(DailyCount.objects.exclude(count=0).values_list("kind", "day", "count")))
+
+    def test_old_trips_move_with_their_bills_items_and_tags(self):
+        tags = set(BagTag.objects.filter(luggage__luggagebill__trip=self.old).values_list("code", flat=True))
+        self.assertEqual(archive_trips(timezone.now() - datetime.timedelta(days=90)), 1)
+
+        self.assertEqual(list(Trip.objects.all()), [self.recent])
+        self.assertEqual(LuggageBill.objects.count(), 1)
+        self.assertEqual(Luggage.objects.count(), 1)
+        self.assertFalse(BillSearchTrigram.objects.filter(bill_id=self.bills[self.old.pk].pk).exists())
+
+        archived = ArchivedTrip.objects.get()
+        self.assertEqual((archived.pk, archived.name), (self.old.pk, self.old.name))
+        bill = ArchivedLuggageBill.objects.get()
+        self.assertEqual(bill.receipt_number, self.bills[self.old.pk].receipt_number)
+        self.assertEqual(bill.created, self.bill_created)
+        self.assertEqual(bill.total_amount(), 1000)
+        self.assertEqual(ArchivedLuggage.objects.get().quantity, 2)
+        self.assertEqual(set(ArchivedBagTag.objects.values_list("code", flat=True)), tags)
+
+    def test_daily_counts_follow_the_live_tables(self):
+        archive_trips(timezone.now() - datetime.timedelta(days=90))
+        self.assertFalse(
+            DailyCount.objects.filter(
+                kind=DailyCount.Kind.TRIP_JOURNEY, day=timezone.localdate(self.old.date_of_journey)
+            )
+            .exclude(count=0)
+            .exists()
+        )
+        self.assertDailyCountsExact()
+        restore_trips([self.old.pk])
+        self.assertDailyCountsExact()
+
+    def test_restored_trip_is_live_again(self):
+        codes = set(BagTag.objects.values_list("code", flat=True))
+        call_command("archivetrips", days=90, verbosity=0)
+        call_command("archivetrips", restore=[self.old.pk], verbosity=0)
+
+        self.assertFalse(ArchivedTrip.objects.exists())
+        self.assertFalse(ArchivedLuggageBill.objects.exists())
+        trip = Trip.objects.get(pk=self.old.pk)
+        self.assertEqual(trip.name, self.old.name)
+        bill = trip.luggagebills.get()
+        self.assertEqual(bill.created, self.bill_created)
+        self.assertEqual(bill.items.get().quantity, 2)
+        self.assertEqual(set(BagTag.objects.values_list("code", flat=True)), codes)
+        self.assertEqual(list(search_bills(LuggageBill.objects.all(), trip.name)), [bill])
+
+    def test_archive_admin_is_read_only(self):
+        archive_trips(timezone.now() - datetime.timedelta(days=90))
+        bill = ArchivedLuggageBill.objects.get()
+        response = self.client.get(reverse("admin:luggages_archivedluggagebill_changelist"))
+        self.assertContains(response, bill.receipt_number)
+        response = self.client.get(reverse("admin:luggages_archivedluggagebill_change", args=[bill.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'name="_save"')
+
+        response = self.client.post(
+            reverse("admin:luggages_archivedtrip_changelist"),
+            {"action": "restore_archived_trips", "_selected_action": [self.old.pk]},
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Trip.objects.filter(pk=self.old.pk).exists())
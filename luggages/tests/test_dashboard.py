@@ -0,0 +1,114 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import dashboard
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian", max_luggage_weight=40)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip = Trip.objects.create(
+                bus=bus,
+                departure=ikeja,
+                destination=nsukka,
+                date_of_journey=timezone.now() + datetime.timedelta(hours=2),
+            )
+            Trip.objects.create(
+                bus=bus,
+                departure=nsukka,
+                destination=ikeja,
+                date_of_journey=timezone.now() + datetime.timedelta(hours=9),
+            )
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.bag_type = BagType.objects.create(name="Box", size="S")
+        self.add_bill(2)
+
+    def add_bill(self, quantity):
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = LuggageBill.objects.create(customer=self.customer, trip=self.trip, added_by=self.user)
+            Luggage.objects.create(luggagebill=bill, weight=self.weight, bag_type=self.bag_type, quantity=quantity)
+
+    def test_index_shows_todays_figures(self):
+        response = self.client.get(reverse("admin:index"))
+        self.assertEqual(response.status_code, 200)
+        figures = response.context["dashboard"]
+        self.assertEqual((figures["bills"], figures["bags"], figures["revenue"]), (1, 2, Decimal("1000")))
+        self.assertEqual([trip["id"] for trip in figures["departures"]], [self.trip.pk])
+        self.assertEqual(figures["departures"][0]["load"], 0.25)
+        self.assertEqual(figures["parks"], [{"park": "Ikeja", "bills": 1, "revenue": Decimal("1000")}])
+        self.assertContains(response, "Ikeja to Nsukka")
+
+    def test_figures_are_shared_until_a_write(self):
+        self.client.get(reverse("admin:index"))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("admin:index"))
+        self.assertFalse(any("luggages_luggage" in query["sql"] for query in queries.captured_queries))
+
+        self.add_bill(3)
+        self.assertEqual(dashboard.dashboard()["bags"], 2)
+        with mock.patch.object(dashboard, "MIN_REFRESH_INTERVAL", 0):
+            self.assertEqual(dashboard.dashboard()["bags"], 5)
+
+    def test_a_transaction_marks_the_dashboard_stale_once_it_commits(self):
+        cache.delete(dashboard.STALE_KEY)
+        with mock.patch.object(dashboard.cache, "add", wraps=cache.add) as add:
+            with self.captureOnCommitCallbacks(execute=True):
+                bill = LuggageBill.objects.create(customer=self.customer, trip=self.trip, added_by=self.user)
+                for quantity in (1, 2):
+                    Luggage.objects.create(
+                        luggagebill=bill, weight=self.weight, bag_type=self.bag_type, quantity=quantity
+                    )
+                self.assertIsNone(cache.get(dashboard.STALE_KEY))
+            self.assertTrue(cache.get(dashboard.STALE_KEY))
+            dashboard.mark_dashboard_stale()
+        add.assert_called_once()
+
+    @mock.patch.object(dashboard, "MIN_REFRESH_INTERVAL", 0)
+    def test_only_one_request_refreshes(self):
+        dashboard.dashboard()
+        self.add_bill(3)
+        cache.add(dashboard.LOCK_KEY, True)
+        self.assertEqual(dashboard.dashboard()["bags"], 2)
+        cache.delete(dashboard.LOCK_KEY)
+        self.assertEqual(dashboard.dashboard()["bags"], 5)
+
+    def test_staff_without_bill_access_see_no_figures(self):
+        staff = User.objects.create_user("clerk", "clerk@example.com", "clerk", is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("admin:index"))
+        self.assertIsNone(response.context["dashboard"])
@@ -0,0 +1,86 @@
+import datetime
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from ..fuzzy import WATERMARK_OVERLAP, customer_index, soundex
+from ..models import Customer
+
+
+class CustomerIndexTestCase(TestCase):
+    def setUp(self):
+        customer_index.clear()
+        self.customers = {
+            name: Customer.objects.create(
+                fullname=name,
+                email="customer@example.com",
+                address="1 Main St",
+                next_of_kin="Next of Kin",
+                next_of_kin_phonenumber="08031234567",
+            )
+            for name in ["Oluwaseun Adeyemi", "Chukwuemeka Obi", "Chukwuemeka Obih", "Ngozi Okafor"]
+        }
+
+    def test_soundex(self):
+        self.assertEqual(soundex("robert"), "R163")
+        self.assertEqual(soundex("rupert"), "R163")
+        self.assertEqual(soundex("ashcraft"), "A261")
+
+    def test_misspelt_name_ranks_first(self):
+        matches = customer_index.search("oluwasen adeyemmi")
+        self.assertEqual(matches[0][0], self.customers["Oluwaseun Adeyemi"].pk)
+        self.assertEqual(customer_index.search("qqqq"), [])
+
+    def test_index_follows_renames(self):
+        customer_index.search("ngozi")
+        customer = self.customers["Ngozi Okafor"]
+        customer.fullname = "Amaka Okafor"
+        customer.save()
+        self.assertEqual(customer_index.search("amaka okafor")[0][0], customer.pk)
+        self.assertNotIn(customer.pk, [pk for pk, _ in customer_index.search("ngozi", min_score=0.5)])
+
+    def test_index_reads_rows_committed_after_a_later_refresh(self):
+        customer_index.search("ngozi")
+        # Saved before the newest customer indexed, but committed after the index refreshed
+        customer = self.customers["Ngozi Okafor"]
+        Customer.objects.filter(pk=customer.pk).update(
+            fullname="Amaka Okafor", updated=customer_index.last_updated - WATERMARK_OVERLAP / 2
+        )
+        self.assertEqual(customer_index.search("amaka okafor")[0][0], customer.pk)
+
+        Customer.objects.filter(pk=customer.pk).update(
+            fullname="Ngozi Okafor", updated=customer_index.last_updated - WATERMARK_OVERLAP - datetime.timedelta(1)
+        )
+        self.assertEqual(customer_index.search("amaka okafor")[0][0], customer.pk)
+
+    def test_duplicate_candidates(self):
+        pairs = [(first, second) for first, second, _ in customer_index.duplicate_candidates()]
+        self.assertEqual(pairs, [(self.customers["Chukwuemeka Obi"].pk, self.customers["Chukwuemeka Obih"].pk)])
+
+    def test_admin_autocomplete_is_ranked(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "chukwemeka obih",
+                "app_label": "luggages",
+                "model_name": "luggagebill",
+                "field_name": "customer",
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        results = [result["text"] for result in response.json()["results"]]
+        self.assertEqual(results[:2], ["Chukwuemeka Obih", "Chukwuemeka Obi"])
+
+        response = self.client.get(reverse("admin_customer_duplicates"))
+        self.assertContains(response, "Not searched yet")
+        out = io.StringIO()
+        call_command("findduplicatecustomers", stdout=out)
+        self.assertIn("Found 1 possible duplicate pairs", out.getvalue())
+        response = self.client.get(reverse("admin_customer_duplicates"), {"score": "0.9"})
+        self.assertContains(response, "Chukwuemeka Obih")
+        self.assertContains(response, "Page 1 of 1 (1 pairs)")
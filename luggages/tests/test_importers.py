@@ -0,0 +1,182 @@
+import datetime
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    RouteWeek,
+    State,
+    Trip,
+    Weight,
+)
+
+
+class ImportDataCommandTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+
+    def write_file(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write(content)
+        return path
+
+    def import_file(self, kind, path):
+        out = StringIO()
+        call_command("importdata", kind, path, stdout=out)
+        return out.getvalue()
+
+    def read_rejects(self, path):
+        with open(f"{path}.rejects.jsonl", encoding="utf-8") as handle:
+            return [json.loads(line) for line in handle]
+
+    def test_import_customers_rejects_invalid_phone_numbers(self):
+        path = self.write_file(
+            "customers.csv",
+            "fullname,email,address,next_of_kin,next_of_kin_phonenumber\n"
+            "John Doe,john@example.com,1 Main St,Jane Doe,08031234567\n"
+            "Bad Phone,bad@example.com,2 Main St,Jane Doe,12345678901\n",
+        )
+        self.import_file("customers", path)
+        self.assertEqual(list(Customer.objects.values_list("fullname", flat=True)), ["John Doe"])
+        rejects = self.read_rejects(path)
+        self.assertEqual(len(rejects), 1)
+        self.assertEqual(rejects[0]["line"], 3)
+        self.assertIn("next_of_kin_phonenumber", rejects[0]["errors"])
+
+    def test_import_customers_upserts_on_fullname(self):
+        Customer.objects.create(
+            fullname="John Doe",
+            email="old@example.com",
+            address="1 Main St",
+            next_of_kin="Jane Doe",
+            next_of_kin_phonenumber="08031234567",
+        )
+        path = self.write_file(
+            "customers.jsonl",
+            json.dumps(
+                {
+                    "fullname": "John Doe",
+                    "email": "new@example.com",
+                    "address": "1 Main St",
+                    "next_of_kin": "Jane Doe",
+                    "next_of_kin_phonenumber": "08031234567",
+                }
+            )
+            + '\n{"fullname": "Broken\n'
+            + '["Not", "an object"]\n',
+        )
+        self.import_file("customers", path)
+        self.assertEqual(Customer.objects.get().email, "new@example.com")
+        rejects = self.read_rejects(path)
+        self.assertEqual([reject["line"] for reject in rejects], [2, 3])
+        self.assertEqual(rejects[0]["row"], '{"fullname": "Broken')
+        self.assertEqual(rejects[1]["errors"], {"__all__": ["Expected a JSON object."]})
+
+    def test_import_trips(self):
+        path = self.write_file(
+            "trips.csv",
+            "bus,driver_name,departure,destination,date_of_journey\n"
+            "ABC-123-DEF,,Ikeja,Nsukka,2024-05-01T08:00:00+00:00\n"
+            "XYZ-456-UVW,John Driver,Nsukka,Ikeja,2024-05-02T08:00:00+00:00\n"
+            "ABC-123-DEF,,Ikeja,Ikeja,2024-05-03T08:00:00+00:00\n"
+            "123-ABC-456,,Ikeja,Nsukka,2024-05-04T08:00:00+00:00\n",
+        )
+        self.import_file("trips", path)
+        self.assertEqual(
+            sorted(Trip.objects.values_list("name", flat=True)),
+            ["ENU-to-LAG-02-05-2024", "LAG-to-ENU-01-05-2024"],
+        )
+        self.assertTrue(Bus.objects.filter(plate_number="XYZ-456-UVW").exists())
+        self.assertEqual(
+            sorted(DailyCount.objects.filter(kind=DailyCount.Kind.TRIP_JOURNEY).values_list("day", "count")),
+            [(datetime.date(2024, 5, 1), 1), (datetime.date(2024, 5, 2), 1)],
+        )
+        self.assertEqual(sorted(RouteWeek.objects.values_list("week", "trips")), [(datetime.date(2024, 4, 29), 1)] * 2)
+        rejects = self.read_rejects(path)
+        self.assertEqual([reject["line"] for reject in rejects], [4, 5])
+        self.assertIn("__all__", rejects[0]["errors"])
+        self.assertIn("bus", rejects[1]["errors"])
+
+    def test_import_trips_reports_repeated_rows_and_double_bookings(self):
+        path = self.write_file(
+            "trips.csv",
+            "bus,departure,destination,date_of_journey,duration\n"
+            "ABC-123-DEF,Ikeja,Nsukka,2024-05-01T08:00:00+00:00,06:00:00\n"
+            "ABC-123-DEF,Ikeja,Nsukka,2024-05-01T09:00:00+00:00,06:00:00\n"
+            "ABC-123-DEF,Nsukka,Ikeja,2024-05-01T12:00:00+00:00,06:00:00\n"
+            "ABC-123-DEF,Nsukka,Ikeja,2024-05-02T12:00:00+00:00,72:00:00\n",
+        )
+        output = self.import_file("trips", path)
+        trip = Trip.objects.get()
+        self.assertEqual((trip.date_of_journey.hour, trip.duration), (9, datetime.timedelta(hours=6)))
+        self.assertIn("Rejected 3 rows", output)
+        rejects = {reject["line"]: reject["errors"] for reject in self.read_rejects(path)}
+        self.assertEqual(rejects[2], {"__all__": ["Replaced by line 3, which repeats its name."]})
+        self.assertEqual(
+            rejects[4], {"bus": ["This bus is already booked for trip LAG-to-ENU-01-05-2024 at that time."]}
+        )
+        self.assertIn("duration", rejects[5])
+
+        # Files without durations leave them alone
+        self.import_file(
+            "trips",
+            self.write_file(
+                "more.csv", "bus,departure,destination,date_of_journey\nABC-123-DEF,Ikeja,Nsukka,2024-05-01T10:00:00\n"
+            ),
+        )
+        trip.refresh_from_db()
+        self.assertEqual((trip.date_of_journey.hour, trip.duration), (10, datetime.timedelta(hours=6)))
+
+    def test_import_bills_with_items(self):
+        call_command(
+            "importdata",
+            "trips",
+            self.write_file(
+                "trips.csv",
+                "bus,departure,destination,date_of_journey\nABC-123-DEF,Ikeja,Nsukka,2024-05-01T08:00:00\n",
+            ),
+            stdout=StringIO(),
+        )
+        User.objects.create(username="clerk")
+        Customer.objects.create(
+            fullname="John Doe",
+            email="john@example.com",
+            address="1 Main St",
+            next_of_kin="Jane Doe",
+            next_of_kin_phonenumber="08031234567",
+        )
+        Weight.objects.create(name="Heavy", min_weight=50, price=100)
+        BagType.objects.create(name="Backpack", size="M")
+        items = [{"weight": "Heavy", "bag_type": "Backpack", "size": "M", "quantity": 2}]
+        path = self.write_file(
+            "bills.jsonl",
+            json.dumps({"customer": "John Doe", "trip": "LAG-to-ENU-01-05-2024", "added_by": "clerk", "items": items})
+            + "\n"
+            + json.dumps({"customer": "Nobody", "trip": "LAG-to-ENU-01-05-2024", "added_by": "clerk", "items": items})
+            + "\n",
+        )
+        self.import_file("bills", path)
+        bill = LuggageBill.objects.get()
+        self.assertEqual(bill.customer.fullname, "John Doe")
+        self.assertEqual(Luggage.objects.get().quantity, 2)
+        self.assertEqual(bill.total_amount(), 200)
+        self.assertIn("customer", self.read_rejects(path)[0]["errors"])
@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+
+
+class TripLuggageTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.trip = Trip.objects.create(bus=bus, departure=ikeja, destination=nsukka, date_of_journey=timezone.now())
+        weight = Weight.objects.create(name="Heavy", min_weight=20, price="1500.00")
+        bag_type = BagType.objects.create(name="Suitcase", size=BagType.SizeOption.LARGE)
+        for index, quantities in enumerate([[2, 1], [1], []]):
+            customer = Customer.objects.create(
+                fullname=f"Customer {index}",
+                email=f"customer{index}@example.com",
+                address="1 Main St",
+                next_of_kin="Next of Kin",
+                next_of_kin_phonenumber="08031234567",
+            )
+            bill = LuggageBill.objects.create(customer=customer, trip=self.trip, added_by=self.user)
+            for quantity in quantities:
+                Luggage.objects.create(luggagebill=bill, weight=weight, bag_type=bag_type, quantity=quantity)
+
+
+class ManifestTestCase(TripLuggageTestCase):
+    def manifest(self, output_format):
+        self.client.force_login(self.user)
+        url = reverse("admin_trip_manifest", args=[self.trip.pk])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"format": output_format})
+            content = b"".join(response.streaming_content).decode()
+        return content, [query for query in queries.captured_queries if "luggages_" in query["sql"]]
+
+    def test_csv_lists_every_bag_and_empty_bills(self):
+        content, queries = self.manifest("csv")
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0][:2], ["Bill", "Customer"])
+        self.assertEqual([row[1] for row in rows[1:]], ["Customer 0", "Customer 0", "Customer 1", "Customer 2"])
+        self.assertEqual(rows[1][7:], ["2", "1500.00", "3000.00"])
+        self.assertEqual(rows[4][3:], ["", "", "", "", "", "", ""])
+        self.assertEqual(len(queries), 2)
+
+    def test_jsonl_and_html(self):
+        content, _ = self.manifest("jsonl")
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows[0]["size"], "Large")
+        self.assertEqual(len(rows), 4)
+
+        content, queries = self.manifest("html")
+        self.assertIn("3 bills, 4 bags, 80kg", content)
+        self.assertIn("&#8358;6,000.00", content)
+        self.assertEqual(len(queries), 2)
+
+    def test_command_writes_manifest(self):
+        out = io.StringIO()
+        call_command("manifest", self.trip.name, "--format", "jsonl", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 4)
+
+
+class BatchReceiptTestCase(TripLuggageTestCase):
+    def receipts(self, request):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = request()
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(response.status_code, 200)
+        return content, [query for query in queries.captured_queries if "luggages_" in query["sql"]]
+
+    def test_admin_action_prints_selected_bills(self):
+        bills = list(LuggageBill.objects.order_by("pk").values_list("pk", flat=True))
+        content, queries = self.receipts(
+            lambda: self.client.post(
+                reverse("admin:luggages_luggagebill_changelist"),
+                {"action": "print_receipts", "_selected_action": bills[:2]},
+            )
+        )
+        self.assertEqual(content.count('class="receipt"'), 2)
+        self.assertIn("&#8358;4,500.00", content)
+        self.assertNotIn("Customer 2", content)
+        # Changelist lookups plus one bill query and one item query per batch
+        self.assertLessEqual(len(queries), 6)
+
+    def test_trip_receipts(self):
+        content, queries = self.receipts(lambda: self.client.get(reverse("admin_trip_receipts", args=[self.trip.pk])))
+        self.assertEqual(content.count('class="receipt"'), 3)
+        self.assertIn("3 receipts", content)
+        self.assertEqual(len(queries), 4)
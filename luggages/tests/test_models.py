@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
@@ -396,6 +398,22 @@ class LuggageModelTestCase(TestCase):
         expected_amount = self.weight.price * self.luggage.quantity
         self.assertEqual(self.luggage.amount(), expected_amount)
 
+    def test_price_is_captured_when_booked(self):
+        self.weight.price = 99
+        self.weight.save()
+        luggage = Luggage.objects.get(pk=self.luggage.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(luggage.amount(), Decimal("21.00"))
+        luggage.quantity = 3
+        luggage.save()
+        self.assertEqual(Luggage.objects.get(pk=luggage.pk).unit_price, Decimal("10.50"))
+
+        light = Weight.objects.create(name="Light", min_weight=5, price=4)
+        luggage.weight = light
+        luggage.save()
+        luggage.refresh_from_db()
+        self.assertEqual((luggage.unit_price, luggage.unit_weight, luggage.amount()), (4, 5, 12))
+
     def test_quantity_positive_integer(self):
         # Valid quantity
         self.luggage.quantity = 2
@@ -0,0 +1,144 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import pricing
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    PricingRule,
+    State,
+    Trip,
+    Weight,
+)
+from ..pricing import PricingEngine, bill_rows, compile_pricing, pricing_engine
+
+
+class PricingTestCase(TestCase):
+    def setUp(self):
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.light = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.heavy = Weight.objects.create(name="Heavy", min_weight=20, price=2000)
+        self.today = timezone.localdate()
+        PricingRule.objects.create(
+            name="Lagos to Enugu", departure=self.ikeja, destination=self.nsukka, multiplier=Decimal("1.5")
+        )
+        PricingRule.objects.create(name="Large bags", size="L", surcharge=100)
+        PricingRule.objects.create(
+            name="Light bag promotion",
+            weight=self.light,
+            multiplier=Decimal("0.8"),
+            starts=self.today,
+            ends=self.today + datetime.timedelta(days=6),
+        )
+
+    def test_compiled_prices_combine_matching_rules(self):
+        table = compile_pricing()
+        route = (self.ikeja.pk, self.nsukka.pk)
+        yesterday = self.today - datetime.timedelta(days=1)
+        next_week = self.today + datetime.timedelta(days=7)
+        self.assertEqual(table.unit_price(*route, self.heavy.pk, "S", self.today), Decimal("3000.00"))
+        self.assertEqual(table.unit_price(*route, self.heavy.pk, "L", self.today), Decimal("3100.00"))
+        self.assertEqual(table.unit_price(*route, self.light.pk, "L", self.today), Decimal("700.00"))
+        self.assertEqual(table.unit_price(*route, self.light.pk, "L", yesterday), Decimal("850.00"))
+        self.assertEqual(table.unit_price(self.nsukka.pk, self.ikeja.pk, self.light.pk, "M", next_week), 500)
+
+        bills = [(*route, self.today, [(self.heavy.pk, "S", 2), (self.light.pk, "L", 1)]), (None, None, yesterday, [])]
+        with self.assertNumQueries(0):
+            self.assertEqual(table.price_bills(bills), [Decimal("6700.00"), 0])
+
+    def test_engine_recompiles_when_a_rule_changes(self):
+        table = pricing_engine.table()
+        with self.assertNumQueries(0):
+            self.assertIs(pricing_engine.table(), table)
+        PricingRule.objects.filter(name="Large bags").get().delete()
+        table = pricing_engine.table()
+        self.assertEqual(table.unit_price(None, None, self.heavy.pk, "L", self.today), Decimal("2000.00"))
+
+        # Another process notices the change through the database, within the check interval
+        other_process = PricingEngine()
+        self.assertEqual(other_process.table().unit_price(None, None, self.light.pk, "S", self.today), 400)
+        self.light.price = 600
+        self.light.save()
+        self.assertEqual(other_process.table().unit_price(None, None, self.light.pk, "S", self.today), 400)
+        with mock.patch.object(pricing, "VERSION_CHECK_INTERVAL", 0):
+            self.assertEqual(other_process.table().unit_price(None, None, self.light.pk, "S", self.today), 480)
+
+        with self.assertRaises(ValidationError):
+            PricingRule(name="Half a route", departure=self.ikeja).full_clean()
+
+    def test_items_are_priced_when_booked(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        trip = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=timezone.now()
+        )
+        bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=user)
+        trunk = BagType.objects.create(name="Trunk", size="L")
+        item = Luggage.objects.create(luggagebill=bill, weight=self.heavy, bag_type=trunk, quantity=2)
+        self.assertEqual((item.unit_price, item.unit_weight, bill.total_amount()), (3100, 20, 6200))
+        # Pricing more items of the bill reads neither the version nor the bag types again
+        with CaptureQueriesContext(connection) as queries:
+            Luggage.objects.create(luggagebill=bill, weight=self.light, bag_type=trunk, quantity=1)
+        self.assertFalse(any("luggages_weight" in query["sql"] for query in queries.captured_queries))
+        self.assertFalse(any("luggages_bagtype" in query["sql"] for query in queries.captured_queries))
+        Luggage.objects.filter(weight=self.light).delete()
+
+        rows = bill_rows(LuggageBill.objects.all())
+        self.assertEqual(rows, {bill.pk: (self.ikeja.pk, self.nsukka.pk, self.today, [(self.heavy.pk, "L", 2)])})
+        self.assertEqual(pricing_engine.table().price_bills(rows.values()), [Decimal("6200.00")])
+
+        # Changing the bag, the bill's trip or the trip's route prices the item again
+        box = BagType.objects.create(name="Box", size="S")
+        item = Luggage.objects.get()
+        item.bag_type = box
+        item.save()
+        self.assertEqual(item.unit_price, 3000)
+        item.bag_type = trunk
+        item.save()
+        self.assertEqual(Luggage.objects.get().unit_price, 3100)
+
+        return_trip = Trip.objects.create(
+            bus=bus,
+            departure=self.nsukka,
+            destination=self.ikeja,
+            date_of_journey=timezone.now() + datetime.timedelta(days=2),
+        )
+        bill = LuggageBill.objects.get()
+        bill.trip = return_trip
+        bill.save()
+        self.assertEqual(Luggage.objects.get().unit_price, 2100)
+
+        return_trip = Trip.objects.get(pk=return_trip.pk)
+        return_trip.departure, return_trip.destination = self.ikeja, self.nsukka
+        return_trip.save()
+        self.assertEqual(Luggage.objects.get().unit_price, 3100)
+
+    def test_benchmark_checks_the_compiled_prices(self):
+        output = io.StringIO()
+        call_command("benchmarkpricing", bills=200, stdout=output)
+        self.assertIn("Compiled 3 rules into 3 periods", output.getvalue())
+        self.assertIn("Priced", output.getvalue())
@@ -0,0 +1,206 @@
+import datetime
+import io
+import os
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import purge
+from ..fuzzy import customer_index
+from ..models import (
+    BagTag,
+    BagType,
+    Bus,
+    Customer,
+    CustomerSummary,
+    DailyCount,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    RouteWeek,
+    StaffDay,
+    State,
+    Trip,
+    Weight,
+)
+from ..rollups import rebuild_daily_counts
+from ..settlements import close_day
+from ..summaries import (
+    rebuild_route_weeks,
+    rebuild_staff_days,
+    refresh_customer_summaries,
+)
+
+
+class SoftDeleteTestCase(TestCase):
+    def setUp(self):
+        customer_index.clear()
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.other_bus = Bus.objects.create(plate_number="XYZ-456-UVW", driver_name="John Driver")
+        self.customer = Customer.objects.create(
+            fullname="Chinedu Okafor",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        bag_type = BagType.objects.create(name="Box", size="S")
+        with self.captureOnCommitCallbacks(execute=True):
+            start = timezone.now()
+            for day in range(4):
+                trip = Trip.objects.create(
+                    bus=self.bus if day < 3 else self.other_bus,
+                    departure=self.ikeja,
+                    destination=self.nsukka,
+                    date_of_journey=start + datetime.timedelta(days=day),
+                )
+                bill = LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+                Luggage.objects.create(luggagebill=bill, weight=weight, bag_type=bag_type, quantity=2)
+
+    def test_admin_delete_only_marks_the_bus(self):
+        url = reverse("admin:luggages_bus_delete", args=[self.bus.pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Trips: about 3")
+        self.assertContains(response, "Luggage Bills: about 3")
+
+        response = self.client.post(url, {"post": "yes"})
+        self.assertEqual(response.status_code, 302)
+        self.bus.refresh_from_db()
+        self.assertIsNotNone(self.bus.deleted)
+        self.assertEqual(Trip.objects.count(), 4)
+        self.assertEqual(list(Bus.objects.alive()), [self.other_bus])
+        response = self.client.get(reverse("admin:luggages_bus_changelist"))
+        self.assertEqual(list(response.context["cl"].result_list), [self.other_bus])
+
+    def test_purge_deletes_history_in_batches(self):
+        Bus.objects.filter(pk=self.bus.pk).soft_delete()
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("purgedeleted", batch_size=2, stdout=out)
+
+        self.assertFalse(Bus.objects.filter(pk=self.bus.pk).exists())
+        self.assertEqual(list(Trip.objects.values_list("bus", flat=True)), [self.other_bus.pk])
+        self.assertEqual(LuggageBill.objects.count(), 1)
+        self.assertEqual(BagTag.objects.count(), 2)
+        self.assertIn("deleted 2 Bag Tags (2 so far)", out.getvalue())
+        self.assertIn("deleted 2 Bag Tags (6 so far)", out.getvalue())
+
+        maintained = set(DailyCount.objects.exclude(count=0).values_list("kind", "day", "count"))
+        for kind in DailyCount.Kind.values:
+            rebuild_daily_counts(kind)
+        self.assertEqual(maintained, set(DailyCount.objects.exclude(count=0).values_list("kind", "day", "count")))
+
+    def test_purge_refreshes_the_summaries_once(self):
+        refresh_customer_summaries()
+        Bus.objects.filter(pk=self.bus.pk).soft_delete()
+        with mock.patch.object(purge, "refresh_staff_days", wraps=purge.refresh_staff_days) as refresh:
+            call_command("purgedeleted", batch_size=1, stdout=io.StringIO())
+        refresh.assert_called_once()
+
+        summaries = {
+            CustomerSummary: ["customer", "trips", "bills", "bags"],
+            RouteWeek: ["departure", "destination", "week", "trips", "bills"],
+            StaffDay: ["user", "day", "park", "bills", "bags"],
+        }
+        maintained = {model: set(model.objects.values_list(*fields)) for model, fields in summaries.items()}
+        self.assertEqual(maintained[CustomerSummary], {(self.customer.pk, 1, 1, 2)})
+        refresh_customer_summaries()
+        rebuild_route_weeks()
+        rebuild_staff_days()
+        for model, fields in summaries.items():
+            self.assertEqual(maintained[model], set(model.objects.values_list(*fields)))
+
+    def test_purge_keeps_settled_history(self):
+        bill = LuggageBill.objects.get(trip__bus=self.bus, trip__date_of_journey__date=timezone.localdate())
+        yesterday = timezone.localdate() - datetime.timedelta(days=1)
+        LuggageBill.objects.filter(pk=bill.pk).update(created=bill.created - datetime.timedelta(days=1))
+        close_day(self.ikeja, yesterday)
+        Bus.objects.soft_delete()
+        ParkLocation.objects.filter(pk=self.ikeja.pk).soft_delete()
+        out = io.StringIO()
+        call_command("purgedeleted", stdout=out)
+
+        self.assertEqual(list(Bus.objects.values_list("pk", flat=True)), [self.bus.pk])
+        self.assertTrue(ParkLocation.objects.filter(pk=self.ikeja.pk).exists())
+        self.assertEqual(Trip.objects.count(), 3)
+        self.assertEqual(LuggageBill.objects.filter(settlement__isnull=False).get(), bill)
+        self.assertIn("Kept Bus ABC-123-DEF is kept by 1 Luggage Bills.", out.getvalue())
+        self.assertIn("Settlements", out.getvalue())
+        self.assertIn("Kept 2 rows", out.getvalue())
+
+    def test_deleted_customer_leaves_search_and_imports(self):
+        self.assertEqual([pk for pk, _ in customer_index.search("Chinedu Okafor")], [self.customer.pk])
+        self.client.post(reverse("admin:luggages_customer_delete", args=[self.customer.pk]), {"post": "yes"})
+        self.assertEqual(customer_index.search("Chinedu Okafor"), [])
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {
+                "term": "Chinedu",
+                "app_label": "luggages",
+                "model_name": "luggagebill",
+                "field_name": "customer",
+            },
+        )
+        self.assertEqual(response.json()["results"], [])
+
+    def test_deleted_rows_are_restored(self):
+        Customer.objects.soft_delete()
+        Bus.objects.filter(pk=self.bus.pk).soft_delete()
+        response = self.client.post(
+            reverse("admin:luggages_customer_add"),
+            {
+                "fullname": "Chinedu Okafor",
+                "email": "new@example.com",
+                "address": "2 Main St",
+                "next_of_kin": "Next of Kin",
+                "next_of_kin_phonenumber": "08031234567",
+            },
+        )
+        self.assertContains(response, "A deleted Customer already has this Full Name")
+
+        url = reverse("admin:luggages_customer_changelist")
+        response = self.client.get(url, {"deleted": "yes"})
+        self.assertEqual(list(response.context["cl"].result_list), [self.customer])
+        self.client.post(f"{url}?deleted=yes", {"action": "restore_deleted", "_selected_action": [self.customer.pk]})
+        self.assertEqual(list(Customer.objects.alive()), [self.customer])
+
+        # Importing a deleted customer again restores it
+        Customer.objects.soft_delete()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "customers.csv")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(
+                    "fullname,email,address,next_of_kin,next_of_kin_phonenumber\n"
+                    "Chinedu Okafor,new@example.com,2 Main St,Next of Kin,08031234567\n"
+                )
+            call_command("importdata", "customers", path, stdout=io.StringIO())
+        self.assertEqual(Customer.objects.alive().get().email, "new@example.com")
+
+        # Importing the deleted bus with its driver restores it; without one the row is rejected
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trips.csv")
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write(
+                    "bus,driver_name,departure,destination,date_of_journey\n"
+                    "ABC-123-DEF,,Ikeja,Nsukka,2024-05-01T08:00:00\n"
+                )
+            call_command("importdata", "trips", path, stdout=io.StringIO())
+            self.assertFalse(Bus.objects.alive().filter(pk=self.bus.pk).exists())
+            with open(path, "a", encoding="utf-8") as handle:
+                handle.write("ABC-123-DEF,Seyi Pythonian,Ikeja,Nsukka,2024-05-02T08:00:00\n")
+            call_command("importdata", "trips", path, stdout=io.StringIO())
+        self.assertTrue(Bus.objects.alive().filter(pk=self.bus.pk).exists())
+        self.assertEqual(Trip.objects.filter(bus=self.bus).count(), 5)
@@ -0,0 +1,96 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Bus, Customer, DailyCount, LuggageBill, ParkLocation, State, Trip
+from ..rollups import rebuild_daily_counts
+
+
+class DailyCountTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.today = timezone.localdate()
+
+    def counts(self, kind):
+        return dict(DailyCount.objects.filter(kind=kind, count__gt=0).values_list("day", "count"))
+
+    def trip(self, days, departure=None, destination=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Trip.objects.create(
+                bus=self.bus,
+                departure=departure or self.ikeja,
+                destination=destination or self.nsukka,
+                date_of_journey=timezone.now() + datetime.timedelta(days=days),
+            )
+
+    def add_bill(self, trip):
+        with self.captureOnCommitCallbacks(execute=True):
+            return LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+
+    def test_signals_keep_counts_exact(self):
+        trip = self.trip(days=3)
+        # The counts of a transaction are summed and applied when it commits
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+            LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+            self.assertEqual(self.counts(DailyCount.Kind.BILL_CREATED), {})
+        self.assertEqual(self.counts(DailyCount.Kind.BILL_CREATED), {self.today: 2})
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.delete()
+        self.assertEqual(self.counts(DailyCount.Kind.BILL_CREATED), {self.today: 1})
+
+        trip.date_of_journey += datetime.timedelta(days=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            trip.save()
+        self.assertEqual(self.counts(DailyCount.Kind.TRIP_JOURNEY), {timezone.localdate(trip.date_of_journey): 1})
+
+    def test_rebuild_matches_source_table(self):
+        self.trip(days=1)
+        self.trip(days=1, departure=self.nsukka, destination=self.ikeja)
+        self.trip(days=5)
+        expected = self.counts(DailyCount.Kind.TRIP_JOURNEY)
+        DailyCount.objects.all().delete()
+        rebuild_daily_counts(DailyCount.Kind.TRIP_JOURNEY)
+        self.assertEqual(self.counts(DailyCount.Kind.TRIP_JOURNEY), expected)
+        self.assertEqual(sorted(expected.values()), [1, 2])
+
+        DailyCount.objects.all().delete()
+        call_command("rebuilddailycounts", "--kind", DailyCount.Kind.TRIP_JOURNEY, stdout=open("/dev/null", "w"))
+        self.assertEqual(self.counts(DailyCount.Kind.TRIP_JOURNEY), expected)
+
+    def test_changelist_hierarchy_and_facets_read_daily_counts(self):
+        self.add_bill(self.trip(days=1))
+        self.client.force_login(self.user)
+        url = reverse("admin:luggages_luggagebill_changelist")
+        response = self.client.get(url + "?_facets=1")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Today (1)")
+        self.assertContains(response, f"created__year={self.today.year}")
+
+        # Counts are read from DailyCount, which a bulk update bypasses until rebuilt.
+        cache.clear()
+        DailyCount.objects.filter(kind=DailyCount.Kind.BILL_CREATED).update(count=7)
+        response = self.client.get(url + "?_facets=1")
+        self.assertContains(response, "Today (7)")
+
+        # A search narrows the list beyond what the daily counts can express.
+        response = self.client.get(url + "?_facets=1&q=Customer")
+        self.assertContains(response, "Today (1)")
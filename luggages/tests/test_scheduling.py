@@ -0,0 +1,132 @@
+import datetime
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Bus, ParkLocation, RouteWeek, State, Trip, TripSchedule
+from ..scheduling import add_months, find_conflicts, generate_trips
+
+
+class GenerateTripsTestCase(TestCase):
+    def setUp(self):
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.other_bus = Bus.objects.create(plate_number="XYZ-456-UVW", driver_name="John Driver")
+        # 2024-05-06 is a Monday
+        self.monday = datetime.date(2024, 5, 6)
+
+    def schedule(self, bus, hour, weekday=TripSchedule.Weekday.MONDAY):
+        return TripSchedule.objects.create(
+            bus=bus,
+            departure=self.ikeja,
+            destination=self.nsukka,
+            weekday=weekday,
+            departure_time=datetime.time(hour),
+        )
+
+    def test_generates_one_trip_per_matching_weekday(self):
+        self.schedule(self.bus, 8)
+        with self.captureOnCommitCallbacks(execute=True):
+            trips, skipped = generate_trips(self.monday, self.monday + datetime.timedelta(days=13))
+        self.assertEqual(len(trips), 2)
+        self.assertEqual(
+            list(Trip.objects.order_by("date_of_journey").values_list("name", flat=True)),
+            ["LAG-to-ENU-06-05-2024", "LAG-to-ENU-13-05-2024"],
+        )
+        # bulk_create sends no signals, so the route weeks are refreshed by the generator
+        self.assertEqual(
+            list(RouteWeek.objects.order_by("week").values_list("week", "trips")),
+            [(self.monday, 1), (self.monday + datetime.timedelta(days=7), 1)],
+        )
+
+    def test_same_day_collisions_get_deterministic_suffixes(self):
+        self.schedule(self.other_bus, 14)
+        self.schedule(self.bus, 8)
+        generate_trips(self.monday, self.monday)
+        self.assertEqual(
+            list(Trip.objects.order_by("date_of_journey").values_list("name", "bus")),
+            [("LAG-to-ENU-06-05-2024", self.bus.pk), ("LAG-to-ENU-06-05-2024-2", self.other_bus.pk)],
+        )
+
+    def test_generating_twice_skips_existing_trips(self):
+        self.schedule(self.bus, 8)
+        generate_trips(self.monday, self.monday)
+        self.assertEqual(generate_trips(self.monday, self.monday), ([], []))
+        self.assertEqual(Trip.objects.count(), 1)
+
+    def test_save_keeps_collision_suffix(self):
+        self.schedule(self.bus, 8)
+        self.schedule(self.other_bus, 14)
+        generate_trips(self.monday, self.monday)
+        trip = Trip.objects.get(bus=self.other_bus)
+        trip.save()
+        self.assertEqual(trip.name, "LAG-to-ENU-06-05-2024-2")
+
+    def test_add_months_clamps_to_month_end(self):
+        self.assertEqual(add_months(datetime.date(2024, 1, 31), 1), datetime.date(2024, 2, 29))
+        self.assertEqual(add_months(datetime.date(2024, 11, 15), 3), datetime.date(2025, 2, 15))
+
+    def test_conflicting_schedule_is_skipped(self):
+        self.schedule(self.bus, 8)
+        clashing = self.schedule(self.bus, 12)
+        trips, skipped = generate_trips(self.monday, self.monday)
+        self.assertEqual(len(trips), 1)
+        self.assertEqual(skipped[0].schedule, clashing)
+        self.assertEqual(skipped[0].clash, "LAG-to-ENU-06-05-2024")
+
+
+class BusConflictTestCase(TestCase):
+    def setUp(self):
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.start = timezone.now() + datetime.timedelta(days=1)
+        self.trip = Trip.objects.create(
+            bus=self.bus,
+            departure=self.ikeja,
+            destination=self.nsukka,
+            date_of_journey=self.start,
+            duration=datetime.timedelta(hours=8),
+        )
+
+    def test_clean_rejects_overlapping_trip(self):
+        trip = Trip(
+            bus=self.bus,
+            departure=self.nsukka,
+            destination=self.ikeja,
+            date_of_journey=self.start + datetime.timedelta(hours=4),
+        )
+        with self.assertRaises(ValidationError) as context:
+            trip.clean()
+        self.assertIn("bus", context.exception.message_dict)
+
+    def test_clean_accepts_trip_after_arrival(self):
+        trip = Trip(
+            bus=self.bus,
+            departure=self.nsukka,
+            destination=self.ikeja,
+            date_of_journey=self.start + datetime.timedelta(hours=8),
+        )
+        trip.clean()
+
+    def test_find_conflicts(self):
+        clash = Trip.objects.create(
+            bus=self.bus,
+            departure=self.nsukka,
+            destination=self.ikeja,
+            date_of_journey=self.start + datetime.timedelta(hours=2),
+        )
+        Trip.objects.create(
+            bus=self.bus,
+            departure=self.nsukka,
+            destination=self.ikeja,
+            date_of_journey=self.start + datetime.timedelta(days=2),
+        )
+        conflicts = find_conflicts(timezone.now(), timezone.now() + datetime.timedelta(days=30))
+        self.assertEqual([(c.first_id, c.second_id) for c in conflicts], [(self.trip.pk, clash.pk)])
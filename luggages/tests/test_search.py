@@ -0,0 +1,81 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import (
+    BillSearchTrigram,
+    Bus,
+    Customer,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    normalize_search_text,
+)
+from ..search import reindex_bills, search_bills
+
+
+class BillSearchTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip = Trip.objects.create(
+                bus=self.bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=timezone.now()
+            )
+            self.ade = self.bill("Adébáyọ̀ Okonkwo")
+            self.chi = self.bill("Chinedu Eze")
+
+    def bill(self, fullname):
+        customer = Customer.objects.create(
+            fullname=fullname,
+            email=f"{fullname.split()[0].lower()}@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        return LuggageBill.objects.create(customer=customer, trip=self.trip, added_by=self.user)
+
+    def search(self, term):
+        return set(search_bills(LuggageBill.objects.all(), term))
+
+    def test_normalize_search_text(self):
+        self.assertEqual(normalize_search_text("  Adébáyọ̀ ", "ABC-123-DEF"), "adebayo abc 123 def")
+
+    def test_document_covers_customer_trip_plate_and_route(self):
+        self.assertIn("adebayo okonkwo", self.ade.search_document)
+        self.assertIn("abc 123 def", self.ade.search_document)
+        self.assertIn("ikeja nsukka", self.ade.search_document)
+        self.assertTrue(BillSearchTrigram.objects.filter(bill=self.ade, trigram="bay").exists())
+
+    def test_search_matches_substrings_and_word_prefixes(self):
+        self.assertEqual(self.search("bayo"), {self.ade})
+        self.assertEqual(self.search("ADEBAYO nsuk"), {self.ade})
+        self.assertEqual(self.search("ch"), {self.chi})
+        self.assertEqual(self.search("nsukka"), {self.ade, self.chi})
+        self.assertEqual(self.search('"okonkwo chinedu"'), set())
+        self.assertEqual(self.search("xyz"), set())
+
+    def test_renames_are_propagated(self):
+        self.bus.plate_number = "KJA-999-XY"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bus.save()
+            # The documents are rebuilt once the rename commits
+            self.assertEqual(self.search("kja 999"), set())
+        self.assertEqual(self.search("kja 999"), {self.ade, self.chi})
+        self.assertEqual(self.search("abc"), set())
+
+        self.ade.customer.fullname = "Funke Akindele"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ade.customer.save()
+        self.assertEqual(self.search("funke"), {self.ade})
+
+    def test_reindex_rebuilds_stale_documents(self):
+        LuggageBill.objects.update(search_document="")
+        BillSearchTrigram.objects.all().delete()
+        self.assertEqual(reindex_bills(LuggageBill.objects.all()), 2)
+        self.assertEqual(self.search("chinedu"), {self.chi})
@@ -0,0 +1,148 @@
+import datetime
+import threading
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import sequences
+from ..models import (
+    Bus,
+    Customer,
+    LuggageBill,
+    ParkLocation,
+    ReceiptSequence,
+    State,
+    Trip,
+)
+from ..sequences import ReceiptNumberAllocator, format_receipt_number
+
+
+class ReceiptNumberTestCase(TestCase):
+    def setUp(self):
+        # Other tests run the on_commit callbacks of their bills, which hand blocks to the shared allocator
+        patcher = mock.patch.object(sequences, "allocator", ReceiptNumberAllocator())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.outbound = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=timezone.now()
+        )
+        self.inbound = Trip.objects.create(
+            bus=bus, departure=self.nsukka, destination=self.ikeja, date_of_journey=timezone.now()
+        )
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+
+    def bill(self, trip):
+        return LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+
+    def test_numbers_follow_the_departure_park_and_day(self):
+        today = timezone.localdate()
+        bill = self.bill(self.outbound)
+        self.assertEqual(bill.receipt_number, format_receipt_number(self.ikeja.pk, today, 1))
+        other = self.bill(self.inbound)
+        self.assertEqual(other.receipt_number, format_receipt_number(self.nsukka.pk, today, 1))
+
+        # The receipt number is kept when the bill is saved again
+        bill.save()
+        bill.refresh_from_db()
+        self.assertEqual(bill.receipt_number, format_receipt_number(self.ikeja.pk, today, 1))
+
+    def test_blocks_are_reused_after_commit(self):
+        today = timezone.localdate()
+        allocator = ReceiptNumberAllocator(block_size=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.next_number(self.ikeja.pk, today), 1)
+        self.assertEqual([allocator.next_number(self.ikeja.pk, today) for _ in range(4)], [2, 3, 4, 5])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.next_number(self.ikeja.pk, today), 6)
+        self.assertEqual(ReceiptSequence.objects.get(park=self.ikeja, day=today).high_water, 10)
+
+    def test_rolled_back_block_is_dropped(self):
+        today = timezone.localdate()
+        allocator = ReceiptNumberAllocator(block_size=5)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            self.assertEqual(allocator.next_number(self.ikeja.pk, today), 1)
+            raise RuntimeError
+        # The reservation was undone, so the numbers are reserved again rather than taken from the dropped block
+        self.assertEqual(allocator.next_number(self.ikeja.pk, today), 1)
+        self.assertEqual(ReceiptSequence.objects.get(park=self.ikeja, day=today).high_water, 5)
+
+    def test_one_transaction_shares_a_block_and_old_days_are_evicted(self):
+        today = timezone.localdate()
+        yesterday = today - datetime.timedelta(days=1)
+        allocator = ReceiptNumberAllocator(block_size=5)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(allocator.next_number(self.ikeja.pk, yesterday), 1)
+            self.assertEqual([allocator.next_number(self.ikeja.pk, today) for _ in range(3)], [1, 2, 3])
+        self.assertEqual(ReceiptSequence.objects.get(park=self.ikeja, day=today).high_water, 5)
+        self.assertEqual(list(allocator.blocks), [("default", self.ikeja.pk, today)])
+        self.assertEqual(allocator.next_number(self.ikeja.pk, today), 4)
+
+    def test_admin_search_finds_receipt_number(self):
+        bill = self.bill(self.outbound)
+        self.bill(self.outbound)
+        response = self.client.get(reverse("admin:luggages_luggagebill_changelist"), {"q": bill.receipt_number})
+        self.assertEqual(list(response.context["cl"].result_list), [bill])
+
+
+@skipUnless(connection.vendor == "postgresql", "SQLite test databases cannot be written from several threads")
+class ConcurrentReceiptNumberTestCase(TransactionTestCase):
+    def test_concurrent_bills_never_repeat_a_number(self):
+        user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        park = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        other = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        trip = Trip.objects.create(bus=bus, departure=park, destination=other, date_of_journey=timezone.now())
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        errors = []
+
+        def work():
+            try:
+                for _ in range(10):
+                    # Two bills per transaction, as an admin save or import batch would write them
+                    with transaction.atomic():
+                        LuggageBill.objects.create(customer=customer, trip=trip, added_by=user)
+                        LuggageBill.objects.create(customer=customer, trip=trip, added_by=user)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work) for _ in range(6)]
+        with mock.patch.object(sequences, "allocator", ReceiptNumberAllocator(block_size=3)):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(errors, [])
+        numbers = list(LuggageBill.objects.values_list("receipt_number", flat=True))
+        self.assertEqual(len(numbers), 120)
+        self.assertEqual(len(set(numbers)), 120)
+        high_water = ReceiptSequence.objects.get(park=park, day=timezone.localdate()).high_water
+        # Each thread leaves at most one partly used block behind
+        self.assertLessEqual(high_water - len(numbers), len(threads) * 3)
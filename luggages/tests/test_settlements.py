@@ -0,0 +1,104 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..archive import archive_trips
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    Settlement,
+    State,
+    Trip,
+    Weight,
+)
+from ..settlements import close_day, settlement_report
+
+
+class SettlementTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.oshodi = ParkLocation.objects.create(state=lagos, location="Oshodi", full_address="Oshodi", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.bag_type = BagType.objects.create(name="Box", size="S")
+        self.trip = Trip.objects.create(
+            bus=bus, departure=self.ikeja, destination=self.oshodi, date_of_journey=timezone.now()
+        )
+        self.today = timezone.localdate()
+        self.yesterday = self.today - datetime.timedelta(days=1)
+
+    def add_bill(self, quantity, days_ago=1):
+        bill = LuggageBill.objects.create(customer=self.customer, trip=self.trip, added_by=self.user)
+        Luggage.objects.create(luggagebill=bill, weight=self.weight, bag_type=self.bag_type, quantity=quantity)
+        LuggageBill.objects.filter(pk=bill.pk).update(created=bill.created - datetime.timedelta(days=days_ago))
+        return bill
+
+    def test_close_day_freezes_bills_and_prices(self):
+        bill = self.add_bill(2)
+        self.add_bill(1)
+        self.add_bill(4, days_ago=0)
+        settlement = close_day(self.ikeja, self.yesterday, self.user)
+        self.assertEqual((settlement.bills, settlement.bags, settlement.kilograms), (2, 3, 15))
+        self.assertEqual(settlement.revenue, Decimal("1500"))
+        self.assertEqual(settlement.lines.count(), 2)
+        self.assertEqual(LuggageBill.objects.filter(settlement=settlement).count(), 2)
+
+        bill.refresh_from_db()
+        with self.assertRaises(ValidationError):
+            bill.clean()
+        with self.assertRaises(ValidationError):
+            bill.items.get().clean()
+        with self.assertRaises(ValidationError):
+            close_day(self.ikeja, self.yesterday)
+        with self.assertRaises(ValidationError):
+            close_day(self.ikeja, self.today)
+
+        # Later price changes and archiving leave the settled totals alone
+        self.weight.price = 900
+        self.weight.save()
+        archive_trips(before=timezone.now() + datetime.timedelta(days=1))
+        settled, today = settlement_report(self.yesterday, self.today)[::-1]
+        self.assertEqual((settled["settlement"], settled["revenue"]), (settlement, Decimal("1500")))
+        self.assertEqual((today["settlement"], today["bills"], today["revenue"]), (None, 1, Decimal("2000")))
+
+    def test_close_from_report_and_command(self):
+        self.add_bill(1)
+        response = self.client.get(reverse("admin_settlement_report"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Close day")
+
+        response = self.client.post(
+            reverse("admin_settlement_close"), {"park": self.ikeja.pk, "day": self.yesterday.isoformat()}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Settlement.objects.get().closed_by, self.user)
+
+        self.add_bill(1, days_ago=2)
+        output = io.StringIO()
+        call_command("closeday", day=self.today - datetime.timedelta(days=2), stdout=output)
+        self.assertIn("Closed 1 parks", output.getvalue())
+        self.assertEqual(Settlement.objects.filter(closed_by=None).get().bills, 1)
+
+        response = self.client.get(reverse("admin:luggages_settlement_changelist"))
+        self.assertEqual(response.status_code, 200)
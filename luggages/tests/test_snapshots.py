@@ -0,0 +1,131 @@
+import datetime
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..analytics import luggage_report
+from ..archive import archive_trips
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+from ..snapshots import SnapshotStore, export_snapshot, load_snapshot
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(LUGGAGE_SNAPSHOT_DIR=directory.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.store = SnapshotStore()
+
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        light = Weight.objects.create(name="Light", min_weight=5, price="500.50")
+        heavy = Weight.objects.create(name="Heavy", min_weight=20, price=2000)
+        box = BagType.objects.create(name="Box", size="S")
+        trunk = BagType.objects.create(name="Trunk", size="L")
+        now = timezone.now()
+        for day, departure, destination in [(0, ikeja, nsukka), (1, nsukka, ikeja), (40, ikeja, nsukka)]:
+            trip = Trip.objects.create(
+                bus=bus,
+                departure=departure,
+                destination=destination,
+                date_of_journey=now - datetime.timedelta(days=day),
+            )
+            bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user)
+            Luggage.objects.create(luggagebill=bill, weight=light, bag_type=box, quantity=2)
+            Luggage.objects.create(luggagebill=bill, weight=heavy, bag_type=trunk, quantity=1)
+        # Spread the items over two creation months
+        Luggage.objects.filter(luggagebill__trip__date_of_journey__lt=now - datetime.timedelta(days=30)).update(
+            created=now - datetime.timedelta(days=40)
+        )
+
+    def assertReportsMatch(self, **options):
+        self.assertEqual(luggage_report(loader=load_snapshot, **options), luggage_report(**options))
+
+    def test_snapshot_reports_match_the_database(self):
+        self.assertEqual(export_snapshot(), 6)
+        self.assertEqual(len(self.store.read_manifest()["partitions"]), 2)
+        self.assertReportsMatch(group_by=["size"], period="week")
+        self.assertReportsMatch(group_by=["route", "bus"], period=None)
+        today = timezone.localdate()
+        self.assertReportsMatch(group_by=["weight"], period="day", start=today - datetime.timedelta(days=1), end=today)
+
+    def test_incremental_export_appends_changed_items_only(self):
+        earlier = timezone.now() - datetime.timedelta(days=1)
+        for model in (Trip, LuggageBill, Luggage):
+            model.objects.update(updated=earlier)
+        export_snapshot()
+        manifest = self.store.read_manifest()
+        manifest["watermark"] = (earlier + datetime.timedelta(hours=1)).isoformat()
+        self.store.write_manifest(manifest)
+        item = Luggage.objects.order_by("pk").first()
+        item.quantity = 5
+        item.save()
+
+        self.assertEqual(export_snapshot(), 1)
+        self.assertEqual(len(load_snapshot(["quantity"])), 6)
+        self.assertReportsMatch(group_by=["size"], period="month")
+
+    def test_interrupted_export_is_truncated(self):
+        export_snapshot()
+        month, partition = next(iter(self.store.read_manifest()["partitions"].items()))
+        with open(self.store.column_path(month, "quantity"), "ab") as column:
+            column.write(b"\x07\x00\x00\x00")
+        self.assertEqual(len(load_snapshot(["quantity"])), 6)
+
+        export_snapshot()
+        size = self.store.column_path(month, "quantity").stat().st_size
+        self.assertEqual(size, 4 * self.store.read_manifest()["partitions"][month]["rows"])
+
+    def test_archived_items_stay_in_the_snapshot(self):
+        export_snapshot()
+        expected = luggage_report(group_by=["size"], period=None)
+        archive_trips(timezone.now() - datetime.timedelta(days=30))
+        self.assertEqual(Luggage.objects.count(), 4)
+
+        export_snapshot()
+        self.assertEqual(luggage_report(group_by=["size"], period=None, loader=load_snapshot), expected)
+        export_snapshot(full=True)
+        self.assertEqual(luggage_report(group_by=["size"], period=None, loader=load_snapshot), expected)
+
+    def test_command_and_admin_read_the_snapshot(self):
+        output = io.StringIO()
+        call_command("exportsnapshot", stdout=output)
+        self.assertIn("Exported 6 luggage rows", output.getvalue())
+        Luggage.objects.all().delete()
+
+        output = io.StringIO()
+        call_command("luggagereport", "--snapshot", "--group-by", "size", stdout=output)
+        self.assertEqual(len(output.getvalue().splitlines()), 3)
+
+        response = self.client.get(reverse("admin_luggage_analytics"), {"snapshot": "on", "period": ""})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context["report"]), 2)
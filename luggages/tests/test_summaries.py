@@ -0,0 +1,286 @@
+import datetime
+import io
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import signals
+from ..archive import archive_trips
+from ..models import (
+    BagType,
+    Bus,
+    Customer,
+    CustomerSummary,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    RouteWeek,
+    StaffDay,
+    State,
+    Trip,
+    Weight,
+)
+from ..summaries import refresh_customer_summaries, refresh_route_week_keys
+
+
+class CustomerSummaryTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.customers = [
+            Customer.objects.create(
+                fullname=f"Customer {index}",
+                email=f"customer{index}@example.com",
+                address="1 Main St",
+                next_of_kin="Next of Kin",
+                next_of_kin_phonenumber="08031234567",
+            )
+            for index in range(3)
+        ]
+        self.weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.bag_type = BagType.objects.create(name="Box", size="S")
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trips = [
+                Trip.objects.create(
+                    bus=bus,
+                    departure=self.ikeja,
+                    destination=self.nsukka,
+                    date_of_journey=now - datetime.timedelta(days=200),
+                ),
+                Trip.objects.create(
+                    bus=bus,
+                    departure=self.ikeja,
+                    destination=self.nsukka,
+                    date_of_journey=now - datetime.timedelta(days=2),
+                ),
+                Trip.objects.create(
+                    bus=bus,
+                    departure=self.nsukka,
+                    destination=self.ikeja,
+                    date_of_journey=now - datetime.timedelta(days=1),
+                ),
+            ]
+
+    def add_bill(self, customer, trip, quantity):
+        bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user)
+        Luggage.objects.create(luggagebill=bill, weight=self.weight, bag_type=self.bag_type, quantity=quantity)
+        return bill
+
+    def test_summary_follows_bills_and_items(self):
+        customer = self.customers[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            for trip in self.trips:
+                self.add_bill(customer, trip, 2)
+        summary = CustomerSummary.objects.get(customer=customer)
+        self.assertEqual((summary.trips, summary.bills, summary.bags, summary.kilograms), (3, 3, 6, 30))
+        self.assertEqual(summary.spend, Decimal("3000"))
+        self.assertEqual(summary.last_trip, self.trips[2].date_of_journey)
+        self.assertEqual((summary.favourite_departure, summary.favourite_destination), (self.ikeja, self.nsukka))
+
+        item = Luggage.objects.filter(luggagebill__trip=self.trips[2]).get()
+        item.quantity = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            item.save()
+        self.assertEqual(CustomerSummary.objects.get(customer=customer).spend, Decimal("4000"))
+        with self.captureOnCommitCallbacks(execute=True):
+            item.luggagebill.delete()
+        summary = CustomerSummary.objects.get(customer=customer)
+        self.assertEqual((summary.trips, summary.spend), (2, Decimal("2000")))
+        self.assertEqual(summary.last_trip, self.trips[1].date_of_journey)
+
+    def test_archived_bills_still_count(self):
+        self.add_bill(self.customers[0], self.trips[0], 3)
+        archive_trips(timezone.now() - datetime.timedelta(days=100))
+        CustomerSummary.objects.all().delete()
+        refresh_customer_summaries()
+        summary = CustomerSummary.objects.get(customer=self.customers[0])
+        self.assertEqual((summary.trips, summary.spend), (1, Decimal("1500")))
+        self.assertEqual(CustomerSummary.objects.get(customer=self.customers[1]).trips, 0)
+
+    def test_deleting_a_customer_removes_the_summary(self):
+        self.add_bill(self.customers[0], self.trips[1], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.customers[0].delete()
+        self.assertFalse(CustomerSummary.objects.exists())
+
+    def test_changelist_sorts_customers_by_spend(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for index, customer in enumerate(self.customers):
+                self.add_bill(customer, self.trips[1], index + 1)
+        url = reverse("admin:luggages_customer_changelist")
+        response = self.client.get(url)
+        position = response.context["cl"].list_display.index("spend")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"o": f"-{position}"})
+        self.assertEqual(list(response.context["cl"].result_list), self.customers[::-1])
+        self.assertContains(response, "Ikeja to Nsukka")
+        self.assertEqual(sum("luggages_customersummary" in query["sql"] for query in queries.captured_queries), 1)
+
+    def test_command_and_detail_page(self):
+        self.add_bill(self.customers[0], self.trips[1], 1)
+        output = io.StringIO()
+        call_command("rebuildcustomersummaries", stdout=output)
+        self.assertIn("Summarised 3 customers", output.getvalue())
+        response = self.client.get(reverse("admin_customer_detail", args=[self.customers[0].pk]))
+        self.assertContains(response, "Ikeja to Nsukka")
+
+
+class RouteWeekTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        self.bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian", max_luggage_weight=100)
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.small = BagType.objects.create(name="Box", size="S")
+        self.large = BagType.objects.create(name="Trunk", size="L")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip = Trip.objects.create(
+                bus=self.bus, departure=self.ikeja, destination=self.nsukka, date_of_journey=timezone.now()
+            )
+
+    def add_bill(self, trip, **quantities):
+        bill = LuggageBill.objects.create(customer=self.customer, trip=trip, added_by=self.user)
+        for bag_type, quantity in quantities.items():
+            Luggage.objects.create(
+                luggagebill=bill, weight=self.weight, bag_type=getattr(self, bag_type), quantity=quantity
+            )
+        return bill
+
+    def test_route_week_follows_trips_bills_and_items(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_bill(self.trip, small=3, large=1)
+        row = RouteWeek.objects.get()
+        self.assertEqual((row.trips, row.bills, row.kilograms, row.revenue), (1, 1, 20, Decimal("2000")))
+        self.assertEqual((row.small_bags, row.medium_bags, row.large_bags), (3, 0, 1))
+        self.assertEqual((row.capacity, row.capacity_kilograms), (100, 20))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Luggage.objects.filter(bag_type=self.large).delete()
+        self.assertEqual(RouteWeek.objects.get().large_bags, 0)
+
+        self.trip.date_of_journey -= datetime.timedelta(weeks=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip.save()
+        row = RouteWeek.objects.get()
+        day = timezone.localdate(self.trip.date_of_journey)
+        self.assertEqual((row.week, row.small_bags), (day - datetime.timedelta(days=day.weekday()), 3))
+
+        # The cascade collects every bill and item of the trip and refreshes once
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_bill(self.trip, small=1)
+        with mock.patch.object(signals, "refresh_route_week_keys", wraps=refresh_route_week_keys) as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.trip.delete()
+        refresh.assert_called_once()
+        self.assertFalse(RouteWeek.objects.exists())
+
+    def test_dashboard_reads_route_weeks_only(self):
+        self.add_bill(self.trip, small=1, large=1)
+        self.bus.max_luggage_weight = None
+        self.bus.save()
+        output = io.StringIO()
+        call_command("rebuildroutesummaries", stdout=output)
+        self.assertIn("Summarised 1 route weeks", output.getvalue())
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin_route_dashboard"), {"weeks": 4})
+        self.assertEqual(response.status_code, 200)
+        route = response.context["routes"][0]
+        self.assertEqual((route["trips_per_week"], route["revenue_per_trip"], route["load"]), (0.25, 1000, None))
+        self.assertEqual(route["bag_mix"], {"Small": 0.5, "Medium": 0, "Large": 0.5})
+        tables = {"luggages_trip", "luggages_luggagebill", "luggages_luggage"}
+        self.assertFalse(any(f'"{table}"' in query["sql"] for query in queries.captured_queries for table in tables))
+
+
+class StaffDayTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.clerk = User.objects.create_user("clerk", "clerk@example.com", "clerk")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        self.ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        self.oshodi = ParkLocation.objects.create(state=lagos, location="Oshodi", full_address="Oshodi", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        self.customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.weight = Weight.objects.create(name="Light", min_weight=5, price=500)
+        self.bag_type = BagType.objects.create(name="Box", size="S")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip = Trip.objects.create(
+                bus=bus, departure=self.ikeja, destination=self.oshodi, date_of_journey=timezone.now()
+            )
+
+    def add_bill(self, user, quantity):
+        bill = LuggageBill.objects.create(customer=self.customer, trip=self.trip, added_by=user)
+        Luggage.objects.create(luggagebill=bill, weight=self.weight, bag_type=self.bag_type, quantity=quantity)
+        return bill
+
+    def test_staff_day_follows_bills_items_and_trips(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            bill = self.add_bill(self.clerk, 2)
+            self.add_bill(self.clerk, 1)
+        row = StaffDay.objects.get()
+        self.assertEqual((row.user, row.park, row.day), (self.clerk, self.ikeja, timezone.localdate()))
+        self.assertEqual((row.bills, row.bags, row.revenue), (2, 3, Decimal("1500")))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            bill.items.get().delete()
+        self.assertEqual(StaffDay.objects.get().bags, 1)
+
+        self.trip.departure = self.oshodi
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trip.save()
+        self.assertEqual(StaffDay.objects.get().park, self.oshodi)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_trips(before=timezone.now() + datetime.timedelta(days=1))
+        self.assertEqual(StaffDay.objects.get().bills, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.clerk.delete()
+        self.assertFalse(StaffDay.objects.exists())
+
+    def test_report_compares_staff_with_their_park(self):
+        self.add_bill(self.clerk, 1)
+        self.add_bill(self.clerk, 1)
+        self.add_bill(self.clerk, 1)
+        self.add_bill(self.user, 1)
+        StaffDay.objects.all().delete()
+        output = io.StringIO()
+        call_command("rebuildstaffsummaries", stdout=output)
+        self.assertIn("Summarised 2 staff days", output.getvalue())
+
+        response = self.client.get(reverse("admin_staff_productivity"), {"park": self.ikeja.pk})
+        self.assertEqual(response.status_code, 200)
+        clerk, admin = response.context["report"]
+        self.assertEqual((clerk["staff"], clerk["bills"], clerk["average_bills"]), (self.clerk, 3, 2))
+        self.assertEqual((admin["revenue"], admin["bills_against_average"]), (Decimal("500"), 0.5))
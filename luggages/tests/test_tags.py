@@ -0,0 +1,90 @@
+import json
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    BagTag,
+    BagType,
+    Bus,
+    Customer,
+    Luggage,
+    LuggageBill,
+    ParkLocation,
+    State,
+    Trip,
+    Weight,
+)
+from ..tags import normalize_tag_code
+
+
+class BagTagTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser("admin", "admin@example.com", "admin")
+        self.client.force_login(self.user)
+        lagos = State.objects.create(name="Lagos", short_code="LAG")
+        enugu = State.objects.create(name="Enugu", short_code="ENU")
+        ikeja = ParkLocation.objects.create(state=lagos, location="Ikeja", full_address="Ikeja", contact="-")
+        nsukka = ParkLocation.objects.create(state=enugu, location="Nsukka", full_address="Nsukka", contact="-")
+        bus = Bus.objects.create(plate_number="ABC-123-DEF", driver_name="Seyi Pythonian")
+        trip = Trip.objects.create(bus=bus, departure=ikeja, destination=nsukka, date_of_journey=timezone.now())
+        customer = Customer.objects.create(
+            fullname="Customer",
+            email="customer@example.com",
+            address="1 Main St",
+            next_of_kin="Next of Kin",
+            next_of_kin_phonenumber="08031234567",
+        )
+        self.bill = LuggageBill.objects.create(customer=customer, trip=trip, added_by=self.user)
+        self.item = Luggage.objects.create(
+            luggagebill=self.bill,
+            weight=Weight.objects.create(name="Heavy", min_weight=20, price="1500.00"),
+            bag_type=BagType.objects.create(name="Suitcase", size=BagType.SizeOption.LARGE),
+            quantity=3,
+        )
+
+    def test_one_tag_per_bag_follows_quantity(self):
+        self.assertEqual(list(self.item.tags.values_list("sequence", flat=True)), [1, 2, 3])
+        self.assertEqual(len({tag.code for tag in self.item.tags.all()}), 3)
+        self.item.quantity = 1
+        self.item.save()
+        self.assertEqual(list(self.item.tags.values_list("sequence", flat=True)), [1])
+        self.item.quantity = 2
+        self.item.save()
+        self.assertEqual(list(self.item.tags.values_list("sequence", flat=True)), [1, 2])
+
+    def test_normalize_tag_code(self):
+        self.assertEqual(normalize_tag_code(" abcd-efo1 "), "ABCDEF01")
+
+    def test_scan_resolves_tag_in_one_query(self):
+        tag = self.item.tags.get(sequence=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("admin_bagtag_scan", args=[tag.code.lower()]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["bag"], data["bill"], data["customer"]), ("2 of 3", self.bill.pk, "Customer"))
+        self.assertEqual(len([query for query in queries.captured_queries if "luggages_" in query["sql"]]), 1)
+        self.assertEqual(self.client.get(reverse("admin_bagtag_scan", args=["ZZZZZZZZ"])).status_code, 404)
+
+    def test_bulk_scan_marks_tags(self):
+        codes = list(self.item.tags.values_list("code", flat=True))
+        response = self.client.post(
+            reverse("admin_bagtag_bulk_scan"),
+            json.dumps({"codes": codes[:2] + ["ZZZZZZZZ"], "status": BagTag.Status.LOADED}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"updated": 2, "unknown": ["ZZZZZZZZ"]})
+        self.assertEqual(
+            list(self.item.tags.values_list("status", flat=True)),
+            [BagTag.Status.LOADED, BagTag.Status.LOADED, BagTag.Status.CHECKED_IN],
+        )
+        response = self.client.post(
+            reverse("admin_bagtag_bulk_scan"),
+            json.dumps({"codes": codes, "status": "lost"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
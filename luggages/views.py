@@ -1,7 +1,42 @@
+import datetime
+import json
+from urllib.parse import urlencode
+
+from django.contrib import messages
 from django.contrib.admin.views.decorators import staff_member_required
-from django.shortcuts import get_object_or_404, render
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import require_GET, require_POST
+
+from .aggregates import revenue_report
+from .analytics import PERIODS, REPORT_GROUPS, luggage_report
+from .fuzzy import DUPLICATE_MIN_SCORE
+from .manifest import MANIFEST_FORMATS, stream_manifest
+from .models import (
+    BagTag,
+    BagType,
+    Customer,
+    CustomerDuplicate,
+    CustomerSummary,
+    LuggageBill,
+    ParkLocation,
+    Trip,
+    Weight,
+)
+from .receipts import stream_receipts
+from .scheduling import find_conflicts
+from .settlements import close_day, settlement_report
+from .snapshots import load_snapshot
+from .summaries import route_dashboard, staff_productivity
+from .tags import mark_tags, scan_tag
 
-from .models import Customer, LuggageBill, Trip, Weight
+# Pairs listed per page of the possible duplicates report.
+DUPLICATES_PER_PAGE = 50
 
 
 def homepage(request):
@@ -30,21 +65,50 @@ def admin_luggagebill_detail(request, luggagebill_id):
 @staff_member_required
 def admin_customer_detail(request, customer_id):
     customer = get_object_or_404(Customer, id=customer_id)
-    luggage_bills = customer.luggagebill_set.all()
+    luggage_bills = customer.luggagebill_set.prefetch_related("items")
+    summary = (
+        CustomerSummary.objects.select_related("favourite_departure", "favourite_destination")
+        .filter(customer=customer)
+        .first()
+    )
 
     template_name = "admin/luggages/customer/detail.html"
     context = {
         "customer": customer,
+        "summary": summary,
         "luggage_bills": luggage_bills,
     }
 
     return render(request, template_name, context)
 
 
+@staff_member_required
+def admin_customer_duplicates(request):
+    try:
+        min_score = max(DUPLICATE_MIN_SCORE, min(float(request.GET.get("score", 0.8)), 1.25))
+    except ValueError:
+        min_score = 0.8
+    # Pairs are found offline by findduplicatecustomers; the report only pages through them
+    pairs = CustomerDuplicate.objects.filter(
+        score__gte=min_score, customer__deleted__isnull=True, other__deleted__isnull=True
+    ).select_related("customer", "other")
+    page = Paginator(pairs, DUPLICATES_PER_PAGE).get_page(request.GET.get("page"))
+
+    template_name = "admin/luggages/customer/duplicates.html"
+    context = {
+        "min_score": min_score,
+        "page": page,
+        "refreshed": CustomerDuplicate.objects.aggregate(refreshed=Max("refreshed"))["refreshed"],
+    }
+
+    return render(request, template_name, context)
+
+
 @staff_member_required
 def admin_trip_luggages(request, trip_id):
-    trip = get_object_or_404(Trip, id=trip_id)
-    luggages = LuggageBill.objects.filter(trip=trip)
+    # Bill and trip totals are summed from the prefetched items
+    trip = get_object_or_404(Trip.objects.prefetch_related("luggagebills__items"), id=trip_id)
+    luggages = trip.luggagebills.all()
 
     template_name = "admin/luggages/trip/detail.html"
     context = {
@@ -53,3 +117,234 @@ def admin_trip_luggages(request, trip_id):
     }
 
     return render(request, template_name, context)
+
+
+@staff_member_required
+def admin_trip_manifest(request, trip_id):
+    trip = get_object_or_404(Trip.objects.select_related("bus", "departure", "destination"), id=trip_id)
+    output_format = request.GET.get("format", "html")
+    if output_format not in MANIFEST_FORMATS:
+        output_format = "html"
+
+    response = StreamingHttpResponse(
+        stream_manifest(trip, output_format), content_type=MANIFEST_FORMATS[output_format]
+    )
+    if output_format != "html":
+        response["Content-Disposition"] = f'attachment; filename="manifest-{trip.name}.{output_format}"'
+    return response
+
+
+@staff_member_required
+def admin_trip_receipts(request, trip_id):
+    trip = get_object_or_404(Trip, id=trip_id)
+    receipts = stream_receipts(LuggageBill.objects.filter(trip=trip), title=f"Luggage Receipts for {trip.name}")
+
+    return StreamingHttpResponse(receipts, content_type="text/html; charset=utf-8")
+
+
+@staff_member_required
+def admin_trip_conflicts(request):
+    try:
+        days = max(1, min(int(request.GET.get("days", 30)), 365))
+    except ValueError:
+        days = 30
+    start = timezone.now()
+    conflicts = find_conflicts(start, start + datetime.timedelta(days=days))
+    trip_ids = {conflict.first_id for conflict in conflicts} | {conflict.second_id for conflict in conflicts}
+    trips = Trip.objects.select_related("bus", "departure", "destination").in_bulk(trip_ids)
+
+    template_name = "admin/luggages/trip/conflicts.html"
+    context = {
+        "days": days,
+        "conflicts": [(trips[c.first_id], trips[c.second_id], c) for c in conflicts],
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+def admin_route_dashboard(request):
+    try:
+        weeks = max(1, min(int(request.GET.get("weeks", 12)), 104))
+    except ValueError:
+        weeks = 12
+
+    template_name = "admin/luggages/trip/routes.html"
+    context = {
+        "weeks": weeks,
+        "sizes": BagType.SizeOption.labels,
+        "routes": route_dashboard(weeks),
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+def admin_revenue_report(request):
+    today = timezone.localdate()
+    try:
+        end = datetime.date.fromisoformat(request.GET["end"])
+    except (KeyError, ValueError):
+        end = today
+    try:
+        start = datetime.date.fromisoformat(request.GET["start"])
+    except (KeyError, ValueError):
+        start = end - datetime.timedelta(days=6)
+    park = ParkLocation.objects.filter(pk=request.GET.get("park") or None).first()
+
+    template_name = "admin/luggages/trip/revenue.html"
+    context = {
+        "start": start,
+        "end": end,
+        "park": park,
+        "parks": ParkLocation.objects.order_by("location"),
+        "report": revenue_report(start, end, park),
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+def admin_staff_productivity(request):
+    today = timezone.localdate()
+    try:
+        end = datetime.date.fromisoformat(request.GET["end"])
+    except (KeyError, ValueError):
+        end = today
+    try:
+        start = datetime.date.fromisoformat(request.GET["start"])
+    except (KeyError, ValueError):
+        start = end - datetime.timedelta(days=6)
+    park = ParkLocation.objects.filter(pk=request.GET.get("park") or None).first()
+
+    template_name = "admin/luggages/luggagebill/staff.html"
+    context = {
+        "start": start,
+        "end": end,
+        "park": park,
+        "parks": ParkLocation.objects.order_by("location"),
+        "report": staff_productivity(start, end, park),
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+def admin_settlement_report(request):
+    today = timezone.localdate()
+    try:
+        end = datetime.date.fromisoformat(request.GET["end"])
+    except (KeyError, ValueError):
+        end = today - datetime.timedelta(days=1)
+    try:
+        start = datetime.date.fromisoformat(request.GET["start"])
+    except (KeyError, ValueError):
+        start = end - datetime.timedelta(days=6)
+    park = ParkLocation.objects.filter(pk=request.GET.get("park") or None).first()
+
+    template_name = "admin/luggages/settlement/report.html"
+    context = {
+        "start": start,
+        "end": end,
+        "today": today,
+        "park": park,
+        "parks": ParkLocation.objects.order_by("location"),
+        "report": settlement_report(start, end, park),
+        "can_close": request.user.has_perm("luggages.add_settlement"),
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+@require_POST
+def admin_settlement_close(request):
+    if not request.user.has_perm("luggages.add_settlement"):
+        raise PermissionDenied
+    park = get_object_or_404(ParkLocation, pk=request.POST.get("park"))
+    try:
+        day = datetime.date.fromisoformat(request.POST.get("day", ""))
+        settlement = close_day(park, day, request.user)
+    except ValueError:
+        messages.error(request, "Choose the day to close.")
+    except ValidationError as error:
+        messages.error(request, error.messages[0])
+    else:
+        messages.success(request, f"Closed {settlement}: {settlement.bills} bills, {settlement.revenue} taken.")
+
+    query = urlencode({name: request.POST[name] for name in ("start", "end") if request.POST.get(name)})
+    return redirect(f"{reverse('admin_settlement_report')}?{query}")
+
+
+@staff_member_required
+def admin_luggage_analytics(request):
+    group_by = [name for name in request.GET.getlist("group_by") if name in REPORT_GROUPS] or ["size"]
+    period = request.GET.get("period", "week")
+    if period not in PERIODS:
+        period = None
+    today = timezone.localdate()
+    try:
+        end = datetime.date.fromisoformat(request.GET["end"])
+    except (KeyError, ValueError):
+        end = today
+    try:
+        start = datetime.date.fromisoformat(request.GET["start"])
+    except (KeyError, ValueError):
+        start = end - datetime.timedelta(weeks=12)
+    snapshot = "snapshot" in request.GET
+    report = luggage_report(group_by, period, start, end, loader=load_snapshot if snapshot else None)
+
+    template_name = "admin/luggages/luggage/analytics.html"
+    context = {
+        "groups": REPORT_GROUPS,
+        "periods": PERIODS,
+        "group_by": group_by,
+        "period": period,
+        "start": start,
+        "end": end,
+        "snapshot": snapshot,
+        "report": [([row[name] for name in group_by], row) for row in report],
+    }
+
+    return render(request, template_name, context)
+
+
+@staff_member_required
+@require_GET
+def admin_bagtag_scan(request, code):
+    tag = scan_tag(code)
+    if tag is None:
+        return JsonResponse({"error": f"Unknown tag {code}."}, status=404)
+
+    luggage = tag.luggage
+    bill = luggage.luggagebill
+    return JsonResponse(
+        {
+            "code": tag.code,
+            "status": tag.status,
+            "scanned_at": tag.scanned_at,
+            "bag": f"{tag.sequence} of {luggage.quantity}",
+            "bag_type": str(luggage.bag_type),
+            "weight": str(luggage.weight),
+            "bill": bill.pk,
+            "customer": bill.customer.fullname,
+            "trip": bill.trip.name,
+            "date_of_journey": bill.trip.date_of_journey,
+        }
+    )
+
+
+@staff_member_required
+@require_POST
+def admin_bagtag_bulk_scan(request):
+    try:
+        payload = json.loads(request.body)
+        codes = [str(code) for code in payload["codes"]]
+        status = payload["status"]
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": 'Expected {"codes": [...], "status": "..."}.'}, status=400)
+    if status not in BagTag.Status.values:
+        return JsonResponse({"error": f"Status must be one of {', '.join(BagTag.Status.values)}."}, status=400)
+
+    updated, unknown = mark_tags(codes, status)
+    return JsonResponse({"updated": updated, "unknown": unknown})